@@ -1,6 +1,10 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, StaticPool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,10 +12,33 @@ load_dotenv()
 # 默认 SQLite，如果想换 PostgreSQL 或 MySQL，可以直接改 .env
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///bili_note.db")
 
+# SQLite 调优：WAL 允许读写并发，NORMAL 在 WAL 下只在检查点时 fsync，
+# busy_timeout 让写冲突时等待而不是立刻报 "database is locked"
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# 连接池：API 线程、队列 worker 与各阶段线程池共享
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
 # SQLite 需要特定连接参数，其他数据库不需要
 engine_args = {}
-if DATABASE_URL.startswith("sqlite"):
-    engine_args["connect_args"] = {"check_same_thread": False}
+if IS_SQLITE:
+    engine_args["connect_args"] = {
+        "check_same_thread": False,
+        "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if ":memory:" in DATABASE_URL or DATABASE_URL in ("sqlite://", "sqlite:///"):
+        # 内存库只能共享同一个连接
+        engine_args["poolclass"] = StaticPool
+    else:
+        engine_args["poolclass"] = QueuePool
+        engine_args["pool_size"] = DB_POOL_SIZE
+        engine_args["max_overflow"] = DB_MAX_OVERFLOW
 
 engine = create_engine(
     DATABASE_URL,
@@ -19,6 +46,28 @@ engine = create_engine(
     **engine_args
 )
 
+if IS_SQLITE and SQLITE_TUNING:
+    @event.listens_for(engine, "connect")
+    def _on_sqlite_connect(dbapi_connection, connection_record):
+        # 事务由下面的 begin 事件显式开启，便于写事务使用 BEGIN IMMEDIATE
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        finally:
+            cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_sqlite_begin(conn):
+        # 写事务一开始就拿写锁：避免读事务中途升级为写事务时直接失败（busy_timeout 对升级无效）
+        if conn.get_execution_options().get("sqlite_immediate"):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            conn.exec_driver_sql("BEGIN")
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -33,4 +82,25 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@contextmanager
+def unit_of_work(write: bool = False) -> Iterator[Session]:
+    """
+    事务边界：块内的所有修改在退出时一次提交，异常时回滚。
+
+    :param write: 是否为写事务。SQLite 下写事务以 BEGIN IMMEDIATE 开始，
+                  在事务开头（而不是第一次写入时）等待写锁，多个线程并发写入时不会出现锁升级失败。
+    """
+    db = SessionLocal()
+    try:
+        if write and IS_SQLITE:
+            db.connection(execution_options={"sqlite_immediate": True})
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -1,11 +1,62 @@
+from sqlalchemy import inspect, text
+
 from app.db.models.models import Model
 from app.db.models.providers import Provider
 from app.db.models.video_tasks import VideoTask
-from app.db.models.video_tags import VideoTag
+from app.db.models.video_tags import VideoTag, VideoTagItem
 from app.db.models.task_queue import TaskQueueItem, TaskQueueState
 from app.db.engine import get_engine, Base
+from app.db.video_tags_dao import sync_tag_items
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# create_all 不会给已存在的表加列，旧库升级时需要补齐的列：{表名: {列名: 列定义}}
+ADDED_COLUMNS = {
+    "video_tasks": {
+        "status": "VARCHAR",
+        "title": "VARCHAR",
+        "cover_url": "VARCHAR",
+        "duration": "FLOAT",
+        "video_url": "VARCHAR",
+    },
+    "providers": {
+        "rpm_limit": "INTEGER",
+        "tpm_limit": "INTEGER",
+        "max_concurrency": "INTEGER",
+    },
+    "task_queue": {
+        "stage": "VARCHAR",
+        "progress": "FLOAT",
+        "message": "TEXT",
+        "fingerprint": "VARCHAR",
+    },
+}
+
+
+def _ensure_columns(engine, table: str, columns: dict) -> None:
+    existing = {col["name"] for col in inspect(engine).get_columns(table)}
+    missing = {name: ddl for name, ddl in columns.items() if name not in existing}
+    if not missing:
+        return
+    with engine.begin() as conn:
+        for name, ddl in missing.items():
+            logger.info(f"数据库迁移：{table} 新增列 {name}")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def _ensure_indexes(engine) -> None:
+    # 同理，已存在的表上新增的索引也需要单独创建
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 
 def init_db():
     engine = get_engine()
 
     Base.metadata.create_all(bind=engine)
+    for table, columns in ADDED_COLUMNS.items():
+        _ensure_columns(engine, table, columns)
+    _ensure_indexes(engine)
+    sync_tag_items()
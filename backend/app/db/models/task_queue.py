@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, func
+from sqlalchemy import Column, String, Text, Integer, DateTime, Boolean, Float, Index, func
 
 from app.db.engine import Base
 
@@ -15,9 +15,21 @@ class TaskQueueItem(Base):
     lock_owner = Column(String, nullable=True)
     paused = Column(Boolean, nullable=False, default=False)
     last_error = Column(Text, nullable=True)
+    # 笔记生成的当前阶段（TaskStatus）、阶段进度与提示消息，由 TaskStatusRegistry 写入
+    stage = Column(String, nullable=True)
+    progress = Column(Float, nullable=True)
+    message = Column(Text, nullable=True)
+    # 请求指纹（视频 + 生成参数），用于合并相同的请求，见 task_queue.submit_task
+    fingerprint = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # 领取任务与队列长度统计：status、paused 等值过滤后按 created_at 顺序扫描，历史任务不参与
+        Index("ix_task_queue_status_paused_created", "status", "paused", "created_at"),
+        Index("ix_task_queue_fingerprint_status", "fingerprint", "status"),
+    )
+
 
 class TaskQueueState(Base):
     __tablename__ = "task_queue_state"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, UniqueConstraint, Text
+from sqlalchemy import Column, Integer, String, DateTime, func, UniqueConstraint, Text, Index
 
 from app.db.engine import Base
 
@@ -15,5 +15,23 @@ class VideoTag(Base):
 
     __table_args__ = (
         UniqueConstraint("platform", "video_id", name="uq_video_tags_platform_video_id"),
+        # get_tags_for_videos 只按 video_id 批量查询，唯一约束的前缀列是 platform，用不上
+        Index("ix_video_tags_video_id", "video_id"),
     )
 
+
+class VideoTagItem(Base):
+    """
+    标签的行式展开（每个视频的每个标签一行），与 video_tags 同步维护，用于在 SQL 中按标签筛选任务
+    """
+    __tablename__ = "video_tag_items"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    platform = Column(String, nullable=False)
+    video_id = Column(String, nullable=False)
+    tag = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("platform", "video_id", "tag", name="uq_video_tag_items_platform_video_id_tag"),
+        Index("ix_video_tag_items_tag", "tag"),
+    )
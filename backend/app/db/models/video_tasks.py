@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, func
 from sqlalchemy.orm import declarative_base
 
 from app.db.engine import Base
@@ -11,4 +11,16 @@ class VideoTask(Base):
     video_id = Column(String, nullable=False)
     platform = Column(String, nullable=False)
     task_id = Column(String, unique=True, nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+
+    # 列表页摘要字段，任务完成时写入，避免列表接口逐个读取结果文件
+    status = Column(String, nullable=True)
+    title = Column(String, nullable=True)
+    cover_url = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
+    video_url = Column(String, nullable=True)
+
+    __table_args__ = (
+        # 按视频查询/删除任务：等值过滤 video_id、platform 后按 created_at 取最新
+        Index("ix_video_tasks_video_platform_created", "video_id", "platform", "created_at"),
+    )
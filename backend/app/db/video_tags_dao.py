@@ -1,9 +1,12 @@
 import json
 from collections import Counter
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 
 from app.db.engine import get_db
-from app.db.models.video_tags import VideoTag
+from app.db.models.video_tags import VideoTag, VideoTagItem
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 def _normalize_tags(tags: List[str]) -> List[str]:
@@ -22,6 +25,19 @@ def _normalize_tags(tags: List[str]) -> List[str]:
     return normalized
 
 
+def _load_tags(tags_json: Optional[str]) -> List[str]:
+    try:
+        data = json.loads(tags_json or "[]")
+    except Exception:
+        return []
+    return _normalize_tags(data) if isinstance(data, list) else []
+
+
+def _replace_tag_items(db, platform: str, video_id: str, tags: List[str]) -> None:
+    db.query(VideoTagItem).filter_by(platform=platform, video_id=video_id).delete(synchronize_session=False)
+    db.add_all([VideoTagItem(platform=platform, video_id=video_id, tag=t) for t in tags])
+
+
 def get_video_tags(platform: str, video_id: str) -> List[str]:
     db = next(get_db())
     try:
@@ -51,6 +67,7 @@ def upsert_video_tags(platform: str, video_id: str, tags: List[str]) -> List[str
         else:
             row = VideoTag(platform=platform, video_id=video_id, tags_json=tags_json)
             db.add(row)
+        _replace_tag_items(db, platform, video_id, normalized)
 
         db.commit()
         return normalized
@@ -81,3 +98,41 @@ def get_tags_stats(platform: Optional[str] = None) -> List[Dict[str, Any]]:
     finally:
         db.close()
 
+
+def get_tags_for_videos(keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], List[str]]:
+    """
+    批量查询多个视频的标签，返回 {(platform, video_id): [tag, ...]}
+    """
+    keys = {(p, v) for p, v in keys if p and v}
+    if not keys:
+        return {}
+    db = next(get_db())
+    try:
+        video_ids = {v for _, v in keys}
+        rows = db.query(VideoTag).filter(VideoTag.video_id.in_(video_ids)).all()
+        return {
+            (r.platform, r.video_id): _load_tags(r.tags_json)
+            for r in rows
+            if (r.platform, r.video_id) in keys
+        }
+    finally:
+        db.close()
+
+
+def sync_tag_items() -> None:
+    """
+    由 video_tags 重建 video_tag_items（仅在行式标签表为空时执行，用于旧库升级）
+    """
+    db = next(get_db())
+    try:
+        if db.query(VideoTagItem.id).first() is not None:
+            return
+        rows = db.query(VideoTag).all()
+        if not rows:
+            return
+        for r in rows:
+            _replace_tag_items(db, r.platform, r.video_id, _load_tags(r.tags_json))
+        db.commit()
+        logger.info(f"已从 video_tags 重建标签索引，共 {len(rows)} 个视频")
+    finally:
+        db.close()
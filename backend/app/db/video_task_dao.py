@@ -1,4 +1,9 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func
+
 from app.db.models.video_tasks import VideoTask
+from app.db.models.video_tags import VideoTagItem
 from app.db.engine import get_db
 from app.utils.logger import get_logger
 
@@ -6,10 +11,13 @@ logger = get_logger(__name__)
 
 
 # 插入任务
-def insert_video_task(video_id: str, platform: str, task_id: str):
+def insert_video_task(video_id: str, platform: str, task_id: str, status: Optional[str] = None,
+                      title: Optional[str] = None, cover_url: Optional[str] = None,
+                      duration: Optional[float] = None, video_url: Optional[str] = None):
     db = next(get_db())
     try:
-        task = VideoTask(video_id=video_id, platform=platform, task_id=task_id)
+        task = VideoTask(video_id=video_id, platform=platform, task_id=task_id, status=status, title=title,
+                         cover_url=cover_url, duration=duration, video_url=video_url)
         db.add(task)
         db.commit()
         db.refresh(task)
@@ -55,6 +63,78 @@ def get_all_tasks():
         db.close()
 
 
+# 缺少摘要字段的任务（升级前创建的记录）
+def get_tasks_without_summary() -> List[VideoTask]:
+    db = next(get_db())
+    try:
+        return db.query(VideoTask).filter(VideoTask.status.is_(None)).all()
+    except Exception as e:
+        logger.error(f"Failed to get tasks without summary: {e}")
+        return []
+    finally:
+        db.close()
+
+
+# 更新任务摘要字段（状态、标题、封面等）
+def update_task_summary(task_id: str, **fields) -> bool:
+    db = next(get_db())
+    try:
+        updated = db.query(VideoTask).filter_by(task_id=task_id).update(fields, synchronize_session=False)
+        db.commit()
+        return updated > 0
+    except Exception as e:
+        logger.error(f"Failed to update task summary: {e}")
+        return False
+    finally:
+        db.close()
+
+
+# 分页查询任务，标签筛选在 SQL 中完成
+def query_video_tasks(
+    tags: Optional[List[str]] = None,
+    match_all: bool = False,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Tuple[List[VideoTask], int]:
+    db = next(get_db())
+    try:
+        query = db.query(VideoTask)
+        if tags:
+            matched = (
+                db.query(VideoTagItem.platform, VideoTagItem.video_id)
+                .filter(VideoTagItem.tag.in_(tags))
+                .group_by(VideoTagItem.platform, VideoTagItem.video_id)
+            )
+            if match_all:
+                matched = matched.having(func.count(func.distinct(VideoTagItem.tag)) == len(set(tags)))
+            matched = matched.subquery()
+            query = query.join(
+                matched,
+                (VideoTask.platform == matched.c.platform) & (VideoTask.video_id == matched.c.video_id),
+            )
+        total = query.count()
+        query = query.order_by(VideoTask.created_at.desc(), VideoTask.id.desc()).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all(), total
+    except Exception as e:
+        logger.error(f"Failed to query tasks: {e}")
+        return [], 0
+    finally:
+        db.close()
+
+
+def get_video_task(task_id: str) -> Optional[VideoTask]:
+    db = next(get_db())
+    try:
+        return db.query(VideoTask).filter_by(task_id=task_id).first()
+    except Exception as e:
+        logger.error(f"Failed to get video task: {e}")
+        return None
+    finally:
+        db.close()
+
+
 def get_task_ids_by_video(video_id: str, platform: str):
     db = next(get_db())
     try:
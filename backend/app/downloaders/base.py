@@ -1,11 +1,19 @@
 import enum
+import subprocess
 
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Union
 
 from app.enmus.note_enums import DownloadQuality
 from app.models.notes_model import AudioDownloadResult
+from app.downloaders.media_cache import media_cache
+from app.services.cancellation import propagate, run_process
+from app.utils.logger import get_logger
 from os import getenv
+
+logger = get_logger(__name__)
+
 QUALITY_MAP = {
     "fast": "32",
     "medium": "64",
@@ -14,6 +22,9 @@ QUALITY_MAP = {
 
 
 class Downloader(ABC):
+    # 媒体缓存中的平台标识，None 表示不经过共享缓存（如本地文件）
+    cache_platform: Optional[str] = None
+
     def __init__(self):
         #TODO 需要修改为可配置
         self.quality = QUALITY_MAP.get('fast')
@@ -36,3 +47,91 @@ class Downloader(ABC):
     def download_video(self, video_url: str,
                        output_dir: Union[str, None] = None) -> str:
         pass
+
+    def download_media(self, video_url: str, output_dir: str = None,
+                       quality: DownloadQuality = "fast", need_video: Optional[bool] = False) -> AudioDownloadResult:
+        '''
+        下载笔记所需的全部媒体，发起网络请求前先查询共享媒体缓存，
+        同一视频的并发请求串行化，保证热门视频只下载一次。
+
+        :return: AudioDownloadResult，need_video 时 video_path 为视频文件路径
+        '''
+        platform = self.cache_platform
+        video_id = self.cache_video_id(video_url) if platform else None
+        if not video_id:
+            audio = self.fetch_media(video_url, output_dir, quality, need_video)
+            if platform:
+                self._register_media(platform, video_url, quality, audio)
+            return audio
+
+        with media_cache.lock(platform, video_id):
+            audio = media_cache.get_audio(platform, video_id, quality)
+            video_path = media_cache.get_video(platform, video_id) if need_video else None
+            if audio and (not need_video or video_path):
+                logger.info(f"命中媒体缓存：{platform}:{video_id}")
+                audio.video_path = video_path
+                return audio
+            if audio:
+                logger.info(f"命中音频缓存，仅下载视频：{platform}:{video_id}")
+                audio.video_path = self.download_video(video_url, output_dir)
+                media_cache.put_video(platform, video_id, audio.video_path, video_url)
+                return audio
+            audio = self.fetch_media(video_url, output_dir, quality, need_video)
+            # 以查询时的键登记，平台返回的 ID 与之不同（如 B 站分P）时下次仍能命中
+            self._register_media(platform, video_url, quality, audio, video_id=video_id)
+            return audio
+
+    def fetch_media(self, video_url: str, output_dir: str = None,
+                    quality: DownloadQuality = "fast", need_video: Optional[bool] = False) -> AudioDownloadResult:
+        '''
+        实际的网络下载。需要视频时默认并发拉取音频与视频（平台分别提供音视频流），
+        支持一次拉取合并视频的下载器可覆盖此方法，只下载一次再在本地分离音轨。
+        '''
+        if not need_video:
+            return self.download(video_url=video_url, output_dir=output_dir, quality=quality, need_video=False)
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="video-download") as pool:
+            video_future = pool.submit(propagate(self.download_video), video_url, output_dir)
+            audio = self.download(video_url=video_url, output_dir=output_dir, quality=quality, need_video=True)
+            video_path = video_future.result()
+        audio.video_path = audio.video_path or video_path
+        return audio
+
+    def cache_video_id(self, video_url: str) -> Optional[str]:
+        '''
+        不下载的前提下确定视频 ID，用于查询媒体缓存。
+        默认通过曾经下载过的链接反查，能从链接直接解析 ID 的下载器可覆盖。
+        '''
+        return media_cache.lookup_video_id(self.cache_platform, video_url)
+
+    @staticmethod
+    def _register_media(platform: str, video_url: str, quality: str, audio: AudioDownloadResult,
+                        video_id: Optional[str] = None) -> None:
+        video_id = video_id or (audio.video_id if audio else None)
+        if not audio or not video_id:
+            return
+        media_cache.put_audio(platform, quality, audio, video_url, video_id=video_id)
+        if audio.video_path:
+            media_cache.put_video(platform, video_id, audio.video_path, video_url)
+
+    @staticmethod
+    def demux_audio(video_path: str, output_path: str) -> str:
+        '''
+        从本地视频中直接复制出音轨（不重新编码）
+
+        :param video_path: 视频文件路径
+        :param output_path: 输出音频路径，扩展名需与音频编码匹配（如 AAC 对应 .m4a）
+        :return: 输出音频路径
+        '''
+        command = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", video_path,
+            "-vn", "-c:a", "copy",
+            "-y", output_path,
+        ]
+        try:
+            run_process(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"分离音轨失败: {e.stderr.decode(errors='ignore') if e.stderr else e}") from e
+        return output_path
+
@@ -1,16 +1,36 @@
 import os
 from abc import ABC
 from typing import Union, Optional
+from urllib.parse import parse_qs, urlparse
 
 import yt_dlp
 
+from app.downloaders.common import ytdlp_fetch_video
+from app.services.cancellation import TaskCanceledError, ytdlp_cancel_hook
 from app.downloaders.base import Downloader, DownloadQuality, QUALITY_MAP
 from app.models.notes_model import AudioDownloadResult
+from app.utils.logger import get_logger
 from app.utils.path_helper import get_data_dir
 from app.utils.url_parser import extract_video_id
 
+logger = get_logger(__name__)
+
+
+def bilibili_media_id(video_url: str) -> Optional[str]:
+    """
+    媒体缓存与本地文件使用的视频 ID：分P视频按 yt-dlp 的命名规则带上 _p{N}（如 BV1xx_p2），
+    不同分P分别缓存，也不会共用同一把下载锁
+    """
+    video_id = extract_video_id(video_url, "bilibili")
+    if not video_id:
+        return None
+    part = parse_qs(urlparse(video_url).query).get("p", [""])[-1]
+    return f"{video_id}_p{part}" if part.isdigit() else video_id
+
 
 class BilibiliDownloader(Downloader, ABC):
+    cache_platform = "bilibili"
+
     def __init__(self):
         super().__init__()
 
@@ -32,15 +52,10 @@ class BilibiliDownloader(Downloader, ABC):
         ydl_opts = {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
             'outtmpl': output_path,
-            'postprocessors': [
-                {
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '64',
-                }
-            ],
+            # 保留原始音频流（通常为 m4a），不再转码为 mp3
             'noplaylist': True,
             'quiet': False,
+            'progress_hooks': [ytdlp_cancel_hook()],  # 任务取消时中断下载
         }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -49,7 +64,8 @@ class BilibiliDownloader(Downloader, ABC):
             title = info.get("title")
             duration = info.get("duration", 0)
             cover_url = info.get("thumbnail")
-            audio_path = os.path.join(output_dir, f"{video_id}.mp3")
+            ext = info.get("ext", "m4a")
+            audio_path = os.path.join(output_dir, f"{video_id}.{ext}")
 
         return AudioDownloadResult(
             file_path=audio_path,
@@ -62,6 +78,54 @@ class BilibiliDownloader(Downloader, ABC):
             video_path=None  # ❗音频下载不包含视频路径
         )
 
+    def cache_video_id(self, video_url: str) -> Optional[str]:
+        return bilibili_media_id(video_url) or super().cache_video_id(video_url)
+
+    def fetch_media(
+        self,
+        video_url: str,
+        output_dir: Union[str, None] = None,
+        quality: DownloadQuality = "fast",
+        need_video: Optional[bool] = False
+    ) -> AudioDownloadResult:
+        """
+        需要视频时只走一次 yt-dlp：下载带音轨的合并视频，再在本地无损分离出音频
+        """
+        if not need_video:
+            return self.download(video_url, output_dir, quality, need_video=False)
+        if output_dir is None:
+            output_dir = get_data_dir()
+
+        info, video_path = ytdlp_fetch_video(
+            video_url,
+            output_dir,
+            ydl_format="bv*[ext=mp4]+ba[ext=m4a]/bestvideo+bestaudio/best",
+            known_video_id=bilibili_media_id(video_url),
+        )
+        video_id = info.get("id")
+        audio_path = os.path.join(output_dir, f"{video_id}.m4a")
+        try:
+            self.demux_audio(video_path, audio_path)
+        except TaskCanceledError:
+            raise
+        except Exception as e:
+            # 旧版本下载的视频可能不含音轨，退回单独下载音频
+            logger.warning(f"分离音轨失败，单独下载音频: {e}")
+            audio = self.download(video_url, output_dir, quality, need_video=True)
+            audio.video_path = video_path
+            return audio
+
+        return AudioDownloadResult(
+            file_path=audio_path,
+            title=info.get("title"),
+            duration=info.get("duration", 0),
+            cover_url=info.get("thumbnail"),
+            platform="bilibili",
+            video_id=video_id,
+            raw_info=info,
+            video_path=video_path
+        )
+
     def download_video(
         self,
         video_url: str,
@@ -90,6 +154,7 @@ class BilibiliDownloader(Downloader, ABC):
             'outtmpl': output_path,
             'noplaylist': True,
             'quiet': False,
+            'progress_hooks': [ytdlp_cancel_hook()],  # 任务取消时中断下载
             'merge_output_format': 'mp4',  # 确保合并成 mp4
         }
 
@@ -1 +1,35 @@
-# def download():
+import os
+from typing import Optional, Tuple
+
+import yt_dlp
+
+from app.services.cancellation import ytdlp_cancel_hook
+
+
+def ytdlp_fetch_video(video_url: str, output_dir: str, ydl_format: str,
+                      known_video_id: Optional[str] = None) -> Tuple[dict, str]:
+    """
+    用 yt-dlp 下载合并后的 mp4（含音轨）。本地已有同名视频时只拉取元信息，不重复下载。
+
+    :param video_url: 视频链接
+    :param output_dir: 输出目录
+    :param ydl_format: yt-dlp format 表达式，需包含音频流
+    :param known_video_id: 从链接解析出的视频 ID，用于提前判断本地文件是否存在
+    :return: (yt-dlp info 字典, 视频文件路径)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    existing = os.path.join(output_dir, f"{known_video_id}.mp4") if known_video_id else None
+    ydl_opts = {
+        'format': ydl_format,
+        'outtmpl': os.path.join(output_dir, "%(id)s.%(ext)s"),
+        'noplaylist': True,
+        'quiet': False,
+        'progress_hooks': [ytdlp_cancel_hook()],  # 任务取消时中断下载
+        'merge_output_format': 'mp4',
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(video_url, download=not (existing and os.path.exists(existing)))
+    video_path = os.path.join(output_dir, f"{info.get('id')}.mp4")
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"视频文件未找到: {video_path}")
+    return info, video_path
@@ -110,6 +110,8 @@ class BaseRequestModel(BaseModel):
 
 
 class DouyinDownloader(Downloader):
+    cache_platform = "douyin"
+
     def __init__(self, cookie=None):
         super().__init__()
         self.headers_config = DouyinConfig.HEADERS.copy()
@@ -207,6 +209,9 @@ class DouyinDownloader(Downloader):
             raise ValueError("请求失败:", e)
         # print(kwargs)
 
+    def cache_video_id(self, video_url: str) -> Optional[str]:
+        return self.extract_video_id(video_url) or super().cache_video_id(video_url)
+
     def download(
             self,
             video_url: str,
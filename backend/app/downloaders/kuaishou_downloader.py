@@ -1,5 +1,4 @@
 import os
-import subprocess
 from abc import ABC
 from typing import Union, Optional
 
@@ -9,10 +8,13 @@ from app.downloaders.base import Downloader
 from app.downloaders.kuaishou_helper.kuaishou import KuaiShou
 from app.enmus.note_enums import DownloadQuality
 from app.models.audio_model import AudioDownloadResult
+from app.utils.audio_helper import extract_native_audio
 from app.utils.path_helper import get_data_dir
 
 
 class KuaiShouDownloader(Downloader, ABC):
+    cache_platform = "kuaishou"
+
     def __init__(self):
         super().__init__()
 
@@ -36,12 +38,17 @@ class KuaiShouDownloader(Downloader, ABC):
         video_id = photo_info['id']
         title = photo_info['caption'].strip().replace('\n', '').replace(' ', '_')[:50]
         mp4_path = os.path.join(output_dir, f"{video_id}.mp4")
-        mp3_path = os.path.join(output_dir, f"{video_id}.mp3")
+        # 音轨从 mp4 原样复制出来，扩展名取决于编码（通常为 m4a）；兼容旧版本转码得到的 mp3
+        audio_path = next(
+            (path for path in (os.path.join(output_dir, f"{video_id}.{ext}") for ext in ("m4a", "mp3"))
+             if os.path.exists(path)),
+            None,
+        )
 
-        if os.path.exists(mp3_path):
-            print(f"[已存在] 跳过下载: {mp3_path}")
+        if audio_path and os.path.exists(mp4_path):
+            print(f"[已存在] 跳过下载: {audio_path}")
             return AudioDownloadResult(
-                file_path=mp3_path,
+                file_path=audio_path,
                 title=title,
                 duration=photo_info['duration'],
                 cover_url=photo_info['coverUrl'],
@@ -62,16 +69,14 @@ class KuaiShouDownloader(Downloader, ABC):
         else:
             raise Exception(f"视频下载失败: {resp.status_code}")
 
-        # 使用 ffmpeg 转换为 mp3
+        # 直接复制音轨，不再转码为 mp3
         try:
-            subprocess.run([
-                "ffmpeg", "-y", "-i", mp4_path, "-vn", "-acodec", "libmp3lame", mp3_path
-            ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        except subprocess.CalledProcessError:
-            raise Exception("ffmpeg 转换 MP3 失败")
+            audio_path = extract_native_audio(mp4_path)
+        except RuntimeError as e:
+            raise Exception(f"ffmpeg 提取音轨失败: {e}")
 
         return AudioDownloadResult(
-            file_path=mp3_path,
+            file_path=audio_path,
             title=photo_info['caption'],
             duration=photo_info['duration'],
             cover_url=photo_info['coverUrl'],
@@ -83,6 +88,16 @@ class KuaiShouDownloader(Downloader, ABC):
             video_path=mp4_path
         )
 
+    def fetch_media(
+            self,
+            video_url: str,
+            output_dir: Union[str, None] = None,
+            quality: str = "fast",
+            need_video: Optional[bool] = False
+    ) -> AudioDownloadResult:
+        # 快手只提供合并后的 mp4，download 已经同时产出视频与音频
+        return self.download(video_url, output_dir, quality, need_video)
+
     def download_video(
             self,
             video_url: str,
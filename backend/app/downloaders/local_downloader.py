@@ -4,8 +4,10 @@ from abc import ABC
 from typing import Optional
 
 from app.downloaders.base import Downloader
+from app.services.cancellation import run_process
 from app.enmus.note_enums import DownloadQuality
 from app.models.audio_model import AudioDownloadResult
+from app.utils.audio_helper import extract_native_audio
 import os
 import subprocess
 
@@ -44,7 +46,7 @@ class LocalDownloader(Downloader, ABC):
                 '-y',  # 覆盖
                 output_path
             ]
-            subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            run_process(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
 
             if not os.path.exists(output_path):
                 raise RuntimeError(f"封面图片生成失败: {output_path}")
@@ -77,7 +79,7 @@ class LocalDownloader(Downloader, ABC):
                 output_path
             ]
 
-            subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+            run_process(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
 
             if not os.path.exists(output_path):
                 raise RuntimeError(f"mp3 文件生成失败: {output_path}")
@@ -117,6 +119,16 @@ class LocalDownloader(Downloader, ABC):
             raise FileNotFoundError()
         return video_url
 
+    def fetch_media(
+            self,
+            video_url: str,
+            output_dir: str = None,
+            quality: DownloadQuality = "fast",
+            need_video: Optional[bool] = False
+    ) -> AudioDownloadResult:
+        # 本地文件本身就是视频，download 已返回 video_path
+        return self.download(video_url, output_dir, quality, need_video)
+
     def download(
             self,
             video_url: str,
@@ -143,7 +155,8 @@ class LocalDownloader(Downloader, ABC):
         file_name = os.path.basename(video_url)
         title, _ = os.path.splitext(file_name)
         print(title, file_name,video_url)
-        file_path=self.convert_to_mp3(video_url)
+        # 原样复制音轨，编码无法直接封装时才解码，不再有损转码为 mp3
+        file_path = extract_native_audio(video_url)
         cover_path = self.extract_cover(video_url)
         cover_url = save_cover_to_static(cover_path)
         
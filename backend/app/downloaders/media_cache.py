@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.models.audio_model import AudioDownloadResult
+from app.utils.audio_helper import pcm_path_for
+from app.utils.disk_cache import DiskCacheIndex, file_sha256
+from app.utils.logger import get_logger
+from app.utils.path_helper import get_data_dir
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# 下载的音视频默认就放在 data 目录，缓存只负责登记与淘汰
+MEDIA_CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", get_data_dir()))
+MEDIA_CACHE_MAX_MB = int(os.getenv("MEDIA_CACHE_MAX_MB", "10240"))
+# 最近访问过的文件可能仍在转写/截图中，这段时间内不参与淘汰
+MEDIA_CACHE_MIN_IDLE_SECONDS = float(os.getenv("MEDIA_CACHE_MIN_IDLE_SECONDS", "3600"))
+
+
+def build_media_key(platform: str, video_id: str, kind: str, quality: str = "") -> str:
+    """
+    媒体缓存键：音频按 (平台, 视频 ID, 质量) 区分，视频与质量无关
+    """
+    return "|".join([platform, video_id, kind, quality or ""])
+
+
+class _MediaIndex(DiskCacheIndex):
+    def can_evict(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - float(entry.get("last_access", 0)) >= MEDIA_CACHE_MIN_IDLE_SECONDS
+
+    def companion_files(self, entry: Dict[str, Any]) -> list[Path]:
+        # 本地 whisper 转写时解码出的 16kHz PCM 与媒体文件同生命周期，随条目一起淘汰
+        return [Path(pcm_path_for(str(self.path_for(entry["file"]))))]
+
+
+class MediaCache:
+    """
+    跨任务共享的音视频下载缓存。
+
+    以 (平台, 视频 ID, 质量) 登记已下载的音频与视频，记录大小、sha256 与最近访问时间，
+    下载器在发起网络请求前先查询；同一视频的并发下载按键串行化，先到的任务下载，其余任务直接命中缓存。
+    总大小超出配额时按 LRU 淘汰并删除文件（连同由其解码出的 PCM）。
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.index = _MediaIndex(root, max_bytes=max_bytes, index_path=Path(root) / "media_cache_index.json")
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def lock(self, platform: str, video_id: str) -> threading.Lock:
+        """
+        获取某个视频的下载锁，持有期间其他任务对同一视频的下载会等待
+        """
+        key = f"{platform}|{video_id}"
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def lookup_video_id(self, platform: str, video_url: str) -> Optional[str]:
+        """
+        通过曾经下载过的原始链接反查视频 ID，用于无法从链接直接解析 ID 的平台（如短链）
+        """
+        for key in self.index.keys():
+            entry = self.index.peek(key)
+            if entry and entry.get("platform") == platform and video_url in entry.get("urls", []):
+                return entry.get("video_id")
+        return None
+
+    def manages(self, file_path: str) -> bool:
+        """
+        文件是否登记在媒体缓存中。缓存中的文件由多个任务共享，只能由缓存按容量淘汰，调用方不应直接删除
+        """
+        try:
+            target = Path(file_path).resolve()
+        except Exception:
+            return False
+        for key in self.index.keys():
+            entry = self.index.peek(key)
+            if entry and self.index.path_for(entry["file"]).resolve() == target:
+                return True
+        return False
+
+    def get_audio(self, platform: str, video_id: str, quality: str) -> Optional[AudioDownloadResult]:
+        entry = self.index.get(build_media_key(platform, video_id, "audio", quality))
+        if not entry:
+            return None
+        try:
+            audio = AudioDownloadResult(**entry["result"])
+            audio.file_path = str(self.index.path_for(entry["file"]))
+            audio.video_path = None
+            return audio
+        except Exception as exc:
+            logger.warning(f"读取媒体缓存条目失败，忽略：{platform}:{video_id} ({exc})")
+            return None
+
+    def get_video(self, platform: str, video_id: str) -> Optional[str]:
+        entry = self.index.get(build_media_key(platform, video_id, "video"))
+        return str(self.index.path_for(entry["file"])) if entry else None
+
+    def put_audio(self, platform: str, quality: str, audio: AudioDownloadResult, video_url: str = "",
+                  video_id: Optional[str] = None) -> None:
+        """
+        :param video_id: 缓存键中的视频 ID，默认为 audio.video_id；需与查询时使用的 ID 一致
+        """
+        video_id = video_id or audio.video_id
+        result = asdict(audio)
+        result.pop("video_path", None)
+        self._put(build_media_key(platform, video_id, "audio", quality), audio.file_path,
+                  platform=platform, video_id=video_id, kind="audio", quality=quality,
+                  video_url=video_url, result=result)
+
+    def put_video(self, platform: str, video_id: str, video_path: str, video_url: str = "") -> None:
+        self._put(build_media_key(platform, video_id, "video"), video_path,
+                  platform=platform, video_id=video_id, kind="video", video_url=video_url)
+
+    def _put(self, key: str, file_path: str, video_url: str = "", **meta: Any) -> None:
+        if not file_path or not os.path.exists(file_path):
+            return
+        path = Path(file_path).resolve()
+        root = self.index.root.resolve()
+        # data 目录内的文件记录相对路径，自定义输出目录的文件记录绝对路径
+        filename = str(path.relative_to(root)) if path.is_relative_to(root) else str(path)
+        with self.index.transaction():
+            old = self.index.peek(key)
+            if old and old["file"] == filename and old.get("size") == path.stat().st_size:
+                self.index.update(key, urls=self._merge_urls(old, video_url))
+                return
+        try:
+            # 计算 sha256 耗时较长，不在索引锁内进行；登记时重新合并其他进程期间写入的链接
+            checksum = file_sha256(str(path))
+            with self.index.transaction():
+                urls = self._merge_urls(self.index.peek(key), video_url)
+                self.index.put(key, filename, checksum=checksum, urls=urls, **meta)
+        except Exception as exc:
+            logger.warning(f"登记媒体缓存失败：{file_path} ({exc})")
+
+    @staticmethod
+    def _merge_urls(entry: Optional[Dict[str, Any]], video_url: str) -> list:
+        urls = list(entry.get("urls", [])) if entry else []
+        if video_url and video_url not in urls:
+            urls.append(video_url)
+        return urls
+
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_MB * 1024 * 1024)
@@ -4,13 +4,20 @@ from typing import Union, Optional
 
 import yt_dlp
 
+from app.downloaders.common import ytdlp_fetch_video
+from app.services.cancellation import TaskCanceledError, ytdlp_cancel_hook
 from app.downloaders.base import Downloader, DownloadQuality
 from app.models.notes_model import AudioDownloadResult
+from app.utils.logger import get_logger
 from app.utils.path_helper import get_data_dir
 from app.utils.url_parser import extract_video_id
 
+logger = get_logger(__name__)
+
 
 class YoutubeDownloader(Downloader, ABC):
+    cache_platform = "youtube"
+
     def __init__(self):
 
         super().__init__()
@@ -35,6 +42,7 @@ class YoutubeDownloader(Downloader, ABC):
             'outtmpl': output_path,
             'noplaylist': True,
             'quiet': False,
+            'progress_hooks': [ytdlp_cancel_hook()],  # 任务取消时中断下载
         }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -58,6 +66,54 @@ class YoutubeDownloader(Downloader, ABC):
             video_path=None  # ❗音频下载不包含视频路径
         )
 
+    def cache_video_id(self, video_url: str) -> Optional[str]:
+        return extract_video_id(video_url, "youtube") or super().cache_video_id(video_url)
+
+    def fetch_media(
+        self,
+        video_url: str,
+        output_dir: Union[str, None] = None,
+        quality: DownloadQuality = "fast",
+        need_video: Optional[bool] = False
+    ) -> AudioDownloadResult:
+        """
+        需要视频时只走一次 yt-dlp：下载带音轨的合并视频，再在本地无损分离出音频
+        """
+        if not need_video:
+            return self.download(video_url, output_dir, quality, need_video=False)
+        if output_dir is None:
+            output_dir = get_data_dir()
+
+        info, video_path = ytdlp_fetch_video(
+            video_url,
+            output_dir,
+            ydl_format="bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]",
+            known_video_id=extract_video_id(video_url, "youtube"),
+        )
+        video_id = info.get("id")
+        audio_path = os.path.join(output_dir, f"{video_id}.m4a")
+        try:
+            self.demux_audio(video_path, audio_path)
+        except TaskCanceledError:
+            raise
+        except Exception as e:
+            # 旧版本下载的视频可能不含音轨，退回单独下载音频
+            logger.warning(f"分离音轨失败，单独下载音频: {e}")
+            audio = self.download(video_url, output_dir, quality, need_video=True)
+            audio.video_path = video_path
+            return audio
+
+        return AudioDownloadResult(
+            file_path=audio_path,
+            title=info.get("title"),
+            duration=info.get("duration", 0),
+            cover_url=info.get("thumbnail"),
+            platform="youtube",
+            video_id=video_id,
+            raw_info={'tags': info.get('tags')},
+            video_path=video_path
+        )
+
     def download_video(
         self,
         video_url: str,
@@ -80,6 +136,7 @@ class YoutubeDownloader(Downloader, ABC):
             'outtmpl': output_path,
             'noplaylist': True,
             'quiet': False,
+            'progress_hooks': [ytdlp_cancel_hook()],  # 任务取消时中断下载
             'merge_output_format': 'mp4',  # 确保合并成 mp4
         }
 
@@ -16,6 +16,18 @@ class ProviderErrorEnum(enum.Enum):
 class NoteErrorEnum(enum.Enum):
     PLATFORM_NOT_SUPPORTED = (300101 ,"选择的平台不受支持")
 
+    def __init__(self, code, message):
+        self.code = code
+        self.message = message
+
+class UploadErrorEnum(enum.Enum):
+    SESSION_NOT_FOUND = (300201, "上传会话不存在或已过期")
+    OFFSET_MISMATCH = (300202, "分片偏移与服务端不一致")
+    CHECKSUM_MISMATCH = (300203, "分片校验失败")
+    INCOMPLETE = (300204, "文件尚未上传完整")
+    SIZE_EXCEEDED = (300205, "上传内容超出声明的文件大小")
+    SIZE_INVALID = (300206, "文件大小必须大于 0")
+
     def __init__(self, code, message):
         self.code = code
         self.message = message
\ No newline at end of file
@@ -1,13 +1,15 @@
 from abc import ABC,abstractmethod
+from typing import Callable, Optional
 
 from app.models.gpt_model import GPTSource
 
 
 class GPT(ABC):
-    def summarize(self, source:GPTSource )->str:
+    def summarize(self, source:GPTSource, on_delta: Optional[Callable[[str], None]] = None)->str:
         '''
 
         :param source: 
+        :param on_delta: 可选，流式生成时每段增量文本的回调
         :return:
         '''
         pass
@@ -2,6 +2,7 @@ from openai import OpenAI
 
 from app.gpt.base import GPT
 from app.gpt.provider.OpenAI_compatible_provider import OpenAICompatibleProvider
+from app.gpt.rate_limiter import get_governor
 from app.gpt.universal_gpt import UniversalGPT
 from app.models.model_config import ModelConfig
 
@@ -9,5 +10,16 @@ from app.models.model_config import ModelConfig
 class GPTFactory:
     @staticmethod
     def from_config(config: ModelConfig) -> GPT:
-        client = OpenAICompatibleProvider(api_key=config.api_key, base_url=config.base_url).get_client
-        return UniversalGPT(client=client, model=config.model_name)
\ No newline at end of file
+        if not config.provider_id:
+            client = OpenAICompatibleProvider(api_key=config.api_key, base_url=config.base_url).get_client
+            return UniversalGPT(client=client, model=config.model_name)
+
+        # 限流与重试交给进程内共享的调度器，SDK 自带的重试会绕过它，因此关闭
+        client = OpenAICompatibleProvider(api_key=config.api_key, base_url=config.base_url, max_retries=0).get_client
+        governor = get_governor(
+            config.provider_id,
+            rpm=config.rpm_limit,
+            tpm=config.tpm_limit,
+            max_concurrency=config.max_concurrency,
+        )
+        return UniversalGPT(client=client, model=config.model_name, governor=governor)
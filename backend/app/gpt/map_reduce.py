@@ -0,0 +1,87 @@
+import os
+from typing import Callable, List
+
+from dotenv import load_dotenv
+
+from app.gpt.token_estimator import estimate_tokens
+from app.models.transcriber_model import TranscriptSegment
+
+load_dotenv()
+
+# 分段总结模式：auto（超出上下文预算时启用）/ always / never
+GPT_MAP_REDUCE = os.getenv("GPT_MAP_REDUCE", "auto").lower()
+# 单次请求允许的转写/局部笔记 token 预算，超出即走分段总结
+GPT_CONTEXT_TOKENS = int(os.getenv("GPT_CONTEXT_TOKENS", "24000"))
+# 每个窗口的 token 预算与相邻窗口重叠的 token 数
+GPT_WINDOW_TOKENS = int(os.getenv("GPT_WINDOW_TOKENS", "6000"))
+GPT_WINDOW_OVERLAP_TOKENS = int(os.getenv("GPT_WINDOW_OVERLAP_TOKENS", "300"))
+# 同时进行的分段总结请求数
+GPT_MAP_CONCURRENCY = max(1, int(os.getenv("GPT_MAP_CONCURRENCY", "4")))
+
+
+def split_segments_into_windows(
+    segments: List[TranscriptSegment],
+    render: Callable[[TranscriptSegment], str],
+    window_tokens: int = GPT_WINDOW_TOKENS,
+    overlap_tokens: int = GPT_WINDOW_OVERLAP_TOKENS,
+) -> List[List[TranscriptSegment]]:
+    """
+    按 token 预算把转写片段切成连续窗口，相邻窗口末尾/开头重叠约 overlap_tokens，
+    避免句子或话题在窗口边界被切断。单个片段超出预算时独占一个窗口。
+
+    :param segments: 按时间排序的转写片段
+    :param render: 片段渲染为 prompt 文本的函数，用于估算 token
+    :param window_tokens: 每个窗口的 token 预算
+    :param overlap_tokens: 重叠部分的 token 预算
+    :return: 窗口列表
+    """
+    windows: List[List[TranscriptSegment]] = []
+    current: List[TranscriptSegment] = []
+    costs: List[int] = []
+    tokens = 0
+    fresh = 0  # 当前窗口中不属于重叠部分的片段数
+
+    for seg in segments:
+        cost = estimate_tokens(render(seg))
+        if fresh and tokens + cost > window_tokens:
+            windows.append(current)
+            # 从上一窗口尾部取重叠片段
+            tail, tail_costs, tail_tokens = [], [], 0
+            for s, c in zip(reversed(current), reversed(costs)):
+                if tail_tokens + c > overlap_tokens or len(tail) + 1 >= len(current):
+                    break
+                tail.insert(0, s)
+                tail_costs.insert(0, c)
+                tail_tokens += c
+            current, costs, tokens, fresh = tail, tail_costs, tail_tokens, 0
+        current.append(seg)
+        costs.append(cost)
+        tokens += cost
+        fresh += 1
+
+    if fresh:
+        windows.append(current)
+    return windows
+
+
+def group_for_reduce(parts: List[str], budget: int = GPT_CONTEXT_TOKENS) -> List[List[str]]:
+    """
+    将局部笔记按顺序分组，使每组估算 token 不超过 budget，用于多层合并。
+    每组至少包含两段（除非只剩一段），保证每一层合并都能减少段数。
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    tokens = 0
+    for part in parts:
+        cost = estimate_tokens(part)
+        if len(current) >= 2 and tokens + cost > budget:
+            groups.append(current)
+            current, tokens = [], 0
+        current.append(part)
+        tokens += cost
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
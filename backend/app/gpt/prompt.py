@@ -66,4 +66,51 @@ SCREENSHOT='''
 8. **Screenshot placeholders**: If a section involves **visual demonstrations, code walkthroughs, UI interactions**, or any content where visuals aid understanding, insert a screenshot cue at the end of that section:
    - Format: `*Screenshot-[mm:ss]`
    - Only use it when truly helpful.
-'''
\ No newline at end of file
+'''
+
+# 长视频分段总结（map 阶段）：每个窗口独立生成局部笔记
+MAP_PROMPT = '''
+你是一个专业的笔记助手。下面是视频《{video_title}》的第 {window_index}/{window_count} 段转录内容（时间范围 {start_time} - {end_time}），
+与相邻片段有少量重叠。请只针对这一段生成局部笔记，稍后会与其他片段的笔记合并成完整笔记。
+
+要求：
+- 使用 **中文** 撰写，专有名词、技术术语、品牌名称和人名可保留 **英文**。
+- 仅返回 **Markdown 内容**，不要包裹在代码块中，不要写开头引言或全文总结。
+- 使用 `##` 作为主要章节标题，保留重要事实、示例、结论、数学公式（LaTeX）。
+- 省略广告、填充词、问候语等无关内容。
+- 所有时间均使用原视频时间（即下面分段中给出的时间），不要从 00:00 重新计时。
+
+视频分段（格式：开始时间 - 内容）：
+
+---
+{segment_text}
+---
+'''
+
+# 长视频分段总结（reduce 阶段）：合并多个局部笔记
+REDUCE_PROMPT = '''
+你是一个专业的笔记助手。下面是视频《{video_title}》按时间顺序分段生成的局部笔记（共 {part_count} 段），
+相邻片段的笔记可能因转录重叠而有重复内容。
+
+视频标签：
+{tags}
+
+你的任务：将这些局部笔记合并为一份结构清晰、完整的 Markdown 笔记。
+1. 按时间顺序组织章节，合并重复或被截断的内容，统一标题层级。
+2. 保留所有重要事实、示例、结论和数学公式，不要过度压缩。
+3. **必须原样保留** 局部笔记中出现的 `*Content-[mm:ss]` 与 `*Screenshot-[mm:ss]` 标记（包括时间值），
+   合并重复章节时保留较早的那个标记，不得修改、编造或删除时间标记。
+4. 笔记使用 **中文** 撰写，仅返回最终的 **Markdown 内容**，不要包裹在代码块中。
+   避免将编号标题写成有序列表（使用 `1\\. **内容**` 或 `## 1. 内容`）。
+
+局部笔记：
+
+---
+{partial_notes}
+---
+'''
+
+# 合并阶段仅在确有格式/风格/额外要求时才追加该标题
+REDUCE_EXTRA_HEADER = '''
+额外重要的任务如下(每一个都必须严格完成):
+'''
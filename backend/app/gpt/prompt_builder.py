@@ -1,4 +1,4 @@
-from app.gpt.prompt import BASE_PROMPT
+from app.gpt.prompt import BASE_PROMPT, MAP_PROMPT, REDUCE_EXTRA_HEADER, REDUCE_PROMPT
 
 note_formats = [
     {'label': '目录', 'value': 'toc'},
@@ -43,6 +43,51 @@ def generate_base_prompt(title, segment_text, tags, _format=None, style=None, ex
     return prompt
 
 
+# 分段阶段即需插入的格式（依赖原始时间戳）
+MAP_FORMATS = ('link', 'screenshot')
+
+
+# 生成分段总结（map 阶段）的 Prompt：只附加与时间相关的格式要求，目录与总结留到合并阶段
+def generate_map_prompt(title, segment_text, window_index, window_count, start_time, end_time,
+                        _format=None, style=None):
+    prompt = MAP_PROMPT.format(
+        video_title=title,
+        window_index=window_index,
+        window_count=window_count,
+        start_time=start_time,
+        end_time=end_time,
+        segment_text=segment_text,
+    )
+    if _format:
+        prompt += "\n" + "\n".join([get_format_function(f) for f in _format if f in MAP_FORMATS])
+    if style:
+        prompt += "\n" + get_style_format(style)
+    return prompt
+
+
+# 生成合并（reduce 阶段）的 Prompt；final=False 时为中间层合并，不附加目录/总结等全文格式
+def generate_reduce_prompt(title, partial_notes, tags, _format=None, style=None, extras=None, final=True):
+    prompt = REDUCE_PROMPT.format(
+        video_title=title,
+        part_count=len(partial_notes),
+        tags=tags,
+        partial_notes="\n\n---\n\n".join(partial_notes),
+    )
+    if not final:
+        return prompt
+    tasks = []
+    if _format:
+        tasks += [get_format_function(f) for f in _format if f not in MAP_FORMATS]
+    if style:
+        tasks.append(get_style_format(style))
+    if extras:
+        tasks.append(extras)
+    tasks = [t for t in tasks if t.strip()]
+    if tasks:
+        prompt += REDUCE_EXTRA_HEADER + "\n" + "\n".join(tasks)
+    return prompt
+
+
 # 获取格式函数
 def get_format_function(format_type):
     format_map = {
@@ -6,8 +6,11 @@ from app.utils.logger import get_logger
 
 logging= get_logger(__name__)
 class OpenAICompatibleProvider:
-    def __init__(self, api_key: str, base_url: str, model: Union[str, None]=None):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+    def __init__(self, api_key: str, base_url: str, model: Union[str, None]=None, max_retries: Optional[int] = None):
+        if max_retries is None:
+            self.client = OpenAI(api_key=api_key, base_url=base_url)
+        else:
+            self.client = OpenAI(api_key=api_key, base_url=base_url, max_retries=max_retries)
         self.model = model
 
     @property
@@ -0,0 +1,248 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, TypeVar
+
+import openai
+from dotenv import load_dotenv
+
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# providers 表未配置限额时的默认值，RPM/TPM 为 0 表示不限制
+LLM_DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "0"))
+LLM_DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "0"))
+# 同一供应商的最大在途请求数（至少为 1）
+LLM_DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_DEFAULT_MAX_CONCURRENCY", "4"))
+# 遇到 429 / 5xx / 连接错误时的重试次数与退避参数（秒）
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "60"))
+
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    每分钟 capacity 个令牌、匀速回填的令牌桶。余额允许为负：
+    实际消耗（如响应里的 usage）超出预估时记为欠账，后续请求等待回填。
+    """
+
+    def __init__(self, per_minute: int):
+        self._lock = threading.Lock()
+        self.per_minute = 0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.reconfigure(per_minute)
+
+    def reconfigure(self, per_minute: int) -> None:
+        with self._lock:
+            if per_minute == self.per_minute:
+                return
+            self.per_minute = per_minute
+            self._tokens = float(per_minute)
+            self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.per_minute), self._tokens + (now - self._updated) * self.per_minute / 60.0)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        预占 amount 个令牌，返回需要等待的秒数（0 表示可立即执行）。
+        不足时不扣减，调用方等待后重新 reserve。
+        """
+        with self._lock:
+            if self.per_minute <= 0:
+                return 0.0
+            # 单次需求超过桶容量时按满桶计算，避免永远等不到
+            amount = min(amount, float(self.per_minute))
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) * 60.0 / self.per_minute
+
+    def consume(self, amount: float) -> None:
+        """直接扣减（可扣为负），用于按实际用量补记"""
+        with self._lock:
+            if self.per_minute <= 0:
+                return
+            self._refill()
+            self._tokens -= amount
+
+
+class ProviderGovernor:
+    """
+    单个模型供应商的调用调度：RPM/TPM 令牌桶 + 在途请求上限 + 按 Retry-After 的自适应退避。
+
+    在途上限采用加性增、乘性减：收到 429 时减半并暂停到 Retry-After 指定的时间，
+    之后每次成功逐步恢复到配置上限，使吞吐稳定在供应商的配额附近，而不是在过载与空闲之间来回震荡。
+    同一进程内所有队列 worker 共享同一个实例（见 get_governor）。
+    """
+
+    def __init__(self, provider_id: str, rpm: int, tpm: int, max_concurrency: int):
+        self.provider_id = provider_id
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self.max_concurrency = max(1, max_concurrency)
+        self._limit = float(self.max_concurrency)
+        self._blocked_until = 0.0
+
+    def reconfigure(self, rpm: int, tpm: int, max_concurrency: int) -> None:
+        self._requests.reconfigure(rpm)
+        self._tokens.reconfigure(tpm)
+        with self._cond:
+            max_concurrency = max(1, max_concurrency)
+            if max_concurrency != self.max_concurrency:
+                self.max_concurrency = max_concurrency
+                self._limit = min(self._limit, float(max_concurrency))
+                self._cond.notify_all()
+
+    def call(self, fn: Callable[[], T], estimated_tokens: int = 0,
+             usage_of: Optional[Callable[[T], Optional[int]]] = None,
+             can_retry: Optional[Callable[[], bool]] = None) -> T:
+        """
+        在限额内执行 fn，可重试的错误按退避策略重试
+
+        :param fn: 实际发起请求的函数
+        :param estimated_tokens: 预估 token 数（prompt），用于 TPM 预占
+        :param usage_of: 从返回值中取实际 token 用量的函数，用于补记超出预估的部分
+        :param can_retry: 出错时是否允许重试（如流式输出已经回调过部分内容时不能重来）
+        """
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)
+            try:
+                result = fn()
+            except Exception as exc:
+                self._release()
+                delay = self._on_error(exc, attempt)
+                if delay is None or attempt >= LLM_MAX_RETRIES or (can_retry is not None and not can_retry()):
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"[{self.provider_id}] 请求失败（{type(exc).__name__}），{delay:.1f}s 后第 {attempt} 次重试"
+                )
+                continue
+            self._release()
+            self._on_success()
+            if usage_of is not None:
+                used = usage_of(result)
+                if used and used > estimated_tokens:
+                    self._tokens.consume(used - estimated_tokens)
+            return result
+
+    # ---------------- 内部 ----------------
+
+    def _acquire(self, estimated_tokens: int) -> None:
+        with self._cond:
+            while True:
+                wait = self._blocked_until - time.monotonic()
+                if wait <= 0 and self._in_flight < max(1, int(self._limit)):
+                    break
+                self._cond.wait(timeout=wait if wait > 0 else None)
+            self._in_flight += 1
+        try:
+            for bucket, amount in ((self._requests, 1), (self._tokens, estimated_tokens)):
+                while True:
+                    wait = bucket.reserve(amount)
+                    if wait <= 0:
+                        break
+                    time.sleep(wait)
+        except BaseException:
+            self._release()
+            raise
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def _on_success(self) -> None:
+        with self._cond:
+            if self._limit < self.max_concurrency:
+                self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+                self._cond.notify_all()
+
+    def _on_error(self, exc: Exception, attempt: int) -> Optional[float]:
+        """
+        判断是否可重试并登记退避，返回等待秒数；不可重试时返回 None
+        """
+        status = getattr(exc, "status_code", None)
+        if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+            rate_limited = False
+        elif status in _RETRYABLE_STATUS:
+            rate_limited = status == 429
+        else:
+            return None
+
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+
+        with self._cond:
+            if rate_limited:
+                # 429 说明已经超出配额：减半在途上限
+                self._limit = max(1.0, self._limit / 2)
+            # 所有等待者一起暂停到退避结束，而不是各自立即重试
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+        return delay
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return min(LLM_BACKOFF_MAX_SECONDS, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return min(LLM_BACKOFF_MAX_SECONDS, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(LLM_BACKOFF_MAX_SECONDS, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+_governors: Dict[str, ProviderGovernor] = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(provider_id: str, rpm: Optional[int] = None, tpm: Optional[int] = None,
+                 max_concurrency: Optional[int] = None) -> ProviderGovernor:
+    """
+    获取进程内共享的供应商调度器；限额为 None 时使用环境变量中的默认值。
+    已存在的调度器会按最新的限额更新（供应商配置修改后立即生效）。
+    """
+    rpm = LLM_DEFAULT_RPM if rpm is None else rpm
+    tpm = LLM_DEFAULT_TPM if tpm is None else tpm
+    max_concurrency = LLM_DEFAULT_MAX_CONCURRENCY if max_concurrency is None else max_concurrency
+    with _governors_lock:
+        governor = _governors.get(provider_id)
+        if governor is None:
+            governor = ProviderGovernor(provider_id, rpm, tpm, max_concurrency)
+            _governors[provider_id] = governor
+            return governor
+    governor.reconfigure(rpm, tpm, max_concurrency)
+    return governor
@@ -0,0 +1,22 @@
+import re
+
+# CJK 字符（含全角标点）在主流分词器中通常 1 字 ≈ 1~1.5 token，按 1.5 估算偏保守
+_CJK_PATTERN = re.compile(r"[　-〿぀-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+CJK_TOKENS_PER_CHAR = 1.5
+# 拉丁文本平均约 4 个字符 1 个 token
+LATIN_CHARS_PER_TOKEN = 4.0
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数，用于切分转写窗口与判断是否超出上下文。
+    不依赖具体模型的分词器，结果偏保守（宁可多估）。
+
+    :param text: 待估算文本
+    :return: 估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return int(cjk * CJK_TOKENS_PER_CHAR + other / LATIN_CHARS_PER_TOKEN) + 1
@@ -1,24 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from app.gpt.base import GPT
-from app.gpt.prompt_builder import generate_base_prompt
+from app.gpt.map_reduce import (
+    GPT_CONTEXT_TOKENS,
+    GPT_MAP_CONCURRENCY,
+    GPT_MAP_REDUCE,
+    group_for_reduce,
+    split_segments_into_windows,
+)
+from app.gpt.rate_limiter import ProviderGovernor
+from app.gpt.prompt_builder import generate_base_prompt, generate_map_prompt, generate_reduce_prompt
+from app.gpt.token_estimator import estimate_tokens
 from app.models.gpt_model import GPTSource
 from app.gpt.prompt import BASE_PROMPT, AI_SUM, SCREENSHOT, LINK
 from app.gpt.utils import fix_markdown
 from app.models.transcriber_model import TranscriptSegment
+from app.services.cancellation import TaskCanceledError, current_token, propagate, raise_if_canceled
+from app.utils.logger import get_logger
 from datetime import timedelta
-from typing import List
+from typing import Callable, List, Optional
+
+logger = get_logger(__name__)
 
 
 class UniversalGPT(GPT):
-    def __init__(self, client, model: str, temperature: float = 0.7):
+    def __init__(self, client, model: str, temperature: float = 0.7, governor: Optional[ProviderGovernor] = None):
         self.client = client
         self.model = model
         self.temperature = temperature
+        self.governor = governor
         self.screenshot = False
         self.link = False
 
     def _format_time(self, seconds: float) -> str:
         return str(timedelta(seconds=int(seconds)))[2:]
 
+    @staticmethod
+    def _format_hms(seconds: float) -> str:
+        # 分段窗口的时间范围需带小时，超过一小时的视频不能回绕成 00:xx
+        total = int(seconds)
+        return f"{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+
     def _build_segment_text(self, segments: List[TranscriptSegment]) -> str:
         return "\n".join(
             f"{self._format_time(seg.start)} - {seg.text.strip()}"
@@ -39,11 +61,13 @@ class UniversalGPT(GPT):
             extras=kwargs.get('extras'),
         )
 
+        return self._build_messages(content_text, kwargs.get('video_img_urls'))
+
+    def _build_messages(self, content_text: str, video_img_urls: List[str] = None) -> list:
         # ⛳ 组装 content 数组，支持 text + image_url 混合
         content = [{"type": "text", "text": content_text}]
-        video_img_urls = kwargs.get('video_img_urls', [])
 
-        for url in video_img_urls:
+        for url in video_img_urls or []:
             content.append({
                 "type": "image_url",
                 "image_url": {
@@ -63,11 +87,142 @@ class UniversalGPT(GPT):
     def list_models(self):
         return self.client.models.list()
 
-    def summarize(self, source: GPTSource) -> str:
+    def _create_completion(self, messages: list, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        :param on_delta: 传入时以 stream=True 请求，每收到一段增量文本即回调
+        """
+        raise_if_canceled()
+        if self.governor is None:
+            return self._request_completion(messages, on_delta)
+
+        emitted = []
+        usage = {}
+        estimated = self._estimate_message_tokens(messages)
+
+        def tracked_delta(text: str) -> None:
+            emitted.append(True)
+            on_delta(text)
+
+        return self.governor.call(
+            lambda: self._request_completion(messages, tracked_delta if on_delta else None, usage),
+            estimated_tokens=estimated,
+            # 优先使用响应中的实际用量，流式响应没有 usage 时按输出文本估算
+            usage_of=lambda result: usage.get("total_tokens") or estimated + estimate_tokens(result),
+            # 流式输出已经回调过内容时不能整体重试，否则调用方会收到重复文本
+            can_retry=lambda: not emitted,
+        )
+
+    @staticmethod
+    def _estimate_message_tokens(messages: list) -> int:
+        return sum(
+            estimate_tokens(part.get("text", ""))
+            for message in messages
+            for part in (message["content"] if isinstance(message["content"], list) else [{"text": message["content"]}])
+        )
+
+    def _request_completion(self, messages: list, on_delta: Optional[Callable[[str], None]] = None,
+                            usage: Optional[dict] = None) -> str:
+        if on_delta is None:
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature
+            )
+            if usage is not None and getattr(response, "usage", None):
+                usage["total_tokens"] = response.usage.total_tokens
+            return response.choices[0].message.content.strip()
+
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            stream=True
+        )
+        parts = []
+        token = current_token()
+        for chunk in stream:
+            if token is not None and token.is_canceled():
+                # 断开连接，供应商随之停止生成
+                stream.close()
+                raise TaskCanceledError()
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                on_delta(text)
+        return "".join(parts).strip()
+
+    def _should_map_reduce(self, segments: List[TranscriptSegment]) -> bool:
+        if GPT_MAP_REDUCE == "never" or len(segments) < 2:
+            return False
+        if GPT_MAP_REDUCE == "always":
+            return True
+        return estimate_tokens(self._build_segment_text(segments)) > GPT_CONTEXT_TOKENS
+
+    def _summarize_map_reduce(self, source: GPTSource, on_delta: Optional[Callable[[str], None]] = None) -> str:
+        """
+        长转写的分层总结：按 token 预算切窗口并发生成局部笔记（map），
+        再合并为最终笔记（reduce）；局部笔记过多时先分组做中间层合并。
+        截图网格按时间顺序生成，按比例分配给对应窗口。只有最终合并的输出会流式回调。
+        """
+        windows = split_segments_into_windows(
+            source.segment,
+            render=lambda seg: f"{self._format_time(seg.start)} - {seg.text.strip()}",
+        )
+        img_urls = source.video_img_urls or []
+        count = len(windows)
+        logger.info(f"转写内容超出单次上下文预算，分 {count} 段并发总结（并发 {GPT_MAP_CONCURRENCY}）")
+
+        def map_window(index: int) -> str:
+            window = windows[index]
+            prompt = generate_map_prompt(
+                title=source.title,
+                segment_text=self._build_segment_text(window),
+                window_index=index + 1,
+                window_count=count,
+                start_time=self._format_hms(window[0].start),
+                end_time=self._format_hms(window[-1].end),
+                _format=source._format,
+                style=source.style,
+            )
+            urls = img_urls[index * len(img_urls) // count:(index + 1) * len(img_urls) // count]
+            return self._create_completion(self._build_messages(prompt, urls))
+
+        with ThreadPoolExecutor(max_workers=GPT_MAP_CONCURRENCY, thread_name_prefix="gpt-map") as pool:
+            parts = list(pool.map(propagate(map_window), range(count)))
+
+            # 局部笔记仍超出预算时逐层合并，直到可以一次性完成最终合并
+            while len(parts) > 2 and estimate_tokens("".join(parts)) > GPT_CONTEXT_TOKENS:
+                groups = group_for_reduce(parts)
+                if len(groups) >= len(parts):
+                    break
+                logger.info(f"局部笔记合并：{len(parts)} 段 -> {len(groups)} 段")
+                parts = list(pool.map(
+                    propagate(lambda group: self._create_completion(self._build_messages(
+                        generate_reduce_prompt(source.title, group, source.tags, final=False)
+                    ))),
+                    groups,
+                ))
+
+        prompt = generate_reduce_prompt(
+            title=source.title,
+            partial_notes=parts,
+            tags=source.tags,
+            _format=source._format,
+            style=source.style,
+            extras=source.extras,
+        )
+        return self._create_completion(self._build_messages(prompt), on_delta)
+
+    def summarize(self, source: GPTSource, on_delta: Optional[Callable[[str], None]] = None) -> str:
         self.screenshot = source.screenshot
         self.link = source.link
         source.segment = self.ensure_segments_type(source.segment)
 
+        if self._should_map_reduce(source.segment):
+            return self._summarize_map_reduce(source, on_delta)
+
         messages = self.create_messages(
             source.segment,
             title=source.title,
@@ -77,9 +232,4 @@ class UniversalGPT(GPT):
             style=source.style,
             extras=source.extras
         )
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=0.7
-        )
-        return response.choices[0].message.content.strip()
+        return self._create_completion(messages, on_delta)
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 from app.models.audio_model import AudioDownloadResult
 from app.models.transcriber_model import TranscriptResult
@@ -9,4 +9,30 @@ from app.models.transcriber_model import TranscriptResult
 class NoteResult:
     markdown: str                  # GPT 总结的 Markdown 内容
     transcript: TranscriptResult                # Whisper 转写结果
-    audio_meta: AudioDownloadResult  # 音频下载的元信息（title、duration、封面等）
\ No newline at end of file
+    audio_meta: AudioDownloadResult  # 音频下载的元信息（title、duration、封面等）
+
+@dataclass
+class NoteTask:
+    """
+    一次笔记生成任务的上下文，在下载、转写、总结、后处理各阶段之间传递。
+    """
+    task_id: Optional[str]
+    video_url: str
+    platform: str
+    quality: Optional[str] = None
+    model_name: Optional[str] = None
+    provider_id: Optional[str] = None
+    link: bool = False
+    screenshot: bool = False
+    _format: Optional[List[str]] = None
+    style: Optional[str] = None
+    extras: Optional[str] = None
+    output_path: Optional[str] = None
+    video_understanding: bool = False
+    video_interval: int = 0
+    grid_size: List[int] = field(default_factory=list)
+
+    # 各阶段产出
+    audio_meta: Optional[AudioDownloadResult] = None
+    transcript: Optional[TranscriptResult] = None
+    markdown: Optional[str] = None
@@ -1,8 +1,13 @@
 # app/routers/note.py
+import asyncio
+import hashlib
 import json
 import os
+import shutil
+import threading
 import uuid
 from pathlib import Path
+from collections import OrderedDict
 from typing import Optional
 from urllib.parse import urlparse
 
@@ -10,20 +15,23 @@ from fastapi import APIRouter, HTTPException, UploadFile, File
 from pydantic import BaseModel, validator, field_validator
 from dataclasses import asdict
 
-from app.db.video_task_dao import get_task_by_video, get_all_tasks
-from app.enmus.exception import NoteErrorEnum
+from app.db.video_task_dao import get_task_by_video, query_video_tasks, update_task_summary
+from app.enmus.exception import NoteErrorEnum, UploadErrorEnum
 from app.enmus.note_enums import DownloadQuality
 from app.exceptions.note import NoteError
 from app.services.note import NoteGenerator, logger
-from app.services.task_queue import enqueue_task
+from app.services.note_stream import note_stream_hub, stream_markdown_path, format_sse, MarkdownTail, TERMINAL_STATUSES
+from app.services.image_proxy import image_proxy as image_proxy_service, ImageFetchError
+from app.services.task_queue import submit_task
+from app.services.task_status import task_status_registry
+from app.services.upload_session import upload_sessions, parse_checksum, safe_filename, UPLOAD_CHUNK_SIZE
 from app.utils.response import ResponseWrapper as R
 from app.utils.url_parser import extract_video_id
 from app.validators.video_url_validator import is_supported_video_url
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import StreamingResponse
-import httpx
+from fastapi.responses import Response, StreamingResponse
 from app.enmus.task_status_enums import TaskStatus
-from app.db.video_tags_dao import get_video_tags
+from app.db.video_tags_dao import get_video_tags, get_tags_for_videos
 
 # from app.services.downloader import download_raw_audio
 # from app.services.whisperer import transcribe_audio
@@ -57,6 +65,8 @@ class VideoRequest(BaseModel):
     video_understanding: Optional[bool] = False
     video_interval: Optional[int] = 0
     grid_size: Optional[list] = []
+    # 强制重新生成：不与进行中或已完成的相同请求合并
+    force: Optional[bool] = False
 
     @field_validator("video_url")
     def validate_supported_url(cls, v):
@@ -73,6 +83,18 @@ class VideoRequest(BaseModel):
 
 NOTE_OUTPUT_DIR = os.getenv("NOTE_OUTPUT_DIR", "note_results")
 UPLOAD_DIR = "uploads"
+# 分片上传时累积到该大小再写盘，减少线程切换
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+
+# SSE 无事件时发送心跳的间隔（秒）
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# 任务在其他进程执行时（QUEUE_MODE=api 或 BACKEND_WORKERS>1），SSE 轮询任务状态与 Markdown 缓冲文件的间隔（秒）
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "1"))
+
+# 已读取过的结果文件的 (版本, 平台, 视频 ID)，用于在不解析结果文件的情况下计算 ETag
+RESULT_META_CACHE_SIZE = 2048
+_RESULT_META_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+_RESULT_META_LOCK = threading.Lock()
 
 VIDEO_EXTENSIONS = {".mp4", ".mov", ".mkv", ".webm", ".avi", ".flv", ".m4v"}
 
@@ -160,6 +182,7 @@ def update_task_title(data: UpdateTaskTitleRequest):
         # Write back to file
         with open(result_path, "w", encoding="utf-8") as f:
             json.dump(task_data, f, ensure_ascii=False, indent=2)
+        update_task_summary(data.task_id, title=data.title)
         
         logger.info(f"Updated title for task {data.task_id} to: {data.title}")
         return R.success({"task_id": data.task_id, "title": data.title}, msg='标题更新成功')
@@ -173,13 +196,116 @@ def update_task_title(data: UpdateTaskTitleRequest):
 @router.post("/upload")
 async def upload(file: UploadFile = File(...)):
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    file_location = os.path.join(UPLOAD_DIR, file.filename)
-
-    with open(file_location, "wb+") as f:
-        f.write(await file.read())
+    filename = safe_filename(file.filename)
+    file_location = os.path.join(UPLOAD_DIR, filename)
+    # 临时文件写在上传会话目录（静态目录之外），避免半截文件被公开访问；
+    # 进程中途退出残留的目录按会话过期规则清理
+    upload_id = uuid.uuid4().hex
+    temp_location = upload_sessions.part_path(upload_id)
+
+    def _copy():
+        try:
+            temp_location.parent.mkdir(parents=True, exist_ok=True)
+            # 按固定大小分块拷贝，不把整个文件读入内存
+            with open(temp_location, "wb") as f:
+                shutil.copyfileobj(file.file, f, UPLOAD_CHUNK_SIZE)
+            os.replace(temp_location, file_location)
+        finally:
+            upload_sessions.delete(upload_id)
+
+    # 写盘放到线程中，避免大文件阻塞事件循环
+    await asyncio.to_thread(_copy)
 
     # 假设你静态目录挂载了 /uploads
-    return R.success({"url": f"/uploads/{file.filename}"})
+    return R.success({"url": f"/uploads/{filename}"})
+
+
+class UploadSessionRequest(BaseModel):
+    filename: str
+    size: int
+    checksum: Optional[str] = None
+
+    @field_validator("size")
+    def validate_size(cls, v):
+        if v <= 0:
+            raise NoteError(code=UploadErrorEnum.SIZE_INVALID.code, message=UploadErrorEnum.SIZE_INVALID.message)
+        return v
+
+
+class UploadCommitRequest(BaseModel):
+    checksum: Optional[str] = None
+
+
+def _session_view(meta: dict) -> dict:
+    return {
+        "upload_id": meta["upload_id"],
+        "filename": meta["filename"],
+        "offset": meta["offset"],
+        "size": meta["size"],
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+    }
+
+
+@router.post("/upload/sessions")
+def create_upload_session(data: UploadSessionRequest):
+    """
+    创建可续传的上传会话，之后按偏移顺序 PATCH 分片，最后 commit
+    """
+    meta = upload_sessions.create(data.filename, data.size, data.checksum)
+    return R.success(_session_view(meta))
+
+
+@router.get("/upload/sessions/{upload_id}")
+def get_upload_session(upload_id: str):
+    """
+    查询服务端已接收的偏移，断线后从该偏移继续上传
+    """
+    return R.success(_session_view(upload_sessions.status(upload_id)))
+
+
+@router.patch("/upload/sessions/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request):
+    """
+    上传一个分片：请求体为原始字节，
+    Upload-Offset 头为分片在文件中的起始偏移，Upload-Checksum 头（可选）为 "sha256 <hex 或 base64>"
+    """
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+    except ValueError:
+        return R.error(msg="缺少 Upload-Offset 请求头", code=400)
+    checksum = parse_checksum(request.headers.get("Upload-Checksum"))
+
+    writer = await asyncio.to_thread(upload_sessions.open_chunk, upload_id, offset)
+    buffer = bytearray()
+    try:
+        async for chunk in request.stream():
+            buffer += chunk
+            if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                await asyncio.to_thread(writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(writer.write, bytes(buffer))
+    except BaseException:
+        # 客户端断开或写入失败：丢弃本分片，客户端查询偏移后重传
+        writer.abort()
+        raise
+    new_offset = await asyncio.to_thread(writer.finish, checksum)
+    return R.success({"upload_id": upload_id, "offset": new_offset})
+
+
+@router.post("/upload/sessions/{upload_id}/commit")
+async def commit_upload_session(upload_id: str, data: Optional[UploadCommitRequest] = None):
+    """
+    所有分片上传完成后提交，返回与 /upload 相同的访问路径
+    """
+    url = await asyncio.to_thread(upload_sessions.commit, upload_id, data.checksum if data else None)
+    return R.success({"url": url})
+
+
+@router.delete("/upload/sessions/{upload_id}")
+def delete_upload_session(upload_id: str):
+    upload_sessions.delete(upload_id)
+    return R.success({"upload_id": upload_id})
 
 
 @router.post("/generate_note")
@@ -202,11 +328,11 @@ def generate_note(data: VideoRequest):
             NoteGenerator()._update_status(task_id, TaskStatus.QUEUED)
             logger.info(f"重试模式，复用已有 task_id={task_id}")
         else:
-            # 正常新建任务
+            # 正常新建任务（入队时写入 QUEUED 状态；与已有任务合并时沿用其状态）
             task_id = str(uuid.uuid4())
-            NoteGenerator()._update_status(task_id, TaskStatus.QUEUED)
 
-        enqueue_task({
+        # 重试总是重新执行；其余请求与指纹相同的进行中/已完成任务合并
+        task_id, coalesced = submit_task({
             "task_id": task_id,
             "video_url": data.video_url,
             "platform": data.platform,
@@ -221,73 +347,124 @@ def generate_note(data: VideoRequest):
             "video_understanding": data.video_understanding,
             "video_interval": data.video_interval,
             "grid_size": data.grid_size,
-        })
-        return R.success({"task_id": task_id})
+        }, video_id=video_id, force=bool(data.force or data.task_id))
+        return R.success({"task_id": task_id, "coalesced": coalesced})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/task_status/{task_id}")
-def get_task_status(task_id: str):
-    status_path = os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.status.json")
+def _read_partial_transcript(task_id: str, offset: int) -> Optional[dict]:
+    """
+    读取转写过程中增量写入的片段，只返回 offset 之后的新片段，前端可据此增量渲染。
+    """
+    partial_path = os.path.join(NOTE_OUTPUT_DIR, f"{task_id}_transcript.partial.jsonl")
+    if not os.path.exists(partial_path):
+        return None
+    segments = []
+    with open(partial_path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            if index < offset:
+                continue
+            try:
+                segments.append(json.loads(line))
+            except json.JSONDecodeError:
+                # 最后一行可能正在写入
+                break
+    return {"offset": offset, "next_offset": offset + len(segments), "segments": segments}
+
+
+def _task_result_response(task_id: str, request: Request, message: str = ""):
+    """
+    返回成功任务的完整结果。结果带 ETag，客户端再次轮询时携带 If-None-Match，
+    内容未变则直接 304，不再读取与解析结果文件。
+
+    :return: 响应；结果文件不存在时返回 None
+    """
     result_path = os.path.join(NOTE_OUTPUT_DIR, f"{task_id}.json")
+    try:
+        stat = os.stat(result_path)
+    except FileNotFoundError:
+        return None
+
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _RESULT_META_LOCK:
+        cached = _RESULT_META_CACHE.get(task_id)
+    result_content = None
+    if cached is None or cached[0] != version:
+        with open(result_path, "r", encoding="utf-8") as rf:
+            result_content = json.load(rf)
+        audio_meta = result_content.get("audio_meta") or {}
+        cached = (version, audio_meta.get("platform"), audio_meta.get("video_id"))
+    with _RESULT_META_LOCK:
+        _RESULT_META_CACHE[task_id] = cached
+        _RESULT_META_CACHE.move_to_end(task_id)
+        while len(_RESULT_META_CACHE) > RESULT_META_CACHE_SIZE:
+            _RESULT_META_CACHE.popitem(last=False)
+
+    _, platform, video_id = cached
+    tags = get_video_tags(platform, video_id) if platform and video_id else []
+    raw_etag = json.dumps([version, tags, message], ensure_ascii=False)
+    etag = f'W/"{hashlib.sha1(raw_etag.encode("utf-8")).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    if result_content is None:
+        with open(result_path, "r", encoding="utf-8") as rf:
+            result_content = json.load(rf)
+    response = R.success({
+        "status": TaskStatus.SUCCESS.value,
+        "result": result_content,
+        "tags": tags,
+        "message": message,
+        "task_id": task_id
+    })
+    response.headers.update(headers)
+    return response
+
 
-    # 优先读状态文件
-    if os.path.exists(status_path):
-        with open(status_path, "r", encoding="utf-8") as f:
-            status_content = json.load(f)
+@router.get("/task_status/{task_id}")
+def get_task_status(task_id: str, request: Request, segment_offset: int = 0):
+    # 状态来自内存中的状态中心，未命中时才回落到数据库
+    status_content = task_status_registry.get(task_id)
 
+    if status_content:
         status = status_content.get("status")
         message = status_content.get("message", "")
 
         if status == TaskStatus.SUCCESS.value:
             # 成功状态的话，继续读取最终笔记内容
-            if os.path.exists(result_path):
-                with open(result_path, "r", encoding="utf-8") as rf:
-                    result_content = json.load(rf)
-                audio_meta = result_content.get("audio_meta") or {}
-                video_id = audio_meta.get("video_id")
-                platform = audio_meta.get("platform")
-                tags = get_video_tags(platform, video_id) if platform and video_id else []
-                return R.success({
-                    "status": status,
-                    "result": result_content,
-                    "tags": tags,
-                    "message": message,
-                    "task_id": task_id
-                })
-            else:
-                # 理论上不会出现，保险处理
-                return R.success({
-                    "status": TaskStatus.QUEUED.value,
-                    "message": "任务完成，但结果文件未找到",
-                    "task_id": task_id
-                })
+            response = _task_result_response(task_id, request, message)
+            if response is not None:
+                return response
+            # 理论上不会出现，保险处理
+            return R.success({
+                "status": TaskStatus.QUEUED.value,
+                "message": "任务完成，但结果文件未找到",
+                "task_id": task_id
+            })
 
         if status == TaskStatus.FAILED.value:
             return R.error(message or "任务失败", code=500)
 
         # 处理中状态
-        return R.success({
+        data = {
             "status": status,
             "message": message,
             "task_id": task_id
-        })
-
-    # 没有状态文件，但有结果
-    if os.path.exists(result_path):
-        with open(result_path, "r", encoding="utf-8") as f:
-            result_content = json.load(f)
-        audio_meta = result_content.get("audio_meta") or {}
-        video_id = audio_meta.get("video_id")
-        platform = audio_meta.get("platform")
-        tags = get_video_tags(platform, video_id) if platform and video_id else []
-        return R.success({
-            "status": TaskStatus.SUCCESS.value,
-            "result": result_content,
-            "tags": tags,
-            "task_id": task_id
-        })
+        }
+        if "progress" in status_content:
+            data["progress"] = status_content["progress"]
+        if status == TaskStatus.TRANSCRIBING.value:
+            partial = _read_partial_transcript(task_id, max(segment_offset, 0))
+            if partial:
+                data["transcript_partial"] = partial
+        return R.success(data)
+
+    # 没有状态记录，但有结果
+    response = _task_result_response(task_id, request)
+    if response is not None:
+        return response
 
     return R.success({
         "status": TaskStatus.QUEUED.value,
@@ -296,109 +473,193 @@ def get_task_status(task_id: str):
     })
 
 
+@router.get("/task_stream/{task_id}")
+async def task_stream(task_id: str, request: Request):
+    """
+    SSE 推送任务进度：阶段变更（stage）、总结阶段的 Markdown 增量（reset / delta）与结束事件（done）。
+    断线重连时浏览器会带上 Last-Event-ID，从该序号之后继续推送。
+    任务可能在其他进程执行时改为轮询状态与 Markdown 缓冲文件（见 _polled_events）。
+    """
+    try:
+        after_seq = int(request.headers.get("Last-Event-ID", "0"))
+    except ValueError:
+        after_seq = 0
+
+    async def event_source():
+        seq = after_seq
+        status_content = await asyncio.to_thread(task_status_registry.get, task_id) or {}
+
+        # 先推送当前状态；事件不在本进程内存中时（如服务重启），补发已生成的 Markdown
+        if status_content:
+            yield f"event: stage\ndata: {json.dumps(status_content, ensure_ascii=False)}\n\n"
+        if status_content.get("status") in TERMINAL_STATUSES:
+            yield f"event: done\ndata: {json.dumps({'status': status_content['status']})}\n\n"
+            return
+        if task_status_registry.read_through:
+            async for chunk in _polled_events(task_id, request, status_content):
+                yield chunk
+            return
+        markdown_path = stream_markdown_path(task_id)
+        if seq == 0 and not note_stream_hub.has_stream(task_id) and markdown_path.exists():
+            snapshot = await asyncio.to_thread(markdown_path.read_text, encoding="utf-8")
+            yield f"event: snapshot\ndata: {json.dumps({'text': snapshot}, ensure_ascii=False)}\n\n"
+
+        while not await request.is_disconnected():
+            events, finished = await note_stream_hub.wait_events(task_id, seq, SSE_KEEPALIVE_SECONDS)
+            for event in events:
+                seq = event[0]
+                yield format_sse(*event)
+            if finished:
+                break
+            if not events:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _polled_events(task_id: str, request: Request, status_content: dict):
+    """
+    任务由其他进程执行时本进程的 note_stream_hub 收不到事件：按 SSE_POLL_SECONDS 轮询状态表
+    与 Markdown 缓冲文件，转换为同样的 stage / snapshot / reset / delta / done 事件。
+    事件不带序号，断线重连时重新发送快照。
+    """
+    tail = MarkdownTail(task_id)
+    _, snapshot = await asyncio.to_thread(tail.read)
+    if snapshot:
+        yield f"event: snapshot\ndata: {json.dumps({'text': snapshot}, ensure_ascii=False)}\n\n"
+
+    idle = 0.0
+    while not await request.is_disconnected():
+        await asyncio.sleep(SSE_POLL_SECONDS)
+        sent = False
+        current = await asyncio.to_thread(task_status_registry.get, task_id) or {}
+        if current and current != status_content:
+            status_content = current
+            sent = True
+            yield f"event: stage\ndata: {json.dumps(current, ensure_ascii=False)}\n\n"
+        # 先读状态再读文件：任务结束前写入的最后一段增量不会丢
+        reset, text = await asyncio.to_thread(tail.read)
+        if reset:
+            sent = True
+            yield "event: reset\ndata: {}\n\n"
+        if text:
+            sent = True
+            yield f"event: delta\ndata: {json.dumps({'text': text}, ensure_ascii=False)}\n\n"
+        if current.get("status") in TERMINAL_STATUSES:
+            yield f"event: done\ndata: {json.dumps({'status': current['status']})}\n\n"
+            return
+        idle = 0.0 if sent else idle + SSE_POLL_SECONDS
+        if idle >= SSE_KEEPALIVE_SECONDS:
+            idle = 0.0
+            yield ": keep-alive\n\n"
+
+
 @router.get("/image_proxy")
 async def image_proxy(request: Request, url: str):
-    headers = {
-        "Referer": "https://www.bilibili.com/",
-        "User-Agent": request.headers.get("User-Agent", ""),
-    }
+    if urlparse(url).scheme not in ("http", "https"):
+        raise HTTPException(status_code=400, detail="不支持的图片地址")
 
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url, headers=headers)
-
-            if resp.status_code != 200:
-                raise HTTPException(status_code=resp.status_code, detail="图片获取失败")
-
-            content_type = resp.headers.get("Content-Type", "image/jpeg")
-            return StreamingResponse(
-                resp.aiter_bytes(),
-                media_type=content_type,
-                headers={
-                    "Cache-Control": "public, max-age=86400",  #  缓存一天
-                    "Content-Type": content_type,
-                }
-            )
+        image = await image_proxy_service.get(url, user_agent=request.headers.get("User-Agent", ""))
+    except ImageFetchError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    etag = f'"{image.digest}"'
+    headers = {
+        "Cache-Control": "public, max-age=86400",  #  缓存一天
+        "ETag": etag,
+    }
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=image.content, media_type=image.content_type, headers=headers)
+
 @router.get("/tasks")
-def list_tasks(tags: Optional[str] = None, tags_match: str = "any"):
-    tasks_db = get_all_tasks()
+def list_tasks(
+    tags: Optional[str] = None,
+    tags_match: str = "any",
+    page: Optional[int] = None,
+    page_size: int = 20,
+    view: str = "full",
+):
+    """
+    任务列表。状态、标题、封面、时长与标签均来自数据库，标签筛选在 SQL 中完成。
+
+    :param page: 页码（从 1 开始）；不传时返回全部任务（兼容旧版前端）
+    :param page_size: 每页条数
+    :param view: full 返回完整笔记与转写（读取结果文件）；summary 只返回摘要字段
+    """
+    requested = [t.strip() for t in tags.split(",") if t.strip()] if tags else []
+    offset, limit = 0, None
+    if page is not None:
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 200)
+        offset, limit = (page - 1) * page_size, page_size
+
+    tasks_db, total = query_video_tasks(
+        tags=requested,
+        match_all=tags_match.lower() == "all",
+        offset=offset,
+        limit=limit,
+    )
+    tags_map = get_tags_for_videos((t.platform, t.video_id) for t in tasks_db)
+
     results = []
-    
     for t in tasks_db:
-        result_path = os.path.join(NOTE_OUTPUT_DIR, f"{t.task_id}.json")
-        status_path = os.path.join(NOTE_OUTPUT_DIR, f"{t.task_id}.status.json")
-        
         task_data = {
             "id": t.task_id,
             "created_at": t.created_at.isoformat() if t.created_at else None,
             "platform": t.platform,
-            "status": "QUEUED"
+            "status": t.status or TaskStatus.SUCCESS.value,
+            "tags": tags_map.get((t.platform, t.video_id), []),
         }
-        
-        # Determine status
-        if os.path.exists(status_path):
-            try:
-                with open(status_path, "r", encoding="utf-8") as f:
-                    s_data = json.load(f)
-                    task_data["status"] = s_data.get("status", "QUEUED")
-            except:
-                pass
-        # If no status file but result exists -> SUCCESS
-        elif os.path.exists(result_path):
-            task_data["status"] = "SUCCESS"
 
-        
-        # Load content if success (or if file exists)
+        if view == "summary":
+            task_data.update({
+                "video_id": t.video_id,
+                "title": t.title,
+                "cover_url": t.cover_url,
+                "duration": t.duration,
+                "formData": {"video_url": t.video_url or "", "platform": t.platform},
+            })
+            results.append(task_data)
+            continue
+
+        result_path = os.path.join(NOTE_OUTPUT_DIR, f"{t.task_id}.json")
         if os.path.exists(result_path):
             try:
                 with open(result_path, "r", encoding="utf-8") as f:
                     content = json.load(f)
                     if "audio_meta" in content:
                         task_data["audioMeta"] = content["audio_meta"]
-                    
+
                     if "transcript" in content:
                         task_data["transcript"] = content["transcript"]
-                        
+
                     if "markdown" in content:
                         task_data["markdown"] = content["markdown"]
 
-                    audio_meta = content.get("audio_meta") or {}
-                    video_id = audio_meta.get("video_id")
-                    platform = t.platform or audio_meta.get("platform")
-                    task_data["tags"] = get_video_tags(platform, video_id) if platform and video_id else []
-                        
-                    video_url = content.get("audio_meta", {}).get("raw_info", {}).get("webpage_url", "")
+                    video_url = t.video_url or ""
                     if t.platform == "local" and not video_url:
                         video_url = _infer_local_upload_url(content.get("audio_meta", {}))
 
                     task_data["formData"] = {
                         "video_url": video_url,
                         "platform": t.platform,
-                        "model_name": "", 
+                        "model_name": "",
                         "provider_id": "",
                     }
-                    
+
             except Exception as e:
                 logger.error(f"Error loading task file {t.task_id}: {e}")
-                
+
         results.append(task_data)
-        
-    if tags:
-        requested = [t.strip() for t in tags.split(",") if t.strip()]
-        if requested:
-            match_all = tags_match.lower() == "all"
-            filtered = []
-            for item in results:
-                item_tags = set(item.get("tags") or [])
-                if match_all:
-                    if all(t in item_tags for t in requested):
-                        filtered.append(item)
-                else:
-                    if any(t in item_tags for t in requested):
-                        filtered.append(item)
-            results = filtered
-
-    return R.success(results)
+
+    if page is None:
+        return R.success(results)
+    return R.success({"items": results, "total": total, "page": page, "page_size": page_size})
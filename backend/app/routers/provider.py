@@ -17,6 +17,10 @@ class ProviderRequest(BaseModel):
     base_url: str
     logo: Optional[str] = None
     type: str
+    # 调用限额，留空使用默认值（LLM_DEFAULT_*）
+    rpm_limit: Optional[int] = None
+    tpm_limit: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
 class TestRequest(BaseModel):
     id: Optional[str] = None
@@ -30,6 +34,9 @@ class ProviderUpdateRequest(BaseModel):
     logo: Optional[str] = None
     type: Optional[str] = None
     enabled:Optional[int] = None
+    rpm_limit: Optional[int] = None
+    tpm_limit: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
 @router.post("/add_provider")
 def add_provider(data: ProviderRequest):
@@ -39,7 +46,10 @@ def add_provider(data: ProviderRequest):
             api_key=data.api_key,
             base_url=data.base_url,
             logo=data.logo,
-            type_=data.type
+            type_=data.type,
+            rpm_limit=data.rpm_limit,
+            tpm_limit=data.tpm_limit,
+            max_concurrency=data.max_concurrency,
         )
         return R.success(msg='添加模型供应商成功',data=res)
     except Exception as e:
@@ -75,7 +85,8 @@ def update_provider(data: ProviderUpdateRequest):
     try:
         if all(
             field is None
-            for field in [data.name, data.api_key, data.base_url, data.logo, data.type,data.enabled]
+            for field in [data.name, data.api_key, data.base_url, data.logo, data.type, data.enabled,
+                          data.rpm_limit, data.tpm_limit, data.max_concurrency]
         ):
             return R.error(msg='请至少填写一个参数')
 
@@ -0,0 +1,176 @@
+import subprocess
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TaskCanceledError(Exception):
+    def __init__(self, message: str = "任务已取消"):
+        super().__init__(message)
+        self.message = message
+
+
+class CancellationToken:
+    """
+    单个任务的取消令牌：内存中的 Event，取消时同时结束该任务登记的子进程（ffmpeg 等）。
+
+    长耗时的循环（转写片段、下载进度回调、轮询、抽帧）在每次迭代时检查令牌，
+    取消后数秒内即可退出，不必等到阶段结束。
+    """
+
+    def __init__(self, task_id: str):
+        self.task_id = task_id
+        self._event = threading.Event()
+        self._processes: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+
+    def cancel(self) -> None:
+        self._event.set()
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is None:
+                logger.info(f"任务已取消，结束子进程 pid={process.pid} (task_id={self.task_id})")
+                process.kill()
+
+    def is_canceled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_canceled(self) -> None:
+        if self._event.is_set():
+            raise TaskCanceledError()
+
+    def wait(self, timeout: float) -> bool:
+        """可被取消打断的 sleep，返回是否已取消"""
+        return self._event.wait(timeout)
+
+    @contextmanager
+    def track(self, process: subprocess.Popen) -> Iterator[subprocess.Popen]:
+        """登记子进程，取消时将其结束；登记时已取消则立即结束"""
+        with self._lock:
+            self._processes.add(process)
+        try:
+            if self._event.is_set() and process.poll() is None:
+                process.kill()
+            yield process
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+
+class CancellationRegistry:
+    """进程内的任务取消令牌表：worker 领取任务时创建，任务结束时移除"""
+
+    def __init__(self):
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._lock = threading.Lock()
+
+    def create(self, task_id: str) -> CancellationToken:
+        token = CancellationToken(task_id)
+        with self._lock:
+            self._tokens[task_id] = token
+        return token
+
+    def get(self, task_id: Optional[str]) -> Optional[CancellationToken]:
+        if not task_id:
+            return None
+        with self._lock:
+            return self._tokens.get(task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        """取消本进程中正在执行的任务，任务不在本进程时返回 False"""
+        token = self.get(task_id)
+        if token is None:
+            return False
+        token.cancel()
+        return True
+
+    def is_canceled(self, task_id: Optional[str]) -> bool:
+        token = self.get(task_id)
+        return bool(token and token.is_canceled())
+
+    def discard(self, task_id: str) -> None:
+        with self._lock:
+            self._tokens.pop(task_id, None)
+
+    def task_ids(self) -> list:
+        with self._lock:
+            return list(self._tokens)
+
+
+cancellation_registry = CancellationRegistry()
+
+# 当前线程正在执行的任务令牌，由 NoteGenerator 在各阶段开始时绑定，
+# 使下载器、转写器等底层代码无需显式传递 task_id 即可检查取消
+_local = threading.local()
+
+
+def current_token() -> Optional[CancellationToken]:
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def bind_token(token: Optional[CancellationToken]) -> Iterator[Optional[CancellationToken]]:
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def raise_if_canceled() -> None:
+    token = current_token()
+    if token is not None:
+        token.raise_if_canceled()
+
+
+def propagate(fn: Callable) -> Callable:
+    """把当前线程的令牌带到线程池等其他线程中执行的函数里"""
+    token = current_token()
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with bind_token(token):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def ytdlp_cancel_hook() -> Callable[[dict], None]:
+    """yt-dlp progress_hooks 回调：每个下载进度事件时检查取消，已取消则中断下载"""
+    token = current_token()
+
+    def hook(_progress: dict) -> None:
+        if token is not None:
+            token.raise_if_canceled()
+
+    return hook
+
+
+def run_process(command, check: bool = False, capture_output: bool = False,
+                token: Optional[CancellationToken] = None, **kwargs) -> subprocess.CompletedProcess:
+    """
+    与 subprocess.run 相同的调用方式，子进程登记到当前任务的取消令牌上：任务取消时子进程被结束，
+    随后抛出 TaskCanceledError。没有令牌时等同于 subprocess.run。
+    """
+    token = token or current_token()
+    if token is None:
+        return subprocess.run(command, check=check, capture_output=capture_output, **kwargs)
+
+    token.raise_if_canceled()
+    if capture_output:
+        kwargs["stdout"] = subprocess.PIPE
+        kwargs["stderr"] = subprocess.PIPE
+    with subprocess.Popen(command, **kwargs) as process:
+        with token.track(process):
+            stdout, stderr = process.communicate()
+    token.raise_if_canceled()
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, output=stdout, stderr=stderr)
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+from app.utils.disk_cache import DiskCacheIndex
+from app.utils.logger import get_logger
+from app.utils.video_helper import generate_screenshots
+
+load_dotenv()
+logger = get_logger(__name__)
+
+# 截图直接存放在静态目录中，前端通过 IMAGE_BASE_URL 访问
+FRAME_CACHE_DIR = Path(os.getenv("OUT_DIR", "./static/screenshots"))
+# 索引不放在静态目录下，避免被公开访问
+FRAME_CACHE_INDEX = Path(os.getenv("NOTE_OUTPUT_DIR", "note_results")) / "frame_cache_index.json"
+FRAME_CACHE_MAX_MB = int(os.getenv("FRAME_CACHE_MAX_MB", "2048"))
+# 截图输出宽度（像素），0 表示保持原始分辨率
+SCREENSHOT_WIDTH = int(os.getenv("SCREENSHOT_WIDTH", "0"))
+
+
+def build_frame_key(source_id: str, timestamp: int, width: int = 0) -> str:
+    """
+    截图缓存键：同一视频、同一时间点、同一输出尺寸的截图内容相同
+    """
+    raw = "|".join([source_id, str(timestamp), str(width or "orig")])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _FrameIndex(DiskCacheIndex):
+    def can_evict(self, entry: Dict[str, Any]) -> bool:
+        # 仍被笔记引用的截图不参与 LRU 淘汰
+        return not entry.get("refs")
+
+
+class FrameCache:
+    """
+    内容寻址的截图缓存：按 (视频标识, 时间点, 输出尺寸) 命名，同一视频重复生成笔记时直接复用已有截图。
+    每个截图记录引用它的任务 ID，删除笔记时只删除不再被任何任务引用的截图；
+    总大小超出上限时按 LRU 淘汰未被引用的截图。
+    引用计数的读取-修改-写回在索引事务中完成，多个进程同时增减引用不会互相覆盖。
+    """
+
+    def __init__(self, root: Path, max_bytes: int, index_path: Path):
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.index = _FrameIndex(root, max_bytes=max_bytes, index_path=index_path)
+        self._lock = threading.Lock()
+
+    def get_or_create(self, source_id: str, video_path: str, timestamps: Iterable[int], task_id: str,
+                      width: int = SCREENSHOT_WIDTH) -> Dict[int, Optional[str]]:
+        """
+        获取一组时间点的截图，缺失的批量生成后登记到缓存，并为 task_id 增加引用。
+
+        :return: {时间戳: 截图文件名}，生成失败的时间点对应 None
+        """
+        result: Dict[int, Optional[str]] = {}
+        missing = []
+        for ts in sorted(set(timestamps)):
+            key = build_frame_key(source_id, ts, width)
+            with self._lock, self.index.transaction():
+                entry = self.index.get(key)
+                if entry:
+                    self._add_ref(key, entry, task_id)
+                    result[ts] = entry["file"]
+                    continue
+            missing.append(ts)
+
+        if missing:
+            logger.info(f"截图缓存命中 {len(result)} 张，需生成 {len(missing)} 张")
+            paths = generate_screenshots(video_path, str(self.index.root), missing, width=width)
+            for ts in missing:
+                path = paths.get(ts)
+                if not path:
+                    result[ts] = None
+                    continue
+                key = build_frame_key(source_id, ts, width)
+                filename = f"frame_{key[:40]}.jpg"
+                with self._lock, self.index.transaction():
+                    entry = self.index.peek(key)
+                    if entry:
+                        # 其他任务已并发生成了同一截图
+                        Path(path).unlink(missing_ok=True)
+                        self._add_ref(key, entry, task_id)
+                    else:
+                        os.replace(path, self.index.path_for(filename))
+                        self.index.put(key, filename, refs=[task_id], source=source_id, timestamp=ts)
+                result[ts] = filename
+        return result
+
+    def release(self, task_id: str) -> int:
+        """
+        移除任务对截图的引用，不再被任何任务引用的截图立即删除
+
+        :return: 删除的截图数
+        """
+        removed = 0
+        with self._lock, self.index.transaction():
+            for key in self.index.keys():
+                entry = self.index.peek(key)
+                if not entry or task_id not in entry.get("refs", []):
+                    continue
+                refs = [ref for ref in entry["refs"] if ref != task_id]
+                if refs:
+                    self.index.update(key, refs=refs)
+                else:
+                    self.index.remove(key)
+                    removed += 1
+        return removed
+
+    def share(self, source_task_id: str, task_id: str) -> int:
+        """
+        让 task_id 引用 source_task_id 引用的全部截图（复用已完成笔记时调用）
+
+        :return: 新增引用的截图数
+        """
+        shared = 0
+        with self._lock, self.index.transaction():
+            for key in self.index.keys():
+                entry = self.index.peek(key)
+                if entry and source_task_id in entry.get("refs", []):
+                    self._add_ref(key, entry, task_id)
+                    shared += 1
+        return shared
+
+    def is_managed(self, filename: str) -> bool:
+        return filename.startswith("frame_")
+
+    def _add_ref(self, key: str, entry: Dict[str, Any], task_id: str) -> None:
+        refs = entry.get("refs") or []
+        if task_id not in refs:
+            self.index.update(key, refs=refs + [task_id])
+
+
+frame_cache = FrameCache(
+    FRAME_CACHE_DIR,
+    max_bytes=FRAME_CACHE_MAX_MB * 1024 * 1024,
+    index_path=FRAME_CACHE_INDEX,
+)
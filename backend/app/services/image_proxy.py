@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from app.utils.disk_cache import DiskCacheIndex
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+try:
+    import h2  # noqa: F401  # 安装了 h2 时启用 HTTP/2
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+IMAGE_CACHE_DIR = Path(
+    os.getenv("IMAGE_CACHE_DIR", os.path.join(os.getenv("NOTE_OUTPUT_DIR", "note_results"), "image_cache"))
+)
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "256"))
+IMAGE_MEMORY_CACHE_MB = int(os.getenv("IMAGE_MEMORY_CACHE_MB", "32"))
+# 缓存的图片在该时长内直接返回，过期后携带 ETag/Last-Modified 向上游校验
+IMAGE_CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "86400"))
+IMAGE_PROXY_MAX_CONNECTIONS = int(os.getenv("IMAGE_PROXY_MAX_CONNECTIONS", "20"))
+# 单张图片的大小上限，超出时拒绝代理，避免把大文件读入内存与缓存
+IMAGE_PROXY_MAX_BYTES = int(os.getenv("IMAGE_PROXY_MAX_MB", "10")) * 1024 * 1024
+
+IMAGE_PROXY_HEADERS = {
+    "Referer": "https://www.bilibili.com/",
+}
+
+
+class ImageFetchError(Exception):
+    def __init__(self, status_code: int, message: str = "图片获取失败"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+@dataclass
+class CachedImage:
+    content: bytes
+    content_type: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+    @property
+    def digest(self) -> str:
+        # 返回给浏览器的 ETag，与上游是否提供 ETag 无关
+        return hashlib.md5(self.content).hexdigest()
+
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched_at < IMAGE_CACHE_TTL_SECONDS
+
+
+class ImageProxy:
+    """
+    图片代理：长连接复用的 httpx 客户端 + 内存 LRU + 磁盘缓存。
+
+    - 缓存未过期时不访问上游；过期后发送条件请求，304 只刷新时间戳；
+    - 上游失败时返回过期缓存兜底；
+    - 同一 URL 的并发请求合并为一次上游请求。上游请求在独立的 Task 中执行，
+      发起它的连接断开（请求被取消）时不会中断，其他等待者照常拿到结果。
+    """
+
+    def __init__(self, cache_dir: Path, disk_max_bytes: int, memory_max_bytes: int):
+        self.disk = DiskCacheIndex(cache_dir, max_bytes=disk_max_bytes)
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def get(self, url: str, user_agent: str = "") -> CachedImage:
+        cached = self._memory_get(url)
+        if cached is None:
+            cached = await asyncio.to_thread(self._disk_get, url)
+            if cached is not None:
+                self._memory_put(url, cached)
+        if cached is not None and cached.is_fresh():
+            return cached
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(url, user_agent, cached))
+            self._inflight[url] = task
+            task.add_done_callback(lambda done: self._on_fetch_done(url, done))
+        # shield：当前请求被取消只影响自己，不取消共享的上游请求
+        return await asyncio.shield(task)
+
+    def _on_fetch_done(self, url: str, task: asyncio.Task) -> None:
+        if self._inflight.get(url) is task:
+            del self._inflight[url]
+        if not task.cancelled():
+            # 所有等待者都已断开时避免 "exception was never retrieved" 警告
+            task.exception()
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ---------------- 上游请求 ----------------
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                http2=_HTTP2_AVAILABLE,
+                timeout=10.0,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=IMAGE_PROXY_MAX_CONNECTIONS,
+                    max_keepalive_connections=IMAGE_PROXY_MAX_CONNECTIONS,
+                    keepalive_expiry=60,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+
+    async def _fetch(self, url: str, user_agent: str, cached: Optional[CachedImage]) -> CachedImage:
+        headers = {**IMAGE_PROXY_HEADERS, "User-Agent": user_agent}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with self._get_client().stream("GET", url, headers=headers) as resp:
+                content = await self._read_limited(resp) if resp.status_code == 200 else b""
+        except httpx.HTTPError as exc:
+            if cached is not None:
+                logger.warning(f"图片上游请求失败，返回过期缓存：{url} ({exc})")
+                return cached
+            raise ImageFetchError(502, str(exc))
+
+        if resp.status_code == 304 and cached is not None:
+            cached.fetched_at = time.time()
+            await asyncio.to_thread(self.disk.update, self._key(url), fetched_at=cached.fetched_at)
+            return cached
+        if resp.status_code != 200:
+            if cached is not None:
+                return cached
+            raise ImageFetchError(resp.status_code)
+
+        image = CachedImage(
+            content=content,
+            content_type=resp.headers.get("Content-Type", "image/jpeg"),
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+            fetched_at=time.time(),
+        )
+        self._memory_put(url, image)
+        await asyncio.to_thread(self._disk_put, url, image)
+        return image
+
+    @staticmethod
+    async def _read_limited(resp: httpx.Response) -> bytes:
+        """
+        读取响应体，超过 IMAGE_PROXY_MAX_BYTES 时中止（先看 Content-Length，再按实际读取量）
+        """
+        length = resp.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > IMAGE_PROXY_MAX_BYTES:
+            raise ImageFetchError(413, "图片过大")
+        chunks, size = [], 0
+        async for chunk in resp.aiter_bytes():
+            size += len(chunk)
+            if size > IMAGE_PROXY_MAX_BYTES:
+                raise ImageFetchError(413, "图片过大")
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    # ---------------- 缓存 ----------------
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _memory_get(self, url: str) -> Optional[CachedImage]:
+        image = self._memory.get(url)
+        if image is not None:
+            self._memory.move_to_end(url)
+        return image
+
+    def _memory_put(self, url: str, image: CachedImage) -> None:
+        old = self._memory.pop(url, None)
+        if old is not None:
+            self._memory_bytes -= len(old.content)
+        if len(image.content) > self.memory_max_bytes:
+            return
+        self._memory[url] = image
+        self._memory_bytes += len(image.content)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.content)
+
+    def _disk_get(self, url: str) -> Optional[CachedImage]:
+        entry = self.disk.get(self._key(url))
+        if not entry:
+            return None
+        try:
+            content = self.disk.path_for(entry["file"]).read_bytes()
+        except OSError:
+            return None
+        return CachedImage(
+            content=content,
+            content_type=entry.get("content_type", "image/jpeg"),
+            etag=entry.get("etag"),
+            last_modified=entry.get("last_modified"),
+            fetched_at=entry.get("fetched_at", 0.0),
+        )
+
+    def _disk_put(self, url: str, image: CachedImage) -> None:
+        key = self._key(url)
+        filename = f"{key}.img"
+        file_path = self.disk.path_for(filename)
+        temp_file = file_path.with_suffix(".tmp")
+        try:
+            temp_file.write_bytes(image.content)
+            temp_file.replace(file_path)
+            self.disk.put(
+                key, filename,
+                url=url,
+                content_type=image.content_type,
+                etag=image.etag,
+                last_modified=image.last_modified,
+                fetched_at=image.fetched_at,
+            )
+        except Exception as exc:
+            logger.warning(f"写入图片缓存失败：{url} ({exc})")
+
+
+image_proxy = ImageProxy(
+    IMAGE_CACHE_DIR,
+    disk_max_bytes=IMAGE_CACHE_MAX_MB * 1024 * 1024,
+    memory_max_bytes=IMAGE_MEMORY_CACHE_MB * 1024 * 1024,
+)
@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import re
+import time
 from dataclasses import asdict
 from pathlib import Path
 from typing import List, Optional, Tuple, Union, Any
@@ -12,10 +13,18 @@ from dotenv import load_dotenv
 
 from app.downloaders.base import Downloader
 from app.downloaders.bilibili_downloader import BilibiliDownloader
+from app.downloaders.media_cache import media_cache
 from app.downloaders.douyin_downloader import DouyinDownloader
 from app.downloaders.local_downloader import LocalDownloader
 from app.downloaders.youtube_downloader import YoutubeDownloader
-from app.db.video_task_dao import delete_task_by_video, delete_task_by_task_id, get_task_ids_by_video, insert_video_task
+from app.db.video_task_dao import (
+    delete_task_by_video,
+    delete_task_by_task_id,
+    get_task_ids_by_video,
+    get_tasks_without_summary,
+    insert_video_task,
+    update_task_summary,
+)
 from app.enmus.exception import NoteErrorEnum, ProviderErrorEnum
 from app.enmus.task_status_enums import TaskStatus
 from app.enmus.note_enums import DownloadQuality
@@ -26,15 +35,19 @@ from app.gpt.gpt_factory import GPTFactory
 from app.models.audio_model import AudioDownloadResult
 from app.models.gpt_model import GPTSource
 from app.models.model_config import ModelConfig
-from app.models.notes_model import AudioDownloadResult, NoteResult
+from app.models.notes_model import AudioDownloadResult, NoteResult, NoteTask
 from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.services.cancellation import cancellation_registry, bind_token, TaskCanceledError
 from app.services.constant import SUPPORT_PLATFORM_MAP
+from app.services.frame_cache import frame_cache
+from app.services.note_stream import note_stream_hub, stream_markdown_path
 from app.services.provider import ProviderService
+from app.services.task_status import task_status_registry
+from app.services.transcript_store import transcript_store, media_source_id, build_transcript_key
 from app.transcriber.base import Transcriber
 from app.transcriber.transcriber_provider import get_transcriber, _transcribers
 from app.utils.note_helper import replace_content_markers
 from app.utils.status_code import StatusCode
-from app.utils.video_helper import generate_screenshot
 from app.utils.video_reader import VideoReader
 
 # ------------------ 环境变量与全局配置 ------------------
@@ -54,11 +67,57 @@ IMAGE_OUTPUT_DIR = os.getenv("OUT_DIR", "./static/screenshots")
 # 图片基础 URL（用于生成 Markdown 中的图片链接，需前端静态目录对应）
 IMAGE_BASE_URL = os.getenv("IMAGE_BASE_URL", "/static/screenshots")
 
+# Markdown 中的截图标记：*Screenshot-mm:ss 或 Screenshot-[mm:ss]
+SCREENSHOT_MARKER_PATTERN = re.compile(r"(?:\*Screenshot-(\d{2}):(\d{2})|\*?Screenshot-\[(\d{2}):(\d{2})\])")
+
+# 转写进度写入状态文件的最小间隔（秒）
+PROGRESS_REPORT_INTERVAL = float(os.getenv("PROGRESS_REPORT_INTERVAL", "1.0"))
+
+# 任务阶段，按执行顺序排列；任务队列为每个阶段分配独立的线程池
+NOTE_STAGES = ("download", "transcribe", "summarize", "post_process")
+
 # 日志配置
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
+def task_summary_from_audio_meta(audio_meta: dict, platform: Optional[str], video_url: Optional[str] = None) -> dict:
+    """
+    从结果中的 audio_meta 提取任务列表所需的摘要字段
+    """
+    raw_info = audio_meta.get("raw_info") or {}
+    webpage_url = raw_info.get("webpage_url") if isinstance(raw_info, dict) else None
+    return {
+        "title": audio_meta.get("title"),
+        "cover_url": audio_meta.get("cover_url"),
+        "duration": audio_meta.get("duration"),
+        "video_url": webpage_url or (video_url if platform == "local" else None),
+    }
+
+
+def backfill_task_summaries() -> int:
+    """
+    为升级前已存在、缺少摘要字段的任务记录补齐摘要（只在启动时执行一次，已补齐的记录不会重复读取）
+
+    :return: 补齐的记录数
+    """
+    count = 0
+    for task in get_tasks_without_summary():
+        result_file = NOTE_OUTPUT_DIR / f"{task.task_id}.json"
+        fields = {"status": TaskStatus.SUCCESS.value}
+        if result_file.exists():
+            try:
+                content = json.loads(result_file.read_text(encoding="utf-8"))
+                fields.update(task_summary_from_audio_meta(content.get("audio_meta") or {}, task.platform))
+            except Exception as e:
+                logger.warning(f"读取结果文件失败，跳过摘要补齐 (task_id={task.task_id})：{e}")
+        if update_task_summary(task.task_id, **fields):
+            count += 1
+    if count:
+        logger.info(f"已补齐 {count} 条任务摘要")
+    return count
+
+
 class NoteGenerator:
     """
     NoteGenerator 用于执行视频/音频下载、转写、GPT 生成笔记、插入截图/链接、
@@ -72,6 +131,8 @@ class NoteGenerator:
         self.transcriber: Transcriber = self._init_transcriber()
         self.video_path: Optional[Path] = None
         self.video_img_urls=[]
+        self.downloader: Optional[Downloader] = None
+        self.gpt: Optional[GPT] = None
         logger.info("NoteGenerator 初始化完成")
 
 
@@ -97,6 +158,7 @@ class NoteGenerator:
     ) -> NoteResult | None:
         """
         主流程：按步骤依次下载、转写、GPT 总结、截图/链接处理、存库、返回 NoteResult。
+        在当前线程内顺序执行全部阶段；任务队列则通过 prepare / run_stage / finish 分阶段调度。
 
         :param video_url: 视频或音频链接
         :param platform: 平台名称，对应 SUPPORT_PLATFORM_MAP 中的键
@@ -115,88 +177,84 @@ class NoteGenerator:
         :param grid_size: 生成缩略图时的网格大小，如 [3, 3]
         :return: NoteResult 对象，包含 markdown 文本、转写结果和音频元信息
         """
-        if grid_size is None:
-            grid_size = []
+        task = NoteTask(
+            task_id=task_id,
+            video_url=video_url,
+            platform=platform,
+            quality=quality,
+            model_name=model_name,
+            provider_id=provider_id,
+            link=link,
+            screenshot=screenshot,
+            _format=_format,
+            style=style,
+            extras=extras,
+            output_path=output_path,
+            video_understanding=video_understanding,
+            video_interval=video_interval,
+            grid_size=grid_size or [],
+        )
 
+        if task_id:
+            cancellation_registry.create(task_id)
         try:
-            logger.info(f"开始生成笔记 (task_id={task_id})")
-            self._check_canceled(task_id)
-            self._update_status(task_id, TaskStatus.PARSING)
-            self._check_canceled(task_id)
-
-            # 获取下载器与 GPT 实例
-
-            downloader = self._get_downloader(platform)
-            gpt = self._get_gpt(model_name, provider_id)
-
-            # 缓存文件路径
-            audio_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_audio.json"
-            transcript_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.json"
-            markdown_cache_file = NOTE_OUTPUT_DIR / f"{task_id}_markdown.md"
-            print(audio_cache_file)
-            # 1. 下载音频/视频
-            audio_meta = self._download_media(
-                downloader=downloader,
-                video_url=video_url,
-                quality=quality,
-                audio_cache_file=audio_cache_file,
-                status_phase=TaskStatus.DOWNLOADING,
-                platform=platform,
-                output_path=output_path,
-                screenshot=screenshot,
-                video_understanding=video_understanding,
-                video_interval=video_interval,
-                grid_size=grid_size,
-            )
-            self._check_canceled(task_id)
-
-            # 2. 转写文字
-            transcript = self._transcribe_audio(
-                audio_file=audio_meta.file_path,
-                transcript_cache_file=transcript_cache_file,
-                status_phase=TaskStatus.TRANSCRIBING,
-            )
-            self._check_canceled(task_id)
-
-            # 3. GPT 总结
-            markdown = self._summarize_text(
-                audio_meta=audio_meta,
-                transcript=transcript,
-                gpt=gpt,
-                markdown_cache_file=markdown_cache_file,
-                link=link,
-                screenshot=screenshot,
-                formats=_format or [],
-                style=style,
-                extras=extras,
-                video_img_urls=self.video_img_urls,
-            )
-            self._check_canceled(task_id)
-
-            # 4. 截图 & 链接替换
-            if _format:
-                markdown = self._post_process_markdown(
-                    markdown=markdown,
-                    video_path=self.video_path,
-                    formats=_format,
-                    audio_meta=audio_meta,
-                    platform=platform,
-                )
-            self._check_canceled(task_id)
-
-            # 5. 保存记录到数据库
-            self._update_status(task_id, TaskStatus.SAVING)
-            self._save_metadata(video_id=audio_meta.video_id, platform=platform, task_id=task_id)
-
-            # 6. 完成
-            self._update_status(task_id, TaskStatus.SUCCESS)
-            logger.info(f"笔记生成成功 (task_id={task_id})")
-            return NoteResult(markdown=markdown, transcript=transcript, audio_meta=audio_meta)
+            self.prepare(task)
+            for stage in NOTE_STAGES:
+                self.run_stage(task, stage)
+            return self.finish(task)
 
+        except TaskCanceledError:
+            logger.info(f"任务已取消 (task_id={task_id})")
+            self._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
+            return None
         except Exception as exc:
             logger.error(f"生成笔记流程异常 (task_id={task_id})：{exc}", exc_info=True)
             self._update_status(task_id, TaskStatus.FAILED, message=str(exc))
             return None
+        finally:
+            if task_id:
+                cancellation_registry.discard(task_id)
+
+    def prepare(self, task: NoteTask) -> None:
+        """
+        解析阶段：校验取消状态，获取下载器与 GPT 实例。
+        """
+        logger.info(f"开始生成笔记 (task_id={task.task_id})")
+        self._check_canceled(task.task_id)
+        self._update_status(task.task_id, TaskStatus.PARSING)
+        self._check_canceled(task.task_id)
+
+        self.downloader = self._get_downloader(task.platform)
+        self.gpt = self._get_gpt(task.model_name, task.provider_id)
+
+    def run_stage(self, task: NoteTask, stage: str) -> None:
+        """
+        执行单个阶段，阶段名见 NOTE_STAGES。任务队列会把不同阶段派发到各自的线程池。
+
+        :param task: 任务上下文，阶段产出会写回其中
+        :param stage: 阶段名
+        """
+        if stage not in NOTE_STAGES:
+            raise ValueError(f"未知的任务阶段：{stage}")
+        self._check_canceled(task.task_id)
+        # 绑定取消令牌：阶段内的下载、转写、抽帧等循环据此检查取消并结束子进程
+        with bind_token(cancellation_registry.get(task.task_id)):
+            getattr(self, f"_stage_{stage}")(task)
+        self._check_canceled(task.task_id)
+
+    def finish(self, task: NoteTask) -> NoteResult:
+        """
+        保存记录到数据库并标记完成，返回 NoteResult。
+        """
+        self._check_canceled(task.task_id)
+        self._update_status(task.task_id, TaskStatus.SAVING)
+        self._save_metadata(video_id=task.audio_meta.video_id, platform=task.platform, task_id=task.task_id,
+                            audio_meta=task.audio_meta, video_url=task.video_url)
+
+        self._update_status(task.task_id, TaskStatus.SUCCESS)
+        stream_markdown_path(task.task_id).unlink(missing_ok=True)
+        logger.info(f"笔记生成成功 (task_id={task.task_id})")
+        return NoteResult(markdown=task.markdown, transcript=task.transcript, audio_meta=task.audio_meta)
 
     @staticmethod
     def delete_note(video_id: str, platform: str, task_id: Optional[str] = None) -> int:
@@ -223,15 +281,26 @@ class NoteGenerator:
         from app.services.task_queue import cancel_task
         for tid in task_ids:
             cancel_task(tid)
+            task_status_registry.forget(tid)
 
         files_to_remove = [
             "{task_id}.json",
             "{task_id}.status.json",
             "{task_id}_audio.json",
             "{task_id}_transcript.json",
+            "{task_id}_transcript.partial.jsonl",
             "{task_id}_markdown.md",
+            "{task_id}_markdown.stream.md",
         ]
         for tid in task_ids:
+            # 截图缓存按引用计数删除：仍被其他笔记引用的截图保留
+            try:
+                removed = frame_cache.release(tid)
+                if removed:
+                    logger.info(f"已删除不再被引用的截图 {removed} 张 (task_id={tid})")
+            except Exception as exc:
+                logger.warning(f"释放截图引用失败 (task_id={tid})：{exc}")
+
             markdown_file = NOTE_OUTPUT_DIR / f"{tid}_markdown.md"
             if markdown_file.exists():
                 try:
@@ -239,6 +308,8 @@ class NoteGenerator:
                     image_base = IMAGE_BASE_URL.rstrip("/")
                     if image_base:
                         for filename in re.findall(rf"{re.escape(image_base)}/([^\s)]+)", markdown_text):
+                            if frame_cache.is_managed(filename):
+                                continue
                             image_path = Path(IMAGE_OUTPUT_DIR) / filename
                             try:
                                 if image_path.exists():
@@ -285,6 +356,9 @@ class NoteGenerator:
                     logger.warning(f"读取结果文件失败: {result_file} ({exc})")
 
             for media_path in media_paths:
+                if media_cache.manages(media_path):
+                    # 共享媒体缓存中的文件可能正被同一视频的其他任务使用，交由缓存按 LRU 淘汰
+                    continue
                 try:
                     media_file = Path(media_path)
                     if media_file.exists():
@@ -303,14 +377,59 @@ class NoteGenerator:
         return deleted_count
 
     # ---------------- 私有方法 ----------------
+    def _stage_download(self, task: NoteTask) -> None:
+        task.audio_meta = self._download_media(
+            downloader=self.downloader,
+            video_url=task.video_url,
+            quality=task.quality,
+            audio_cache_file=NOTE_OUTPUT_DIR / f"{task.task_id}_audio.json",
+            status_phase=TaskStatus.DOWNLOADING,
+            platform=task.platform,
+            output_path=task.output_path,
+            screenshot=task.screenshot,
+            video_understanding=task.video_understanding,
+            video_interval=task.video_interval,
+            grid_size=task.grid_size,
+        )
+
+    def _stage_transcribe(self, task: NoteTask) -> None:
+        task.transcript = self._transcribe_audio(
+            audio_meta=task.audio_meta,
+            transcript_cache_file=NOTE_OUTPUT_DIR / f"{task.task_id}_transcript.json",
+            status_phase=TaskStatus.TRANSCRIBING,
+        )
+
+    def _stage_summarize(self, task: NoteTask) -> None:
+        task.markdown = self._summarize_text(
+            audio_meta=task.audio_meta,
+            transcript=task.transcript,
+            gpt=self.gpt,
+            markdown_cache_file=NOTE_OUTPUT_DIR / f"{task.task_id}_markdown.md",
+            link=task.link,
+            screenshot=task.screenshot,
+            formats=task._format or [],
+            style=task.style,
+            extras=task.extras,
+            video_img_urls=self.video_img_urls,
+        )
+
+    def _stage_post_process(self, task: NoteTask) -> None:
+        if task._format:
+            task.markdown = self._post_process_markdown(
+                markdown=task.markdown,
+                video_path=self.video_path,
+                formats=task._format,
+                audio_meta=task.audio_meta,
+                platform=task.platform,
+                task_id=task.task_id,
+            )
+
     def _check_canceled(self, task_id: Optional[str]):
-        if not task_id:
-            return
-        from app.services.task_queue import is_task_canceled, clear_canceled
-        if is_task_canceled(task_id):
-            clear_canceled(task_id)
-            self._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
-            raise Exception("任务已取消")
+        """
+        检查内存中的取消令牌（由 cancel_task 设置，其他进程的取消由队列心跳同步），不访问数据库
+        """
+        if cancellation_registry.is_canceled(task_id):
+            raise TaskCanceledError()
 
     def _init_transcriber(self) -> Transcriber:
         """
@@ -341,6 +460,10 @@ class NoteGenerator:
             model_name=model_name,
             provider=provider["type"],
             name=provider["name"],
+            provider_id=provider["id"],
+            rpm_limit=provider.get("rpm_limit"),
+            tpm_limit=provider.get("tpm_limit"),
+            max_concurrency=provider.get("max_concurrency"),
         )
         return GPTFactory().from_config(config)
 
@@ -367,46 +490,30 @@ class NoteGenerator:
         logger.info(f"使用下载器：{downloader_cls.__class__}")
         return instance
 
-    def _update_status(self, task_id: Optional[str], status: Union[str, TaskStatus], message: Optional[str] = None):
+    def _update_status(self, task_id: Optional[str], status: Union[str, TaskStatus], message: Optional[str] = None,
+                       progress: Optional[float] = None):
         """
-        创建或更新 {task_id}.status.json，记录当前任务状态
+        更新任务状态：写入内存中的状态中心（同步落库到 task_queue）并推送给 SSE 订阅者
 
         :param task_id: 任务唯一 ID
         :param status: TaskStatus 枚举或自定义状态字符串
         :param message: 可选消息，用于记录失败原因等
+        :param progress: 可选的当前阶段进度（0~1），如转写已处理时长 / 总时长
         """
         if not task_id:
             return
 
-        NOTE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        status_file = NOTE_OUTPUT_DIR / f"{task_id}.status.json"
-        print(f"写入状态文件: {status_file} 当前状态: {status}")
-        data = {"status": status.value if isinstance(status, TaskStatus) else status}
-        if message:
-            data["message"] = message
-
-        try:
-            # First create a temporary file
-            temp_file = status_file.with_suffix('.tmp')
-
-            # Write to temporary file
-            with temp_file.open('w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+        status = status.value if isinstance(status, TaskStatus) else status
+        logger.info(f"任务状态更新: {task_id} -> {status}")
+        data = task_status_registry.set(task_id, status, message=message, progress=progress)
 
-            # Atomic rename operation
-            temp_file.replace(status_file)
-
-            print(f"状态文件写入成功: {status_file}")
-        except Exception as e:
-            logger.error(f"写入状态文件失败 (task_id={task_id})：{e}")
-            # Try to write error to file directly as fallback
-            try:
-                with status_file.open('w', encoding='utf-8') as f:
-                    f.write(f"Error writing status: {str(e)}")
-            except:
-                logger.error(f"写入错误  {e}")
+        # 推送给 SSE 订阅者
+        note_stream_hub.publish_stage(task_id, data["status"], message=message, progress=progress)
 
     def _handle_exception(self, task_id, exc):
+        if isinstance(exc, TaskCanceledError):
+            # 取消不是错误，状态由调用方统一更新
+            return
         logger.error(f"任务异常 (task_id={task_id})", exc_info=True)
         error_message = getattr(exc, 'detail', str(exc))
         if isinstance(error_message, dict):
@@ -431,8 +538,9 @@ class NoteGenerator:
         grid_size: List[int],
     ) -> AudioDownloadResult | None:
         """
-        1. 检查音频缓存；若不存在，则根据需要下载音频或视频（若需截图/可视化）。
-        2. 如果需要视频，则先下载视频并生成缩略图集，再下载音频。
+        1. 检查音频缓存；若不存在，则通过 downloader.download_media 一次获取音频与视频（若需截图/可视化），
+           支持的平台只拉取一次合并视频并在本地分离音轨，其余平台并发下载音视频。
+        2. 如果需要视频且指定了 grid_size，生成缩略图集。
         3. 返回 AudioDownloadResult
 
         :param downloader: Downloader 实例
@@ -451,16 +559,50 @@ class NoteGenerator:
         task_id = audio_cache_file.stem.split("_")[0]
         self._update_status(task_id, status_phase)
 
-
-
         # 判断是否需要下载视频
         need_video = screenshot or video_understanding
-        if need_video:
+        audio = None
+        # 已有缓存，尝试加载
+        if audio_cache_file.exists():
+            logger.info(f"检测到音频缓存 ({audio_cache_file})，直接读取")
             try:
+                data = json.loads(audio_cache_file.read_text(encoding="utf-8"))
+                audio = AudioDownloadResult(**data)
+            except Exception as e:
+                logger.warning(f"读取音频缓存失败，将重新下载：{e}")
+                audio = None
+
+        try:
+            if audio is None:
+                logger.info("开始下载媒体" + ("（音频 + 视频）" if need_video else "（音频）"))
+                audio = downloader.download_media(
+                    video_url=video_url,
+                    quality=quality,
+                    output_dir=output_path,
+                    need_video=need_video,
+                )
+                # 缓存 audio 元信息到本地 JSON
+                audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
+                logger.info(f"媒体下载并缓存成功 ({audio_cache_file})")
+            elif need_video and not (audio.video_path and Path(audio.video_path).exists()):
+                # 缓存来自只需音频的旧任务，补下视频
                 logger.info("开始下载视频")
-                video_path_str = downloader.download_video(video_url)
-                self.video_path = Path(video_path_str)
-                logger.info(f"视频下载完成：{self.video_path}")
+                audio.video_path = downloader.download_media(
+                    video_url=video_url,
+                    quality=quality,
+                    output_dir=output_path,
+                    need_video=True,
+                ).video_path
+                audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
+        except Exception as exc:
+            logger.error(f"媒体下载失败：{exc}")
+            self._handle_exception(task_id, exc)
+            raise
+
+        if need_video:
+            try:
+                self.video_path = Path(audio.video_path)
+                logger.info(f"视频已就绪：{self.video_path}")
 
                 # 若指定了 grid_size，则生成缩略图
                 if grid_size:
@@ -475,59 +617,30 @@ class NoteGenerator:
                 else:
                     logger.info("未指定 grid_size，跳过缩略图生成")
             except Exception as exc:
-                logger.error(f"视频下载失败：{exc}")
-
+                logger.error(f"生成缩略图失败：{exc}")
                 self._handle_exception(task_id, exc)
                 raise
-        # 已有缓存，尝试加载
-        if audio_cache_file.exists():
-            logger.info(f"检测到音频缓存 ({audio_cache_file})，直接读取")
-            try:
-                data = json.loads(audio_cache_file.read_text(encoding="utf-8"))
-                audio = AudioDownloadResult(**data)
-                if need_video and self.video_path and not audio.video_path:
-                    audio.video_path = str(self.video_path)
-                    audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
-                return audio
-            except Exception as e:
-                logger.warning(f"读取音频缓存失败，将重新下载：{e}")
-        # 下载音频
-        try:
-            logger.info("开始下载音频")
-            audio = downloader.download(
-                video_url=video_url,
-                quality=quality,
-                output_dir=output_path,
-                need_video=need_video,
-            )
-            if need_video and self.video_path:
-                audio.video_path = str(self.video_path)
-            # 缓存 audio 元信息到本地 JSON
-            audio_cache_file.write_text(json.dumps(asdict(audio), ensure_ascii=False, indent=2), encoding="utf-8")
-            logger.info(f"音频下载并缓存成功 ({audio_cache_file})")
-            return audio
-        except Exception as exc:
-            logger.error(f"音频下载失败：{exc}")
-            self._handle_exception(task_id, exc)
-            raise
+        return audio
 
 
     def _transcribe_audio(
         self,
-        audio_file: str,
+        audio_meta: AudioDownloadResult,
         transcript_cache_file: Path,
         status_phase: TaskStatus,
     ) -> TranscriptResult | None:
         """
-        1. 检查转写缓存；若存在则尝试加载，否则调用转写器生成并缓存。
-        2. 返回 TranscriptResult 对象
+        1. 检查任务级转写缓存；若存在则尝试加载。
+        2. 检查跨任务共享的转写缓存（按视频标识/音频内容 + 转写器配置寻址），命中则直接复用。
+        3. 否则调用转写器生成，并写入两级缓存。
 
-        :param audio_file: 音频文件本地路径
+        :param audio_meta: 音频下载元信息，包含本地路径、平台与视频 ID
         :param transcript_cache_file: 转写结果缓存路径
         :param status_phase: 对应的状态枚举，如 TaskStatus.TRANSCRIBING
         :return: TranscriptResult 对象
         """
         task_id = transcript_cache_file.stem.split("_")[0]
+        audio_file = audio_meta.file_path
         self._update_status(task_id, status_phase)
 
         # 已有缓存，尝试加载
@@ -540,18 +653,110 @@ class NoteGenerator:
             except Exception as e:
                 logger.warning(f"加载转写缓存失败，将重新转写：{e}")
 
-        # 调用转写器
+        # 共享缓存：同一视频换风格/换模型重新生成时无需再次转写
+        store_key, source_id = None, None
+        try:
+            source_id = media_source_id(audio_meta.platform, audio_meta.video_id, audio_file)
+            store_key = build_transcript_key(
+                source_id,
+                transcriber_type=self.transcriber_type,
+                model_size=getattr(self.transcriber, "model_size", None),
+                language=getattr(self.transcriber, "language", None),
+            )
+            transcript = transcript_store.get(store_key)
+            if transcript:
+                logger.info(f"命中共享转写缓存 ({source_id})，跳过转写")
+                transcript_cache_file.write_text(json.dumps(asdict(transcript), ensure_ascii=False, indent=2), encoding="utf-8")
+                return transcript
+        except Exception as e:
+            logger.warning(f"查询共享转写缓存失败，将直接转写：{e}")
+
+        # 调用转写器（增量输出，边转写边落盘）
+        partial_file = NOTE_OUTPUT_DIR / f"{task_id}_transcript.partial.jsonl"
         try:
             logger.info("开始转写音频")
-            transcript = self.transcriber.transcript(file_path=audio_file)
+            transcript = self._transcribe_incremental(task_id, audio_file, partial_file)
             transcript_cache_file.write_text(json.dumps(asdict(transcript), ensure_ascii=False, indent=2), encoding="utf-8")
+            partial_file.unlink(missing_ok=True)
             logger.info(f"转写并缓存成功 ({transcript_cache_file})")
-            return transcript
         except Exception as exc:
             logger.error(f"音频转写失败：{exc}")
             self._handle_exception(task_id, exc)
             raise
 
+        if store_key:
+            try:
+                transcript_store.put(store_key, transcript, source_id=source_id)
+            except Exception as e:
+                logger.warning(f"写入共享转写缓存失败：{e}")
+        return transcript
+
+    def _transcribe_incremental(self, task_id: str, audio_file: str, partial_file: Path) -> TranscriptResult:
+        """
+        逐段转写：每个片段追加写入 partial_file（JSON Lines）并定期上报进度；
+        若存在上次中断留下的部分结果，则从最后一个片段的结束时间继续转写。
+
+        :param task_id: 任务 ID
+        :param audio_file: 音频文件本地路径
+        :param partial_file: 追加写入的部分转写结果文件
+        :return: 完整的 TranscriptResult
+        """
+        segments = self._load_partial_segments(partial_file)
+        start_offset = segments[-1].end if segments else 0.0
+        if segments:
+            logger.info(f"检测到未完成的转写 ({len(segments)} 段)，从 {start_offset:.1f}s 继续")
+
+        # 按转写器需要规整音频：云端转写直接上传原始音频，本地 whisper 使用一次性解码的 16kHz PCM
+        audio_input = self.transcriber.prepare_audio(audio_file)
+        info, stream = self.transcriber.transcript_stream(audio_input, start_offset=start_offset)
+        last_report = 0.0
+        with partial_file.open("a", encoding="utf-8") as f:
+            for seg in stream:
+                segments.append(seg)
+                f.write(json.dumps(asdict(seg), ensure_ascii=False) + "\n")
+                f.flush()
+                now = time.monotonic()
+                if info.duration and now - last_report >= PROGRESS_REPORT_INTERVAL:
+                    last_report = now
+                    progress = min(1.0, seg.end / info.duration)
+                    self._update_status(task_id, TaskStatus.TRANSCRIBING, progress=progress)
+
+        if audio_input != audio_file and not media_cache.manages(audio_file):
+            # 共享媒体缓存中的音频解码出的 PCM 可能正被同一视频的其他任务使用，随缓存条目一起淘汰；
+            # 其余来源的 PCM 只用于中断续转，转写完成后即可删除
+            Path(audio_input).unlink(missing_ok=True)
+        return TranscriptResult(
+            language=info.language,
+            full_text=" ".join(seg.text for seg in segments).strip(),
+            segments=segments,
+        )
+
+    @staticmethod
+    def _load_partial_segments(partial_file: Path) -> List[TranscriptSegment]:
+        """
+        读取部分转写结果；最后一行可能因进程崩溃而不完整，解析失败时丢弃该行及之后的内容。
+        """
+        segments: List[TranscriptSegment] = []
+        if not partial_file.exists():
+            return segments
+        try:
+            for line in partial_file.read_text(encoding="utf-8").splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    segments.append(TranscriptSegment(**json.loads(line)))
+                except Exception:
+                    break
+        except Exception as exc:
+            logger.warning(f"读取部分转写结果失败，将从头转写：{exc}")
+            return []
+        # 重写文件，去掉可能残缺的尾行
+        partial_file.write_text(
+            "".join(json.dumps(asdict(seg), ensure_ascii=False) + "\n" for seg in segments),
+            encoding="utf-8",
+        )
+        return segments
+
     def _summarize_text(
         self,
         audio_meta: AudioDownloadResult,
@@ -579,7 +784,7 @@ class NoteGenerator:
         :param extras: GPT 额外参数
         :return: 生成的 Markdown 字符串
         """
-        task_id = markdown_cache_file.stem
+        task_id = markdown_cache_file.stem.rsplit("_markdown", 1)[0]
         self._update_status(task_id, TaskStatus.SUMMARIZING)
 
         source = GPTSource(
@@ -595,7 +800,8 @@ class NoteGenerator:
         )
 
         try:
-            markdown = gpt.summarize(source)
+            note_stream_hub.reset_markdown(task_id)
+            markdown = gpt.summarize(source, on_delta=lambda text: note_stream_hub.publish_delta(task_id, text))
             markdown_cache_file.write_text(markdown, encoding="utf-8")
             logger.info(f"GPT 总结并缓存成功 ({markdown_cache_file})")
             return markdown
@@ -603,6 +809,8 @@ class NoteGenerator:
             logger.error(f"GPT 总结失败：{exc}")
             self._handle_exception(task_id, exc)
             raise
+        finally:
+            note_stream_hub.finish_markdown(task_id)
 
     def _post_process_markdown(
         self,
@@ -611,6 +819,7 @@ class NoteGenerator:
         formats: List[str],
         audio_meta: AudioDownloadResult,
         platform: str,
+        task_id: Optional[str] = None,
     ) -> str:
         """
         对生成的 Markdown 做后期处理：插入截图和/或插入链接。
@@ -620,11 +829,12 @@ class NoteGenerator:
         :param formats: 包含 'link' 或 'screenshot' 的列表
         :param audio_meta: AudioDownloadResult 元信息，用于链接替换
         :param platform: 平台标识，用于链接替换
+        :param task_id: 任务 ID，用于登记截图引用
         :return: 处理后的 Markdown 字符串
         """
         if "screenshot" in formats and video_path:
             try:
-                markdown = self._insert_screenshots(markdown, video_path)
+                markdown = self._insert_screenshots(markdown, video_path, audio_meta, task_id)
             except Exception as exc:
                 logger.warning("截图插入失败，跳过该步骤")
 
@@ -636,27 +846,41 @@ class NoteGenerator:
 
         return markdown
 
-    def _insert_screenshots(self, markdown: str, video_path: Path) -> str | None | Any:
+    def _insert_screenshots(self, markdown: str, video_path: Path, audio_meta: AudioDownloadResult,
+                            task_id: Optional[str]) -> str:
         """
-        扫描 Markdown 文本中所有 Screenshot 标记，并替换为实际生成的截图链接。
+        扫描 Markdown 文本中所有 Screenshot 标记，从截图缓存中获取（缺失时批量生成）后一次性替换为截图链接。
+        单个截图失败时只移除对应标记，不影响其他截图。
 
         :param markdown: 含有 *Screenshot-mm:ss 或 Screenshot-[mm:ss] 标记的 Markdown 文本
         :param video_path: 本地视频文件路径
+        :param audio_meta: 音频元信息，用于确定视频标识
+        :param task_id: 任务 ID，截图引用计数按任务登记
         :return: 替换后的 Markdown 字符串
         """
         matches: List[Tuple[str, int]] = self._extract_screenshot_timestamps(markdown)
-        for idx, (marker, ts) in enumerate(matches):
-            try:
-                img_path = generate_screenshot(str(video_path), str(IMAGE_OUTPUT_DIR), ts, idx)
-                filename = Path(img_path).name
-                # 构建前端可访问的 URL，例如 /static/screenshots/{filename}
-                img_url = f"{IMAGE_BASE_URL.rstrip('/')}/{filename}"
-                markdown = markdown.replace(marker, f"![]({img_url})", 1)
-            except Exception as exc:
-                logger.error(f"生成截图失败 (timestamp={ts})：{exc}")
-                # self._handle_exception(task_id, exc)
-                return None
-        return markdown
+        if not matches:
+            return markdown
+        source_id = media_source_id(audio_meta.platform, audio_meta.video_id, str(video_path))
+        filenames = frame_cache.get_or_create(source_id, str(video_path), [ts for _, ts in matches], task_id=task_id)
+
+        def replace(match: re.Match) -> str:
+            ts = self._marker_seconds(match)
+            filename = filenames.get(ts)
+            if not filename:
+                logger.error(f"生成截图失败 (timestamp={ts})，移除该标记")
+                return ""
+            # 构建前端可访问的 URL，例如 /static/screenshots/{filename}
+            img_url = f"{IMAGE_BASE_URL.rstrip('/')}/{filename}"
+            return f"![]({img_url})"
+
+        return SCREENSHOT_MARKER_PATTERN.sub(replace, markdown)
+
+    @staticmethod
+    def _marker_seconds(match: re.Match) -> int:
+        mm = match.group(1) or match.group(3)
+        ss = match.group(2) or match.group(4)
+        return int(mm) * 60 + int(ss)
 
     @staticmethod
     def _extract_screenshot_timestamps(markdown: str) -> List[Tuple[str, int]]:
@@ -667,25 +891,26 @@ class NoteGenerator:
         :param markdown: 原始 Markdown 文本
         :return: 标记与对应时间戳秒数的列表
         """
-        pattern = r"(?:\*Screenshot-(\d{2}):(\d{2})|Screenshot-\[(\d{2}):(\d{2})\])"
-        results: List[Tuple[str, int]] = []
-        for match in re.finditer(pattern, markdown):
-            mm = match.group(1) or match.group(3)
-            ss = match.group(2) or match.group(4)
-            total_seconds = int(mm) * 60 + int(ss)
-            results.append((match.group(0), total_seconds))
-        return results
+        return [
+            (match.group(0), NoteGenerator._marker_seconds(match))
+            for match in SCREENSHOT_MARKER_PATTERN.finditer(markdown)
+        ]
 
-    def _save_metadata(self, video_id: str, platform: str, task_id: str) -> None:
+    def _save_metadata(self, video_id: str, platform: str, task_id: str,
+                       audio_meta: Optional[AudioDownloadResult] = None, video_url: Optional[str] = None) -> None:
         """
-        将生成的笔记任务记录插入数据库
+        将生成的笔记任务记录插入数据库，同时写入列表页所需的摘要字段
 
         :param video_id: 视频 ID
         :param platform: 平台标识
         :param task_id: 任务 ID
+        :param audio_meta: 音频元信息，提供标题、封面与时长
+        :param video_url: 任务提交时的视频链接，本地上传时为 /uploads 路径
         """
+        summary = task_summary_from_audio_meta(asdict(audio_meta) if audio_meta else {}, platform, video_url)
         try:
-            insert_video_task(video_id=video_id, platform=platform, task_id=task_id)
+            insert_video_task(video_id=video_id, platform=platform, task_id=task_id,
+                              status=TaskStatus.SUCCESS.value, **summary)
             logger.info(f"已保存任务记录到数据库 (video_id={video_id}, platform={platform}, task_id={task_id})")
         except Exception as e:
             logger.error(f"保存任务记录失败：{e}")
@@ -0,0 +1,245 @@
+import asyncio
+import codecs
+import json
+import os
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional, Set, TextIO, Tuple
+
+from dotenv import load_dotenv
+
+from app.enmus.task_status_enums import TaskStatus
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+NOTE_OUTPUT_DIR = Path(os.getenv("NOTE_OUTPUT_DIR", "note_results"))
+# 任务结束后事件在内存中保留的时长（秒），便于断线重连的订阅者补齐
+NOTE_STREAM_RETENTION_SECONDS = float(os.getenv("NOTE_STREAM_RETENTION_SECONDS", "300"))
+# 过期事件的清理间隔（秒）：清理需要遍历所有任务，不在每次发布增量时执行
+_GC_INTERVAL_SECONDS = 30
+# Markdown 缓冲文件的刷盘间隔（秒）：增量按 token 到达，不逐条写盘；其他进程轮询时最多滞后这么久
+_MARKDOWN_FLUSH_SECONDS = 0.5
+
+TERMINAL_STATUSES = {TaskStatus.SUCCESS.value, TaskStatus.FAILED.value, "CANCELED"}
+
+# (序号, 事件类型, 数据)
+StreamEvent = Tuple[int, str, Dict[str, Any]]
+# SSE 订阅者：(所在事件循环, 唤醒事件)
+_Waiter = Tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+def stream_markdown_path(task_id: str) -> Path:
+    """
+    总结阶段增量写入的 Markdown 缓冲文件，其他进程或重启后的服务可直接读取已生成的部分
+    """
+    return NOTE_OUTPUT_DIR / f"{task_id}_markdown.stream.md"
+
+
+class _TaskStream:
+    def __init__(self):
+        self.events: List[StreamEvent] = []
+        self.seq = 0
+        self.finished_at: Optional[float] = None
+        self.touched_at = time.monotonic()
+        self.waiters: Set[_Waiter] = set()
+
+
+class _MarkdownWriter:
+    """
+    单个任务的 Markdown 缓冲文件句柄：首个增量时打开，总结结束时关闭，期间按间隔刷盘
+    """
+
+    def __init__(self, path: Path):
+        self.file: TextIO = path.open("a", encoding="utf-8")
+        self.flushed_at = time.monotonic()
+
+    def write(self, text: str) -> None:
+        self.file.write(text)
+        now = time.monotonic()
+        if now - self.flushed_at >= _MARKDOWN_FLUSH_SECONDS:
+            self.file.flush()
+            self.flushed_at = now
+
+
+class NoteStreamHub:
+    """
+    进程内的任务事件中心：任务执行线程发布阶段变更与总结增量，SSE 订阅者按序号增量拉取。
+    订阅者在事件循环中等待 asyncio.Event，发布时通过 call_soon_threadsafe 唤醒，不占用线程池。
+
+    事件类型：
+    - stage：阶段变更，data 为 {"status", "message", "progress"}
+    - reset：重新开始生成 Markdown（如重试），订阅者应清空已渲染内容
+    - delta：Markdown 增量文本，data 为 {"text"}
+    - done：任务结束，data 为 {"status"}
+    """
+
+    def __init__(self, retention_seconds: float = NOTE_STREAM_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._streams: Dict[str, _TaskStream] = {}
+        self._lock = Lock()
+        self._last_gc = time.monotonic()
+        self._writers: Dict[str, _MarkdownWriter] = {}
+        self._writers_lock = Lock()
+
+    # ---------------- 发布 ----------------
+
+    def publish_stage(self, task_id: str, status: str, message: Optional[str] = None,
+                      progress: Optional[float] = None) -> None:
+        data = {"status": status}
+        if message:
+            data["message"] = message
+        if progress is not None:
+            data["progress"] = round(progress, 4)
+        if status in TERMINAL_STATUSES:
+            # 正常流程在总结结束时已关闭；异常退出时在这里兜底，保证结束前增量已落盘
+            self.finish_markdown(task_id)
+        self._publish(task_id, "stage", data)
+        if status in TERMINAL_STATUSES:
+            self._publish(task_id, "done", {"status": status}, finish=True)
+
+    def reset_markdown(self, task_id: str) -> None:
+        self.finish_markdown(task_id)
+        try:
+            stream_markdown_path(task_id).write_text("", encoding="utf-8")
+        except Exception as exc:
+            logger.warning(f"重置 Markdown 缓冲文件失败：{exc}")
+        self._publish(task_id, "reset", {})
+
+    def publish_delta(self, task_id: str, text: str) -> None:
+        if not text:
+            return
+        try:
+            with self._writers_lock:
+                writer = self._writers.get(task_id)
+                if writer is None:
+                    writer = self._writers[task_id] = _MarkdownWriter(stream_markdown_path(task_id))
+                writer.write(text)
+        except Exception as exc:
+            logger.warning(f"写入 Markdown 缓冲文件失败：{exc}")
+        self._publish(task_id, "delta", {"text": text})
+
+    def finish_markdown(self, task_id: str) -> None:
+        """
+        总结结束：写完剩余内容并关闭缓冲文件句柄
+        """
+        with self._writers_lock:
+            writer = self._writers.pop(task_id, None)
+        if writer is None:
+            return
+        try:
+            writer.file.close()
+        except Exception as exc:
+            logger.warning(f"关闭 Markdown 缓冲文件失败：{exc}")
+
+    # ---------------- 订阅 ----------------
+
+    def has_stream(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._streams
+
+    async def wait_events(self, task_id: str, after_seq: int, timeout: float) -> Tuple[List[StreamEvent], bool]:
+        """
+        等待序号大于 after_seq 的事件，超时返回空列表。
+
+        :return: (事件列表, 任务是否已结束)
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            stream = self._streams.setdefault(task_id, _TaskStream())
+            if stream.seq > after_seq or stream.finished_at is not None:
+                return self._collect(stream, after_seq)
+            stream.waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                stream.waiters.discard(waiter)
+        with self._lock:
+            # 等待期间流可能被清理后重建，以当前的为准
+            return self._collect(self._streams.setdefault(task_id, stream), after_seq)
+
+    # ---------------- 内部 ----------------
+
+    @staticmethod
+    def _collect(stream: _TaskStream, after_seq: int) -> Tuple[List[StreamEvent], bool]:
+        stream.touched_at = time.monotonic()
+        events = [event for event in stream.events if event[0] > after_seq]
+        return events, stream.finished_at is not None
+
+    def _publish(self, task_id: str, event: str, data: Dict[str, Any], finish: bool = False) -> None:
+        with self._lock:
+            stream = self._streams.get(task_id)
+            if stream is None:
+                stream = self._streams[task_id] = _TaskStream()
+            elif stream.finished_at is not None and event == "stage":
+                # 同一任务重新执行（重试）：清空旧事件，序号继续递增
+                stream.events = []
+                stream.finished_at = None
+            stream.seq += 1
+            stream.events.append((stream.seq, event, data))
+            stream.touched_at = time.monotonic()
+            if finish:
+                stream.finished_at = time.monotonic()
+            if stream.touched_at - self._last_gc >= _GC_INTERVAL_SECONDS:
+                self._gc()
+            waiters = list(stream.waiters)
+        for loop, ready in waiters:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # 订阅者所在的事件循环已关闭
+                pass
+
+    def _gc(self) -> None:
+        now = self._last_gc = time.monotonic()
+        expired = [
+            task_id for task_id, stream in self._streams.items()
+            if now - (stream.finished_at or stream.touched_at) > self.retention_seconds
+        ]
+        for task_id in expired:
+            del self._streams[task_id]
+
+
+class MarkdownTail:
+    """
+    跟踪 Markdown 缓冲文件的增量：任务在其他进程执行时（QUEUE_MODE=api 或多个 API 进程），
+    本进程收不到发布的事件，SSE 按字节偏移轮询该文件读取新增内容。
+    """
+
+    def __init__(self, task_id: str):
+        self.path = stream_markdown_path(task_id)
+        self.offset = 0
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def read(self) -> Tuple[bool, str]:
+        """
+        :return: (文件是否被截断（重新生成，订阅者应清空已渲染内容）, 新增文本)
+        """
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return False, ""
+        reset = size < self.offset
+        if reset:
+            self.offset = 0
+            self._decoder.reset()
+        if size == self.offset:
+            return reset, ""
+        with self.path.open("rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset += len(data)
+        # 增量解码：读到半个多字节字符时留到下次拼接
+        return reset, self._decoder.decode(data)
+
+
+def format_sse(seq: int, event: str, data: Dict[str, Any]) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+note_stream_hub = NoteStreamHub()
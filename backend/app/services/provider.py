@@ -29,6 +29,9 @@ class ProviderService:
             "enabled": row.get("enabled"),
             "base_url": row.get("base_url"),
             "api_key": row.get("api_key"),
+            "rpm_limit": row.get("rpm_limit"),
+            "tpm_limit": row.get("tpm_limit"),
+            "max_concurrency": row.get("max_concurrency"),
             "created_at": jsonable_encoder(row.get("created_at")),
             # "name": row[1],
             # "logo": row[2],
@@ -52,6 +55,9 @@ class ProviderService:
             "enabled": row.get("enabled"),
             "base_url": row.get("base_url"),
             "api_key":  ProviderService.mask_key(row.get("api_key")),
+            "rpm_limit": row.get("rpm_limit"),
+            "tpm_limit": row.get("tpm_limit"),
+            "max_concurrency": row.get("max_concurrency"),
             "created_at": jsonable_encoder(row.get("created_at")),
 
             # "id": row[0],
@@ -69,11 +75,11 @@ class ProviderService:
             return '*' * len(key)
         return key[:4] + '*' * (len(key) - 8) + key[-4:]
     @staticmethod
-    def add_provider( name: str, api_key: str, base_url: str, logo: str, type_: str, enabled: int = 1):
+    def add_provider( name: str, api_key: str, base_url: str, logo: str, type_: str, enabled: int = 1, **limits):
         try:
             id = uuid().lower()
             logo='custom'
-            return insert_provider(id, name, api_key, base_url, logo, type_, enabled)
+            return insert_provider(id, name, api_key, base_url, logo, type_, enabled, **limits)
         except Exception as  e:
             print('创建模式失败',e)
     @staticmethod
@@ -86,6 +92,9 @@ class ProviderService:
             "api_key": p.api_key,
             "base_url": p.base_url,
             "enabled": p.enabled,
+            "rpm_limit": p.rpm_limit,
+            "tpm_limit": p.tpm_limit,
+            "max_concurrency": p.max_concurrency,
             "created_at": p.created_at,
         }
     @staticmethod
@@ -1,22 +1,64 @@
 import os
 import json
+import hashlib
+import shutil
+import time
 from dataclasses import asdict
 from datetime import datetime, timedelta, timezone
-from queue import Queue, Empty
-from threading import Thread, Event
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Event, Condition, Lock
 from typing import Optional, Dict, Any, Tuple
+from urllib.parse import parse_qs, urlparse
 from uuid import uuid4
 
+from sqlalchemy import exists, select, update
+
 from app.enmus.task_status_enums import TaskStatus
-from app.db.engine import get_db
+from app.db.engine import unit_of_work
 from app.db.models.task_queue import TaskQueueItem, TaskQueueState
-from app.services.note import NoteGenerator, NOTE_OUTPUT_DIR
+from app.db.video_task_dao import get_video_task, insert_video_task
+from app.models.notes_model import NoteTask
+from app.services.cancellation import TaskCanceledError, cancellation_registry
+from app.services.frame_cache import frame_cache
+from app.services.note import NoteGenerator, NOTE_OUTPUT_DIR, NOTE_STAGES
+from app.services.task_status import task_status_registry
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# 队列运行模式：
+#   embedded —— API 进程内同时运行队列（默认，单进程部署）
+#   api      —— API 进程只负责入队，任务由独立的 worker 进程（python worker.py）执行
+#   worker   —— 独立 worker 进程，由 worker.py 设置
+QUEUE_MODE = os.getenv("QUEUE_MODE", "embedded").lower()
+
 LOCK_TIMEOUT_SECONDS = int(os.getenv("QUEUE_LOCK_TIMEOUT_SECONDS", "600"))
-POLL_INTERVAL_SECONDS = float(os.getenv("QUEUE_POLL_INTERVAL_SECONDS", "0.5"))
+# 运行中任务的租约续期间隔，需明显小于 LOCK_TIMEOUT_SECONDS，避免长时间转写被误判为过期
+HEARTBEAT_SECONDS = float(os.getenv("QUEUE_HEARTBEAT_SECONDS", str(max(1, LOCK_TIMEOUT_SECONDS // 4))))
+# 过期租约回收间隔：worker 崩溃或进程退出后，其任务在租约过期后由任一进程重新入队
+REAPER_INTERVAL_SECONDS = float(os.getenv("QUEUE_REAPER_INTERVAL_SECONDS", str(max(1, min(60, LOCK_TIMEOUT_SECONDS // 2)))))
+# 取消信号同步间隔：API 进程取消任务只写数据库，执行该任务的 worker 按此间隔发现并中断正在进行的阶段；
+# 设为 0 时只在租约续期时发现
+CANCEL_POLL_SECONDS = float(os.getenv("QUEUE_CANCEL_POLL_SECONDS", "2"))
+# 空闲兜底复查间隔：进程内入队/恢复会直接唤醒 worker，仅在超时后才回查数据库；
+# 独立 worker 进程收不到 API 进程的唤醒，只能靠轮询发现新任务，因此默认间隔更短
+IDLE_RECHECK_SECONDS = float(os.getenv("QUEUE_IDLE_RECHECK_SECONDS", "1" if QUEUE_MODE == "worker" else "30"))
+
+# 与已完成任务指纹相同的请求直接复用其结果；设为 false 时只合并仍在进行中的相同请求
+NOTE_DEDUP_COMPLETED = os.getenv("NOTE_DEDUP_COMPLETED", "true").lower() == "true"
+# 参与指纹计算的生成参数
+FINGERPRINT_FIELDS = (
+    "quality", "model_name", "provider_id", "format", "style", "extras",
+    "link", "screenshot", "video_understanding", "video_interval", "grid_size",
+)
+
+# 各阶段独立的并发上限：下载/总结受网络与供应商限流约束，转写受 CPU 核数约束
+STAGE_CONCURRENCY = {
+    "download": int(os.getenv("QUEUE_DOWNLOAD_CONCURRENCY", "4")),
+    "transcribe": int(os.getenv("QUEUE_TRANSCRIBE_CONCURRENCY", str(max(1, (os.cpu_count() or 2) // 2)))),
+    "summarize": int(os.getenv("QUEUE_SUMMARIZE_CONCURRENCY", "4")),
+    "post_process": int(os.getenv("QUEUE_POST_PROCESS_CONCURRENCY", "2")),
+}
 
 
 def _save_note_to_file(task_id: str, note):
@@ -25,7 +67,31 @@ def _save_note_to_file(task_id: str, note):
         json.dump(asdict(note), f, ensure_ascii=False, indent=2)
 
 
-def _run_note_task(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
+def _build_note_task(payload: Dict[str, Any]) -> NoteTask:
+    return NoteTask(
+        task_id=payload.get("task_id"),
+        video_url=payload.get("video_url", ""),
+        platform=payload.get("platform", ""),
+        quality=payload.get("quality"),
+        model_name=payload.get("model_name"),
+        provider_id=payload.get("provider_id"),
+        link=payload.get("link") or False,
+        screenshot=payload.get("screenshot") or False,
+        _format=payload.get("format"),
+        style=payload.get("style"),
+        extras=payload.get("extras"),
+        video_understanding=payload.get("video_understanding", False),
+        video_interval=payload.get("video_interval", 0),
+        grid_size=payload.get("grid_size") or [],
+    )
+
+
+class LeaseLostError(Exception):
+    """任务租约已过期并被回收（可能已由其他 worker 重新领取），当前 worker 应停止处理"""
+
+
+def _run_note_task(payload: Dict[str, Any], pipeline: "StagePipeline",
+                   leases: Optional["LeaseKeeper"] = None) -> Tuple[bool, Optional[str]]:
     task_id = payload.get("task_id")
     if not task_id:
         return False, "缺少 task_id"
@@ -35,44 +101,217 @@ def _run_note_task(payload: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
         NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="请选择模型和提供者")
         return False, "请选择模型和提供者"
     try:
-        note = NoteGenerator().generate(
-            video_url=payload.get("video_url", ""),
-            platform=payload.get("platform", ""),
-            quality=payload.get("quality"),
-            task_id=task_id,
-            model_name=model_name,
-            provider_id=provider_id,
-            link=payload.get("link"),
-            _format=payload.get("format"),
-            style=payload.get("style"),
-            extras=payload.get("extras"),
-            screenshot=payload.get("screenshot"),
-            video_understanding=payload.get("video_understanding", False),
-            video_interval=payload.get("video_interval", 0),
-            grid_size=payload.get("grid_size", []),
-        )
+        generator = NoteGenerator()
+        task = _build_note_task(payload)
+        generator.prepare(task)
+        for stage in NOTE_STAGES:
+            if leases is not None and not leases.is_held(task_id):
+                raise LeaseLostError()
+            pipeline.run(stage, generator.run_stage, task, stage)
+        if leases is not None and not leases.is_held(task_id):
+            raise LeaseLostError()
+        note = generator.finish(task)
         if note and note.markdown:
             _save_note_to_file(task_id, note)
         return True, None
+    except LeaseLostError:
+        # 任务已归其他 worker 所有，不再改写它的状态
+        logger.warning(f"任务租约已失效，停止处理 {task_id}")
+        return False, "任务租约已失效"
+    except TaskCanceledError:
+        if leases is not None and not leases.is_held(task_id):
+            logger.warning(f"任务租约已失效，停止处理 {task_id}")
+            return False, "任务租约已失效"
+        logger.info(f"任务已取消，停止处理 {task_id}")
+        NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
+        return False, "任务已取消"
     except Exception as exc:
         NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message=str(exc))
         logger.error(f"任务执行失败 {task_id}: {exc}", exc_info=True)
         return False, str(exc)
 
 
+class StagePipeline:
+    """
+    按阶段划分的执行池：下载、转写、总结、后处理各自拥有独立的有界线程池。
+    任务完成当前阶段后立即进入下一阶段的池中排队，不同任务的不同阶段可以同时进行。
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        self.pools = {
+            stage: ThreadPoolExecutor(max_workers=max(1, limit), thread_name_prefix=f"note-{stage}")
+            for stage, limit in limits.items()
+        }
+
+    def run(self, stage: str, fn, *args):
+        return self.pools[stage].submit(fn, *args).result()
+
+    def shutdown(self):
+        for pool in self.pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class LeaseKeeper:
+    """
+    租约续期：后台线程定期刷新本进程正在执行的任务的 locked_at。
+    续期以 lock_owner 为条件，续期失败说明租约已被回收，is_held 随之返回 False。
+    同一线程每隔 CANCEL_POLL_SECONDS 检查这些任务是否已在数据库中被取消（可能由其他进程取消），
+    取消或租约失效时触发任务的取消令牌，正在进行的阶段随即中断。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._leases: Dict[str, str] = {}
+        self._lost: set = set()
+        self._lock = Lock()
+        self._stop_event = Event()
+        self._thread: Optional[Thread] = None
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = Thread(target=self._loop, name="queue-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def hold(self, task_id: str, worker_id: str):
+        with self._lock:
+            self._leases[task_id] = worker_id
+            self._lost.discard(task_id)
+
+    def release(self, task_id: str):
+        with self._lock:
+            self._leases.pop(task_id, None)
+            self._lost.discard(task_id)
+
+    def is_held(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id not in self._lost
+
+    def _loop(self):
+        tick = min(self.interval, CANCEL_POLL_SECONDS) if CANCEL_POLL_SECONDS > 0 else self.interval
+        next_renew = time.monotonic() + self.interval
+        while not self._stop_event.wait(tick):
+            with self._lock:
+                leases = dict(self._leases)
+            if not leases:
+                continue
+            if CANCEL_POLL_SECONDS > 0:
+                try:
+                    for task_id in _canceled_task_ids(list(leases)):
+                        if cancellation_registry.cancel(task_id):
+                            logger.info(f"检测到任务已取消，中断执行 {task_id}")
+                except Exception as exc:
+                    logger.error(f"检查任务取消状态失败：{exc}")
+            if time.monotonic() < next_renew:
+                continue
+            next_renew = time.monotonic() + self.interval
+            try:
+                lost = _renew_leases(leases)
+            except Exception as exc:
+                logger.error(f"任务租约续期失败：{exc}")
+                continue
+            if lost:
+                logger.warning(f"任务租约已被回收：{', '.join(lost)}")
+                with self._lock:
+                    self._lost.update(task_id for task_id in lost if task_id in self._leases)
+                # 任务已不归本 worker，立即停止当前阶段，释放 CPU 与网络
+                for task_id in lost:
+                    cancellation_registry.cancel(task_id)
+
+
+class TaskDispatcher:
+    """
+    进程内任务分发器：空闲 worker 阻塞在条件变量上，入队或恢复队列时才被唤醒。
+    暂停状态不在进程内缓存，由领取语句本身检查（见 _claim_returning），
+    其他进程（API 进程、其他 uvicorn worker）暂停队列后下一次领取即生效。
+    """
+
+    def __init__(self):
+        self._cond = Condition()
+        self._has_pending = True
+        # 每次唤醒递增；领取期间有新的唤醒时，空结果不能清除 _has_pending
+        self._generation = 0
+        self._last_check = 0.0
+        self._stopped = False
+
+    def start(self):
+        with self._cond:
+            self._stopped = False
+            self._has_pending = True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def notify(self):
+        with self._cond:
+            self._has_pending = True
+            self._generation += 1
+            self._cond.notify()
+
+    def notify_all(self):
+        with self._cond:
+            self._has_pending = True
+            self._generation += 1
+            self._cond.notify_all()
+
+    def next_task(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        阻塞直到领取到一个任务；分发器停止时返回 None。
+        领取（数据库写事务）在锁外执行，不阻塞其他 worker 与入队唤醒。
+        """
+        while True:
+            with self._cond:
+                while not self._stopped and not self._has_pending:
+                    self._cond.wait(timeout=IDLE_RECHECK_SECONDS)
+                    if time.monotonic() - self._last_check >= IDLE_RECHECK_SECONDS:
+                        # 兜底：其他进程写入或恢复的任务不会触发本进程的唤醒
+                        self._has_pending = True
+                if self._stopped:
+                    return None
+                self._last_check = time.monotonic()
+                generation = self._generation
+            payload = _dequeue_task(worker_id)
+            with self._cond:
+                if payload is not None:
+                    # 队列里可能还有任务，交给下一个空闲 worker 继续领取
+                    self._cond.notify()
+                    return payload
+                if generation == self._generation:
+                    self._has_pending = False
+
+
+_dispatcher = TaskDispatcher()
+
+
 class TaskQueue:
     def __init__(self, concurrency: int):
+        # concurrency 为同时在流水线中的任务数，每个阶段的实际并发由 STAGE_CONCURRENCY 限制
         self.concurrency = max(1, concurrency)
-        self.queue: Queue[Optional[Dict[str, Any]]] = Queue()
+        self.dispatcher = _dispatcher
+        self.pipeline: Optional[StagePipeline] = None
         self.stop_event = Event()
         self.workers: list[Thread] = []
         self.worker_group_id = uuid4().hex
+        self.leases = LeaseKeeper(HEARTBEAT_SECONDS)
+        self.reaper: Optional[Thread] = None
 
     def start(self):
         if self.workers:
             return
         _ensure_queue_state()
         _recover_stale_tasks()
+        self.dispatcher.start()
+        self.pipeline = StagePipeline(STAGE_CONCURRENCY)
+        self.leases.start()
+        self.reaper = Thread(target=self._reaper_loop, name="queue-reaper", daemon=True)
+        self.reaper.start()
         for _ in range(self.concurrency):
             worker_id = f"{self.worker_group_id}-{len(self.workers)}"
             worker = Thread(target=self._worker_loop, args=(worker_id,), daemon=True)
@@ -83,54 +322,58 @@ class TaskQueue:
         if not self.workers:
             return
         self.stop_event.set()
-        for _ in self.workers:
-            self.queue.put(None)
+        self.dispatcher.stop()
         for worker in self.workers:
             worker.join(timeout=1)
         self.workers = []
+        self.leases.stop()
+        if self.reaper:
+            self.reaper.join(timeout=1)
+            self.reaper = None
+        if self.pipeline:
+            self.pipeline.shutdown()
+            self.pipeline = None
 
     def enqueue(self, payload: Dict[str, Any]):
-        self.queue.put(payload)
+        self.dispatcher.notify()
 
     def size(self) -> int:
-        db = next(get_db())
-        try:
-            return (
-                db.query(TaskQueueItem)
-                .filter(TaskQueueItem.status == TaskStatus.QUEUED.value, TaskQueueItem.paused == False)
-                .count()
-            )
-        finally:
-            db.close()
+        return _queued_count()
 
     def _worker_loop(self, worker_id: str):
         while not self.stop_event.is_set():
-            if _is_queue_paused():
-                self.stop_event.wait(POLL_INTERVAL_SECONDS)
-                continue
-            try:
-                payload = self.queue.get(timeout=0.5)
-            except Empty:
-                payload = None
-            if payload is None:
-                payload = _dequeue_task(worker_id)
+            payload = self.dispatcher.next_task(worker_id)
             if payload is None:
                 continue
+            task_id = payload.get("task_id")
+            if task_id and is_task_canceled(task_id):
+                NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
+                # _finalize_task 会把 CANCELED 改为 FAILED 并释放锁，无需再单独 clear_canceled
+                _finalize_task(task_id, False, "任务已取消")
+            else:
+                token = cancellation_registry.create(task_id)
+                self.leases.hold(task_id, worker_id)
+                try:
+                    success, error_message = _run_note_task(payload, self.pipeline, self.leases)
+                    if token.is_canceled():
+                        # 被取消的任务 cancel_task 已释放锁，只需把 CANCELED 落为 FAILED
+                        clear_canceled(task_id)
+                    elif not _finalize_task(task_id, success, error_message, worker_id=worker_id):
+                        # 以 lock_owner 为条件提交结果：租约被回收后不会覆盖新 worker 的状态。
+                        # 未提交时也可能是任务在其他进程被取消、租约线程尚未发现就已执行完，
+                        # 此时行停留在 CANCELED（cancel_task 已清空 lock_owner），落为 FAILED
+                        clear_canceled(task_id)
+                finally:
+                    self.leases.release(task_id)
+                    cancellation_registry.discard(task_id)
+
+    def _reaper_loop(self):
+        while not self.stop_event.wait(REAPER_INTERVAL_SECONDS):
             try:
-                task_id = payload.get("task_id")
-                if task_id and is_task_canceled(task_id):
-                    NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
-                    clear_canceled(task_id)
-                    _finalize_task(task_id, False, "任务已取消")
-                else:
-                    success, error_message = _run_note_task(payload)
-                    _finalize_task(task_id, success, error_message)
-            finally:
-                if payload is not None:
-                    try:
-                        self.queue.task_done()
-                    except ValueError:
-                        pass
+                if _recover_stale_tasks():
+                    self.dispatcher.notify_all()
+            except Exception as exc:
+                logger.error(f"回收过期任务失败：{exc}")
 
 
 _task_queue: Optional[TaskQueue] = None
@@ -140,7 +383,8 @@ def start_task_queue() -> TaskQueue:
     global _task_queue
     if _task_queue:
         return _task_queue
-    concurrency = int(os.getenv("QUEUE_CONCURRENCY", "1"))
+    # 流水线中同时推进的任务数，需大于 1 才能让不同任务的不同阶段重叠执行
+    concurrency = int(os.getenv("QUEUE_CONCURRENCY", "4"))
     _task_queue = TaskQueue(concurrency)
     _task_queue.start()
     return _task_queue
@@ -154,17 +398,156 @@ def stop_task_queue():
 
 
 def enqueue_task(payload: Dict[str, Any]) -> int:
+    if QUEUE_MODE == "api":
+        # 只写入数据库，由 worker 进程轮询领取
+        _upsert_task(payload)
+        return _queued_count()
     queue = start_task_queue()
     _upsert_task(payload)
     queue.enqueue(payload)
     return queue.size()
 
 
+def build_fingerprint(payload: Dict[str, Any], video_id: Optional[str] = None) -> str:
+    """
+    计算请求指纹：平台 + 规范化的视频标识 + 生成参数。
+    能解析出视频 ID 时忽略链接中的追踪参数等差异（B 站保留分 P 参数），否则使用原始链接。
+    """
+    video_url = (payload.get("video_url") or "").strip()
+    if video_id:
+        source = video_id
+        page = parse_qs(urlparse(video_url).query).get("p")
+        if page and page[0] not in ("", "1"):
+            source = f"{video_id}?p={page[0]}"
+    else:
+        source = video_url
+    options = {}
+    for field in FINGERPRINT_FIELDS:
+        value = payload.get(field)
+        value = getattr(value, "value", value)
+        if field == "format":
+            value = sorted(value or [])
+        elif field in ("link", "screenshot", "video_understanding"):
+            value = bool(value)
+        elif field == "grid_size":
+            value = list(value or [])
+        elif isinstance(value, str):
+            value = value.strip() or None
+        options[field] = value
+    raw = json.dumps(
+        {"platform": payload.get("platform") or "", "source": source, "options": options},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def submit_task(payload: Dict[str, Any], video_id: Optional[str] = None,
+                force: bool = False) -> Tuple[str, Optional[str]]:
+    """
+    提交笔记任务，指纹相同的请求合并处理：
+
+    - 有相同的任务正在排队或执行：直接返回该任务的 task_id，不再重复下载、转写、总结；
+    - 有相同的任务已完成（NOTE_DEDUP_COMPLETED）：为本次请求建立结果副本，立即完成；
+    - force=True 时不合并，总是重新生成。
+
+    查找与写入在同一个写事务中完成，并发的相同请求只会有一个真正入队。
+
+    :return: (task_id, 合并方式)，合并方式为 None（新任务）、"running" 或 "completed"
+    """
+    fingerprint = build_fingerprint(payload, video_id)
+    payload = {**payload, "fingerprint": fingerprint}
+    task_id = payload["task_id"]
+    completed_task_id = None
+    with unit_of_work(write=True) as db:
+        if not force:
+            running = (
+                db.query(TaskQueueItem.task_id)
+                .filter(
+                    TaskQueueItem.fingerprint == fingerprint,
+                    TaskQueueItem.status.in_([TaskStatus.QUEUED.value, "RUNNING"]),
+                )
+                .order_by(TaskQueueItem.created_at.desc())
+                .first()
+            )
+            if running:
+                logger.info(f"相同请求正在处理，合并到任务 {running.task_id}")
+                return running.task_id, "running"
+            if NOTE_DEDUP_COMPLETED:
+                completed = (
+                    db.query(TaskQueueItem.task_id)
+                    .filter(TaskQueueItem.fingerprint == fingerprint,
+                            TaskQueueItem.status == TaskStatus.SUCCESS.value)
+                    .order_by(TaskQueueItem.created_at.desc())
+                    .first()
+                )
+                if completed and (NOTE_OUTPUT_DIR / f"{completed.task_id}.json").exists():
+                    completed_task_id = completed.task_id
+        if completed_task_id is None:
+            _write_task(db, payload)
+
+    if completed_task_id is not None:
+        if _alias_completed_task(completed_task_id, payload):
+            logger.info(f"相同请求已完成，复用任务 {completed_task_id} 的结果 (task_id={task_id})")
+            return task_id, "completed"
+        _upsert_task(payload)
+
+    # 独立 worker 进程模式下本进程不运行队列，worker 轮询数据库领取
+    if QUEUE_MODE != "api":
+        start_task_queue().enqueue(payload)
+    return task_id, None
+
+
+def _alias_completed_task(source_task_id: str, payload: Dict[str, Any]) -> bool:
+    """
+    为已完成任务建立结果副本：结果文件硬链接（不支持时复制）、任务记录与截图引用，新任务直接标记完成
+    """
+    task_id = payload["task_id"]
+    source = get_video_task(source_task_id)
+    source_file = NOTE_OUTPUT_DIR / f"{source_task_id}.json"
+    target_file = NOTE_OUTPUT_DIR / f"{task_id}.json"
+    if source is None:
+        return False
+    try:
+        try:
+            os.link(source_file, target_file)
+        except OSError:
+            shutil.copyfile(source_file, target_file)
+    except OSError as exc:
+        logger.warning(f"复用已完成任务结果失败 (task_id={source_task_id})：{exc}")
+        return False
+
+    frame_cache.share(source_task_id, task_id)
+    insert_video_task(
+        video_id=source.video_id,
+        platform=source.platform,
+        task_id=task_id,
+        status=TaskStatus.SUCCESS.value,
+        title=source.title,
+        cover_url=source.cover_url,
+        duration=source.duration,
+        video_url=payload.get("video_url") or source.video_url,
+    )
+    with unit_of_work(write=True) as db:
+        _write_task(db, payload, status=TaskStatus.SUCCESS.value)
+    # 新 task_id 还没有 SSE 订阅者，只需更新状态中心
+    task_status_registry.set(task_id, TaskStatus.SUCCESS.value)
+    return True
+
+
+def _queued_count() -> int:
+    with unit_of_work() as db:
+        return (
+            db.query(TaskQueueItem)
+            .filter(TaskQueueItem.status == TaskStatus.QUEUED.value, TaskQueueItem.paused == False)
+            .count()
+        )
+
+
 def cancel_task(task_id: str) -> bool:
     if not task_id:
         return False
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         updated = (
             db.query(TaskQueueItem)
             .filter(TaskQueueItem.task_id == task_id)
@@ -178,31 +561,39 @@ def cancel_task(task_id: str) -> bool:
                 synchronize_session=False,
             )
         )
-        db.commit()
-        if updated:
-            NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
-        return updated > 0
-    finally:
-        db.close()
+    if updated:
+        NoteGenerator()._update_status(task_id, TaskStatus.FAILED, message="任务已取消")
+        # 任务正在本进程执行时立即中断；在其他 worker 进程执行时由其租约线程发现
+        cancellation_registry.cancel(task_id)
+    return updated > 0
 
 
 def is_task_canceled(task_id: str) -> bool:
     if not task_id:
         return False
-    db = next(get_db())
-    try:
+    with unit_of_work() as db:
         item = db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).first()
         return bool(item and item.status == "CANCELED")
-    finally:
-        db.close()
+
+
+def _canceled_task_ids(task_ids: list) -> list:
+    with unit_of_work() as db:
+        return list(db.scalars(
+            select(TaskQueueItem.task_id).where(
+                TaskQueueItem.task_id.in_(task_ids),
+                TaskQueueItem.status == "CANCELED",
+            )
+        ))
 
 
 def clear_canceled(task_id: str) -> None:
     if not task_id:
         return
-    db = next(get_db())
-    try:
-        db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).update(
+    with unit_of_work(write=True) as db:
+        db.query(TaskQueueItem).filter(
+            TaskQueueItem.task_id == task_id,
+            TaskQueueItem.status == "CANCELED",
+        ).update(
             {
                 "status": TaskStatus.FAILED.value,
                 "locked_at": None,
@@ -210,216 +601,301 @@ def clear_canceled(task_id: str) -> None:
             },
             synchronize_session=False,
         )
-        db.commit()
-    finally:
-        db.close()
 
 
 def pause_queue() -> None:
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         state = _get_or_create_queue_state(db)
         state.is_paused = True
-        db.commit()
-    finally:
-        db.close()
 
 
 def resume_queue() -> None:
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         state = _get_or_create_queue_state(db)
         state.is_paused = False
-        db.commit()
-    finally:
-        db.close()
+    _dispatcher.notify_all()
 
 
 def pause_task(task_id: str) -> bool:
     if not task_id:
         return False
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         updated = (
             db.query(TaskQueueItem)
             .filter(TaskQueueItem.task_id == task_id, TaskQueueItem.status == TaskStatus.QUEUED.value)
             .update({"paused": True}, synchronize_session=False)
         )
-        db.commit()
-        return updated > 0
-    finally:
-        db.close()
+    return updated > 0
 
 
 def resume_task(task_id: str) -> bool:
     if not task_id:
         return False
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         updated = (
             db.query(TaskQueueItem)
             .filter(TaskQueueItem.task_id == task_id)
             .update({"paused": False}, synchronize_session=False)
         )
-        db.commit()
-        return updated > 0
-    finally:
-        db.close()
+    if updated:
+        _dispatcher.notify()
+    return updated > 0
 
 
 def _get_or_create_queue_state(db):
+    """
+    获取队列全局状态，不存在时创建。由调用方的 unit_of_work 统一提交。
+    """
     state = db.query(TaskQueueState).filter(TaskQueueState.id == 1).first()
     if not state:
         state = TaskQueueState(id=1, is_paused=False)
         db.add(state)
-        db.commit()
-        db.refresh(state)
+        db.flush()
     return state
 
 
 def _ensure_queue_state() -> None:
-    db = next(get_db())
-    try:
+    with unit_of_work(write=True) as db:
         _get_or_create_queue_state(db)
-    finally:
-        db.close()
-
-
-def _is_queue_paused() -> bool:
-    db = next(get_db())
-    try:
-        state = _get_or_create_queue_state(db)
-        return bool(state.is_paused)
-    finally:
-        db.close()
 
 
 def _upsert_task(payload: Dict[str, Any]) -> None:
-    task_id = payload.get("task_id")
-    if not task_id:
+    if not payload.get("task_id"):
         return
-    db = next(get_db())
-    try:
-        payload_json = json.dumps(payload, ensure_ascii=False)
-        item = db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).first()
-        max_attempts = int(payload.get("max_attempts", 3))
-        if item:
-            item.payload_json = payload_json
-            item.status = TaskStatus.QUEUED.value
-            item.paused = False
-            item.locked_at = None
-            item.lock_owner = None
-            item.last_error = None
-            item.max_attempts = max_attempts
-            item.attempts = 0
-        else:
-            item = TaskQueueItem(
-                task_id=task_id,
-                payload_json=payload_json,
-                status=TaskStatus.QUEUED.value,
-                attempts=0,
-                max_attempts=max_attempts,
-                paused=False,
-            )
-            db.add(item)
-        db.commit()
-    finally:
-        db.close()
+    with unit_of_work(write=True) as db:
+        _write_task(db, payload)
+
+
+def _write_task(db, payload: Dict[str, Any], status: str = TaskStatus.QUEUED.value) -> None:
+    """
+    在调用方的事务中写入（或重置）任务行
+    """
+    task_id = payload["task_id"]
+    payload_json = json.dumps(payload, ensure_ascii=False)
+    max_attempts = int(payload.get("max_attempts", 3))
+    item = db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).first()
+    if item:
+        item.payload_json = payload_json
+        item.status = status
+        item.paused = False
+        item.locked_at = None
+        item.lock_owner = None
+        item.last_error = None
+        item.max_attempts = max_attempts
+        item.attempts = 0
+        item.stage = status
+        item.progress = None
+        item.message = None
+        item.fingerprint = payload.get("fingerprint")
+    else:
+        item = TaskQueueItem(
+            task_id=task_id,
+            payload_json=payload_json,
+            status=status,
+            attempts=0,
+            max_attempts=max_attempts,
+            paused=False,
+            stage=status,
+            fingerprint=payload.get("fingerprint"),
+        )
+        db.add(item)
 
 
 def _dequeue_task(worker_id: str) -> Optional[Dict[str, Any]]:
-    db = next(get_db())
-    try:
-        if _is_queue_paused():
-            return None
+    """
+    领取最早的一个可执行任务；超过重试次数或数据损坏的任务会被标记失败并跳过。
+    整个领取过程在一个写事务中完成，只提交一次。队列暂停时领取不到任务（条件写在领取语句中）。
+
+    数据库支持 UPDATE ... RETURNING 时（SQLite 3.35+、PostgreSQL）用一条语句完成"选出并锁定"，
+    否则回退为查询 + 条件更新。两种方式都走 (status, paused, created_at) 索引，不扫描历史任务。
+    """
+    with unit_of_work(write=True) as db:
+        claim = _claim_returning if db.get_bind().dialect.update_returning else _claim_select_update
+        while True:
+            claimed = claim(db, worker_id)
+            if claimed is None:
+                return None
+            task_id, payload_json, attempts, max_attempts = claimed
+            error = None
+            payload = None
+            if attempts > max_attempts:
+                error = "超过最大重试次数"
+            else:
+                try:
+                    payload = json.loads(payload_json)
+                except Exception:
+                    error = "任务数据解析失败"
+            if error is None:
+                return payload
+            db.execute(
+                update(TaskQueueItem)
+                .where(TaskQueueItem.task_id == task_id)
+                .values(
+                    status=TaskStatus.FAILED.value,
+                    attempts=attempts - 1,
+                    last_error=error,
+                    locked_at=None,
+                    lock_owner=None,
+                )
+            )
+
+
+def _queue_running():
+    """
+    领取条件：队列未被全局暂停。在领取语句中检查，暂停对所有进程立即生效
+    """
+    return ~exists().where(TaskQueueState.id == 1, TaskQueueState.is_paused == True)
+
+
+def _claim_values(worker_id: str) -> Dict[str, Any]:
+    return {
+        "status": "RUNNING",
+        "locked_at": datetime.now(timezone.utc),
+        "lock_owner": worker_id,
+        "attempts": TaskQueueItem.attempts + 1,
+    }
+
+
+def _claim_returning(db, worker_id: str) -> Optional[Tuple[str, str, int, int]]:
+    """
+    原子领取：UPDATE ... WHERE task_id = (最早的可执行任务) RETURNING ...
+    返回 (task_id, payload_json, 领取后的 attempts, max_attempts)，没有可执行任务时返回 None。
+    """
+    next_task = (
+        select(TaskQueueItem.task_id)
+        .where(TaskQueueItem.status == TaskStatus.QUEUED.value, TaskQueueItem.paused == False, _queue_running())
+        .order_by(TaskQueueItem.created_at.asc())
+        .limit(1)
+        # PostgreSQL 上跳过其他进程正在领取的行；SQLite 会忽略该子句（BEGIN IMMEDIATE 已串行化写事务）
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    row = db.execute(
+        update(TaskQueueItem)
+        .where(TaskQueueItem.task_id == next_task, TaskQueueItem.status == TaskStatus.QUEUED.value)
+        .values(**_claim_values(worker_id))
+        .returning(
+            TaskQueueItem.task_id,
+            TaskQueueItem.payload_json,
+            TaskQueueItem.attempts,
+            TaskQueueItem.max_attempts,
+        )
+    ).first()
+    return tuple(row) if row else None
+
+
+def _claim_select_update(db, worker_id: str) -> Optional[Tuple[str, str, int, int]]:
+    """
+    不支持 RETURNING 时的回退：查询最早的可执行任务，再以 status 为条件更新，被其他进程抢先时重试。
+    """
+    while True:
         task = (
-            db.query(TaskQueueItem)
-            .filter(TaskQueueItem.status == TaskStatus.QUEUED.value, TaskQueueItem.paused == False)
+            db.query(TaskQueueItem.task_id, TaskQueueItem.payload_json,
+                     TaskQueueItem.attempts, TaskQueueItem.max_attempts)
+            .filter(TaskQueueItem.status == TaskStatus.QUEUED.value, TaskQueueItem.paused == False, _queue_running())
             .order_by(TaskQueueItem.created_at.asc())
             .first()
         )
         if not task:
             return None
-        if task.attempts >= task.max_attempts:
-            task.status = TaskStatus.FAILED.value
-            task.last_error = "超过最大重试次数"
-            db.commit()
-            return None
-        updated = (
-            db.query(TaskQueueItem)
-            .filter(TaskQueueItem.task_id == task.task_id, TaskQueueItem.status == TaskStatus.QUEUED.value)
-            .update(
-                {
-                    "status": "RUNNING",
-                    "locked_at": datetime.now(timezone.utc),
-                    "lock_owner": worker_id,
-                    "attempts": task.attempts + 1,
-                },
-                synchronize_session=False,
-            )
-        )
-        if updated == 0:
-            db.rollback()
-            return None
-        db.commit()
-        try:
-            payload = json.loads(task.payload_json)
-        except Exception:
-            db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task.task_id).update(
-                {
-                    "status": TaskStatus.FAILED.value,
-                    "last_error": "任务数据解析失败",
-                    "locked_at": None,
-                    "lock_owner": None,
-                },
-                synchronize_session=False,
-            )
-            db.commit()
-            return None
-        return payload
-    finally:
-        db.close()
-
+        updated = db.execute(
+            update(TaskQueueItem)
+            .where(TaskQueueItem.task_id == task.task_id, TaskQueueItem.status == TaskStatus.QUEUED.value)
+            .values(**_claim_values(worker_id))
+        ).rowcount
+        if updated:
+            return task.task_id, task.payload_json, task.attempts + 1, task.max_attempts
 
-def _finalize_task(task_id: Optional[str], success: bool, error_message: Optional[str]) -> None:
-    if not task_id:
-        return
-    db = next(get_db())
-    try:
-        item = db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).first()
-        if not item:
-            return
-        if success:
-            item.status = TaskStatus.SUCCESS.value
-            item.last_error = None
-        else:
-            item.status = TaskStatus.FAILED.value
-            item.last_error = error_message
-        item.locked_at = None
-        item.lock_owner = None
-        db.commit()
-    finally:
-        db.close()
 
+def _finalize_task(task_id: Optional[str], success: bool, error_message: Optional[str],
+                   worker_id: Optional[str] = None) -> bool:
+    """
+    记录任务结果并释放锁
 
-def _recover_stale_tasks() -> None:
-    db = next(get_db())
-    try:
-        cutoff = datetime.now(timezone.utc) - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
-        stale_tasks = (
-            db.query(TaskQueueItem)
-            .filter(TaskQueueItem.status == "RUNNING")
-            .all()
-        )
-        for task in stale_tasks:
-            if task.locked_at is None or task.locked_at < cutoff:
-                if task.attempts >= task.max_attempts:
-                    task.status = TaskStatus.FAILED.value
-                    task.last_error = "超过最大重试次数"
-                else:
-                    task.status = TaskStatus.QUEUED.value
-                task.locked_at = None
-                task.lock_owner = None
-        db.commit()
-    finally:
-        db.close()
+    :param worker_id: 传入时只在任务仍由该 worker 持有时更新（租约被回收、任务被取消后不再覆盖）
+    :return: 是否更新成功
+    """
+    if not task_id:
+        return False
+    conditions = [TaskQueueItem.task_id == task_id]
+    if worker_id is not None:
+        conditions += [TaskQueueItem.status == "RUNNING", TaskQueueItem.lock_owner == worker_id]
+    with unit_of_work(write=True) as db:
+        updated = db.execute(
+            update(TaskQueueItem)
+            .where(*conditions)
+            .values(
+                status=TaskStatus.SUCCESS.value if success else TaskStatus.FAILED.value,
+                last_error=None if success else error_message,
+                locked_at=None,
+                lock_owner=None,
+            )
+        ).rowcount
+    if worker_id is not None and not updated:
+        logger.warning(f"任务已不归当前 worker 所有，结果未提交 {task_id}")
+    return updated > 0
+
+
+def _renew_leases(leases: Dict[str, str]) -> list:
+    """
+    续期租约 {task_id: worker_id}，返回已失效（不再由对应 worker 持有）的 task_id 列表
+    """
+    lost = []
+    now = datetime.now(timezone.utc)
+    with unit_of_work(write=True) as db:
+        for task_id, worker_id in leases.items():
+            updated = db.execute(
+                update(TaskQueueItem)
+                .where(
+                    TaskQueueItem.task_id == task_id,
+                    TaskQueueItem.status == "RUNNING",
+                    TaskQueueItem.lock_owner == worker_id,
+                )
+                .values(locked_at=now)
+            ).rowcount
+            if not updated:
+                lost.append(task_id)
+    return lost
+
+
+def _recover_stale_tasks() -> int:
+    """
+    回收租约过期的 RUNNING 任务：已用完重试次数的标记失败，其余重新入队。
+    两条条件更新在同一个写事务中完成，多个进程同时回收也不会重复处理同一任务。
+
+    :return: 重新入队的任务数
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    expired = (
+        TaskQueueItem.status == "RUNNING",
+        (TaskQueueItem.locked_at == None) | (TaskQueueItem.locked_at < cutoff),
+    )
+    with unit_of_work(write=True) as db:
+        failed = db.execute(
+            update(TaskQueueItem)
+            .where(*expired, TaskQueueItem.attempts >= TaskQueueItem.max_attempts)
+            .values(
+                status=TaskStatus.FAILED.value,
+                last_error="任务租约过期且超过最大重试次数",
+                stage=TaskStatus.FAILED.value,
+                message="任务执行中断且超过最大重试次数",
+                locked_at=None,
+                lock_owner=None,
+            )
+        ).rowcount
+        requeued = db.execute(
+            update(TaskQueueItem)
+            .where(*expired)
+            .values(
+                status=TaskStatus.QUEUED.value,
+                last_error="任务租约过期，已重新入队",
+                stage=TaskStatus.QUEUED.value,
+                message=None,
+                progress=None,
+                locked_at=None,
+                lock_owner=None,
+            )
+        ).rowcount
+    if failed or requeued:
+        logger.info(f"回收过期任务：重新入队 {requeued} 个，标记失败 {failed} 个")
+    return requeued
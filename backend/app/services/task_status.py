@@ -0,0 +1,152 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.db.engine import unit_of_work
+from app.db.models.task_queue import TaskQueueItem
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+NOTE_OUTPUT_DIR = Path(os.getenv("NOTE_OUTPUT_DIR", "note_results"))
+# 已结束任务的状态在内存中保留的时长（秒），之后的查询回落到数据库
+TASK_STATUS_RETENTION_SECONDS = float(os.getenv("TASK_STATUS_RETENTION_SECONDS", "3600"))
+TASK_STATUS_MAX_ENTRIES = int(os.getenv("TASK_STATUS_MAX_ENTRIES", "10000"))
+# API 与 worker 分进程部署（QUEUE_MODE=api）或启动多个 API 进程时，状态可能由其他进程写入，
+# 本进程的内存副本会过期，此时每次读取都查数据库
+QUEUE_MODE = os.getenv("QUEUE_MODE", "embedded").lower()
+BACKEND_WORKERS = int(os.getenv("BACKEND_WORKERS", "1"))
+
+_TERMINAL = {"SUCCESS", "FAILED", "CANCELED"}
+# 过期条目的清理间隔（秒）：清理需要遍历全部条目，不在每次状态更新时执行
+_GC_INTERVAL_SECONDS = 30
+
+
+class TaskStatusRegistry:
+    """
+    任务状态中心：当前阶段、进度与消息保存在内存中，写入时同步落到 task_queue 表。
+
+    轮询直接读内存（字典查找），内存未命中（服务重启、条目已淘汰、其他进程执行的任务）时才查数据库，
+    旧版本遗留的 {task_id}.status.json 作为最后的兜底。
+
+    read_through=True 时（任务在其他进程执行）每次读取都查数据库（按主键查询），不使用内存副本。
+    """
+
+    def __init__(self, retention_seconds: float, max_entries: int, read_through: bool = False):
+        self.retention_seconds = retention_seconds
+        self.max_entries = max_entries
+        self.read_through = read_through
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_gc = time.monotonic()
+
+    def set(self, task_id: str, status: str, message: Optional[str] = None,
+            progress: Optional[float] = None) -> Dict[str, Any]:
+        """
+        更新任务状态并写入数据库
+
+        :return: 写入的状态字典 {"status", "message"?, "progress"?}
+        """
+        data: Dict[str, Any] = {"status": status}
+        if message:
+            data["message"] = message
+        if progress is not None:
+            data["progress"] = round(progress, 4)
+        self._remember(task_id, data)
+        self._write_through(task_id, data)
+        return dict(data)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        if self.read_through:
+            return self._load_from_db(task_id) or self._load_legacy_file(task_id)
+        with self._lock:
+            data = self._entries.get(task_id)
+            if data is not None:
+                self._entries.move_to_end(task_id)
+                return dict(data)
+        data = self._load_from_db(task_id) or self._load_legacy_file(task_id)
+        if data is not None:
+            self._remember(task_id, data)
+        return data
+
+    def forget(self, task_id: str) -> None:
+        with self._lock:
+            self._entries.pop(task_id, None)
+            self._touched.pop(task_id, None)
+
+    # ---------------- 内部 ----------------
+
+    def _remember(self, task_id: str, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._entries[task_id] = dict(data)
+            self._entries.move_to_end(task_id)
+            now = self._touched[task_id] = time.monotonic()
+            if now - self._last_gc >= _GC_INTERVAL_SECONDS:
+                self._gc()
+            # 容量上限每次都检查：只淘汰最久未用的条目，开销为 O(1)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._touched.pop(evicted, None)
+
+    def _gc(self) -> None:
+        now = self._last_gc = time.monotonic()
+        expired = [
+            task_id for task_id, data in self._entries.items()
+            if data.get("status") in _TERMINAL and now - self._touched.get(task_id, now) > self.retention_seconds
+        ]
+        for task_id in expired:
+            self._entries.pop(task_id, None)
+            self._touched.pop(task_id, None)
+
+    @staticmethod
+    def _write_through(task_id: str, data: Dict[str, Any]) -> None:
+        try:
+            with unit_of_work(write=True) as db:
+                db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).update(
+                    {
+                        "stage": data["status"],
+                        "message": data.get("message"),
+                        "progress": data.get("progress"),
+                    },
+                    synchronize_session=False,
+                )
+        except Exception as exc:
+            logger.error(f"写入任务状态失败 (task_id={task_id})：{exc}")
+
+    @staticmethod
+    def _load_from_db(task_id: str) -> Optional[Dict[str, Any]]:
+        with unit_of_work() as db:
+            item = db.query(TaskQueueItem).filter(TaskQueueItem.task_id == task_id).first()
+            if not item or not item.stage:
+                return None
+            data: Dict[str, Any] = {"status": item.stage}
+            if item.message:
+                data["message"] = item.message
+            if item.progress is not None:
+                data["progress"] = item.progress
+            return data
+
+    @staticmethod
+    def _load_legacy_file(task_id: str) -> Optional[Dict[str, Any]]:
+        status_file = NOTE_OUTPUT_DIR / f"{task_id}.status.json"
+        if not status_file.exists():
+            return None
+        try:
+            return json.loads(status_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+
+
+task_status_registry = TaskStatusRegistry(
+    retention_seconds=TASK_STATUS_RETENTION_SECONDS,
+    max_entries=TASK_STATUS_MAX_ENTRIES,
+    read_through=QUEUE_MODE == "api" or BACKEND_WORKERS > 1,
+)
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment
+from app.utils.disk_cache import DiskCacheIndex, file_sha256
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+TRANSCRIPT_CACHE_DIR = Path(
+    os.getenv("TRANSCRIPT_CACHE_DIR", os.path.join(os.getenv("NOTE_OUTPUT_DIR", "note_results"), "transcript_cache"))
+)
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "512"))
+
+
+def media_source_id(platform: Optional[str], video_id: Optional[str], file_path: str) -> str:
+    """
+    生成媒体来源标识：在线平台使用 (platform, video_id)，本地文件按内容哈希，
+    避免不同上传文件同名时互相命中。
+    同一任务的转写与截图阶段、以及同一文件的后续任务都会调用，哈希结果按 (路径, 大小, 修改时间) 缓存。
+    """
+    if platform and video_id and platform != "local":
+        return f"{platform}:{video_id}"
+    path = os.path.realpath(file_path)
+    stat = os.stat(path)
+    return f"sha256:{_cached_sha256(path, stat.st_size, stat.st_mtime_ns)}"
+
+
+@lru_cache(maxsize=256)
+def _cached_sha256(file_path: str, size: int, mtime_ns: int) -> str:
+    # size 与 mtime_ns 只参与缓存键：文件被替换或修改后重新计算
+    return file_sha256(file_path)
+
+
+def build_transcript_key(source_id: str, transcriber_type: str, model_size: Optional[str] = None,
+                         language: Optional[str] = None) -> str:
+    """
+    转写缓存键：同一音频在相同转写器、模型与语言设置下结果可复用
+    """
+    raw = "|".join([source_id, transcriber_type or "", model_size or "", language or "auto"])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranscriptStore:
+    """
+    跨任务共享的转写结果存储，按内容/视频标识寻址，超出容量时按 LRU 淘汰。
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.index = DiskCacheIndex(root, max_bytes=max_bytes)
+
+    def get(self, key: str) -> Optional[TranscriptResult]:
+        entry = self.index.get(key)
+        if not entry:
+            return None
+        try:
+            data = json.loads(self.index.path_for(entry["file"]).read_text(encoding="utf-8"))
+            segments = [TranscriptSegment(**seg) for seg in data.get("segments", [])]
+            return TranscriptResult(language=data.get("language"), full_text=data.get("full_text", ""), segments=segments)
+        except Exception as exc:
+            logger.warning(f"读取共享转写缓存失败，忽略该条目：{key} ({exc})")
+            self.index.remove(key)
+            return None
+
+    def put(self, key: str, transcript: TranscriptResult, source_id: str = "") -> None:
+        filename = f"{key}.json"
+        data = {
+            "language": transcript.language,
+            "full_text": transcript.full_text,
+            "segments": [
+                {"start": seg.start, "end": seg.end, "text": seg.text} for seg in transcript.segments
+            ],
+        }
+        file_path = self.index.path_for(filename)
+        temp_file = file_path.with_suffix(".tmp")
+        temp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        temp_file.replace(file_path)
+        self.index.put(key, filename, source=source_id)
+
+
+transcript_store = TranscriptStore(TRANSCRIPT_CACHE_DIR, max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024)
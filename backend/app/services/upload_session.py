@@ -0,0 +1,272 @@
+import base64
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.enmus.exception import UploadErrorEnum
+from app.exceptions.note import NoteError
+from app.utils.disk_cache import file_sha256
+from app.utils.logger import get_logger
+
+load_dotenv()
+logger = get_logger(__name__)
+
+UPLOAD_DIR = "uploads"
+# 未完成的上传放在静态目录之外，避免半截文件被公开访问
+UPLOAD_SESSION_DIR = Path(os.getenv("UPLOAD_SESSION_DIR", "upload_sessions"))
+# 未完成的上传会话保留时长（小时），超时后清理
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# 建议客户端使用的分片大小
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+
+
+def _raise(error: UploadErrorEnum, message: Optional[str] = None):
+    raise NoteError(code=error.code, message=message or error.message)
+
+
+def safe_filename(filename: str) -> str:
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name or name in (".", ".."):
+        name = f"upload_{uuid.uuid4().hex}"
+    return name
+
+
+def parse_checksum(header: Optional[str]) -> Optional[str]:
+    """
+    解析分片校验头，格式为 "sha256 <摘要>"，摘要支持 hex 或 base64（tus 协议）。
+
+    :return: hex 摘要，未提供时返回 None
+    """
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    if algorithm.lower() != "sha256" or not value:
+        _raise(UploadErrorEnum.CHECKSUM_MISMATCH, "仅支持 sha256 校验")
+    value = value.strip()
+    if len(value) == 64:
+        return value.lower()
+    try:
+        return base64.b64decode(value).hex()
+    except Exception:
+        _raise(UploadErrorEnum.CHECKSUM_MISMATCH, "校验值格式错误")
+
+
+class ChunkWriter:
+    """
+    单个分片的写入器：边接收边写入并计算 sha256，校验失败时把文件截断回分片起点。
+    """
+
+    def __init__(self, manager: "UploadSessionManager", meta: Dict[str, Any], offset: int,
+                 lock: threading.Lock):
+        self.manager = manager
+        self.meta = meta
+        self.start = offset
+        self.offset = offset
+        self._lock = lock
+        self._released = False
+        self._digest = hashlib.sha256()
+        self._file = open(manager.part_path(meta["upload_id"]), "r+b")
+        self._file.seek(offset)
+
+    def write(self, data: bytes) -> None:
+        if self.offset + len(data) > self.meta["size"]:
+            self.abort()
+            _raise(UploadErrorEnum.SIZE_EXCEEDED)
+        self._file.write(data)
+        self._digest.update(data)
+        self.offset += len(data)
+
+    def finish(self, checksum: Optional[str] = None) -> int:
+        """
+        结束分片：校验通过后落盘并更新会话偏移
+
+        :param checksum: 分片的 sha256（hex），None 表示不校验
+        :return: 新的偏移
+        """
+        try:
+            if checksum and self._digest.hexdigest() != checksum:
+                self._truncate()
+                _raise(UploadErrorEnum.CHECKSUM_MISMATCH)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.meta["offset"] = self.offset
+            self.manager._save_meta(self.meta)
+            return self.offset
+        finally:
+            self._close()
+
+    def abort(self) -> None:
+        """
+        分片传输中断：丢弃本分片已写入的内容
+        """
+        try:
+            self._truncate()
+        finally:
+            self._close()
+
+    def _truncate(self) -> None:
+        if self._file.closed:
+            return
+        self._file.truncate(self.start)
+        self.offset = self.start
+
+    def _close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+        if not self._released:
+            self._released = True
+            self._lock.release()
+
+
+class UploadSessionManager:
+    """
+    可续传的分片上传（参考 tus 协议）：
+
+    1. create 创建会话，声明文件名与总大小，得到 upload_id；
+    2. 按偏移顺序上传分片，每个分片可附带 sha256，偏移与服务端不一致时拒绝；
+    3. 中断后通过 status 查询服务端已接收的偏移，从该位置继续；
+    4. commit 校验大小（及整体 sha256）后移动到 uploads 目录。
+    """
+
+    def __init__(self, root: Path, upload_dir: str, ttl_seconds: float):
+        self.root = Path(root)
+        self.upload_dir = upload_dir
+        self.ttl_seconds = ttl_seconds
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def session_dir(self, upload_id: str) -> Path:
+        return self.root / upload_id
+
+    def part_path(self, upload_id: str) -> Path:
+        return self.session_dir(upload_id) / "data.part"
+
+    def create(self, filename: str, size: int, checksum: Optional[str] = None) -> Dict[str, Any]:
+        if int(size) <= 0:
+            _raise(UploadErrorEnum.SIZE_INVALID)
+        self.cleanup_expired()
+        upload_id = uuid.uuid4().hex
+        self.session_dir(upload_id).mkdir(parents=True, exist_ok=True)
+        self.part_path(upload_id).touch()
+        now = time.time()
+        meta = {
+            "upload_id": upload_id,
+            "filename": safe_filename(filename),
+            "size": int(size),
+            "offset": 0,
+            "checksum": checksum.lower() if checksum else None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self._save_meta(meta)
+        logger.info(f"创建上传会话 {upload_id}: {meta['filename']} ({size} bytes)")
+        return meta
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        meta = self._load_meta(upload_id)
+        # 以实际文件大小为准：进程在更新元信息前崩溃时，已落盘的数据仍然有效
+        meta["offset"] = min(self.part_path(upload_id).stat().st_size, meta["size"])
+        return meta
+
+    def open_chunk(self, upload_id: str, offset: int) -> ChunkWriter:
+        """
+        开始写入一个分片，同一会话同时只允许一个分片写入
+        """
+        meta = self.status(upload_id)
+        lock = self._lock_for(upload_id)
+        if not lock.acquire(blocking=False):
+            _raise(UploadErrorEnum.OFFSET_MISMATCH, "该会话有分片正在上传")
+        if offset != meta["offset"]:
+            lock.release()
+            _raise(UploadErrorEnum.OFFSET_MISMATCH, f"分片偏移与服务端不一致，服务端偏移：{meta['offset']}")
+        try:
+            return ChunkWriter(self, meta, offset, lock)
+        except Exception:
+            lock.release()
+            raise
+
+    def commit(self, upload_id: str, checksum: Optional[str] = None) -> str:
+        """
+        完成上传：校验完整性并移动到 uploads 目录
+
+        :return: 前端可访问的路径，如 /uploads/xxx.mp4
+        """
+        meta = self.status(upload_id)
+        lock = self._lock_for(upload_id)
+        if not lock.acquire(blocking=False):
+            _raise(UploadErrorEnum.INCOMPLETE, "该会话有分片正在上传")
+        try:
+            if meta["offset"] != meta["size"]:
+                _raise(UploadErrorEnum.INCOMPLETE, f"文件尚未上传完整：{meta['offset']}/{meta['size']}")
+            expected = (checksum or meta.get("checksum") or "").lower()
+            part = self.part_path(upload_id)
+            if expected and file_sha256(str(part)) != expected:
+                _raise(UploadErrorEnum.CHECKSUM_MISMATCH, "文件整体校验失败")
+
+            os.makedirs(self.upload_dir, exist_ok=True)
+            target = os.path.join(self.upload_dir, meta["filename"])
+            os.replace(part, target)
+        finally:
+            lock.release()
+        self.delete(upload_id)
+        logger.info(f"上传会话 {upload_id} 完成: {target}")
+        return f"/uploads/{meta['filename']}"
+
+    def delete(self, upload_id: str) -> None:
+        if not upload_id.isalnum():
+            return
+        shutil.rmtree(self.session_dir(upload_id), ignore_errors=True)
+        with self._guard:
+            self._locks.pop(upload_id, None)
+
+    def cleanup_expired(self) -> int:
+        if not self.root.exists():
+            return 0
+        removed = 0
+        now = time.time()
+        for session in self.root.iterdir():
+            meta_file = session / "meta.json"
+            try:
+                updated_at = json.loads(meta_file.read_text(encoding="utf-8")).get("updated_at", 0)
+            except Exception:
+                updated_at = session.stat().st_mtime
+            if now - updated_at > self.ttl_seconds:
+                self.delete(session.name)
+                removed += 1
+        if removed:
+            logger.info(f"清理过期上传会话 {removed} 个")
+        return removed
+
+    def _lock_for(self, upload_id: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _load_meta(self, upload_id: str) -> Dict[str, Any]:
+        if not upload_id.isalnum():
+            _raise(UploadErrorEnum.SESSION_NOT_FOUND)
+        meta_file = self.session_dir(upload_id) / "meta.json"
+        if not meta_file.exists() or not self.part_path(upload_id).exists():
+            _raise(UploadErrorEnum.SESSION_NOT_FOUND)
+        return json.loads(meta_file.read_text(encoding="utf-8"))
+
+    def _save_meta(self, meta: Dict[str, Any]) -> None:
+        meta["updated_at"] = time.time()
+        meta_file = self.session_dir(meta["upload_id"]) / "meta.json"
+        temp_file = meta_file.with_suffix(".tmp")
+        temp_file.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        temp_file.replace(meta_file)
+
+
+upload_sessions = UploadSessionManager(
+    UPLOAD_SESSION_DIR,
+    upload_dir=UPLOAD_DIR,
+    ttl_seconds=UPLOAD_SESSION_TTL_HOURS * 3600,
+)
@@ -1,9 +1,26 @@
 from abc import ABC, abstractmethod
+from typing import Iterator, Tuple
 
-from app.models.transcriber_model import TranscriptResult
+from app.models.transcriber_model import TranscriptResult, TranscriptSegment, TranscriptStreamInfo
+from app.utils.audio_helper import prepare_pcm
 
 
 class Transcriber(ABC):
+    # 转写器需要的输入：native 直接使用下载得到的原始音频（m4a/opus 等，适合上传到云端接口），
+    # pcm 需要 16kHz 单声道 PCM（本地 whisper 系列模型）
+    input_format = "native"
+
+    def prepare_audio(self, file_path: str) -> str:
+        '''
+        转写前的音频规整：native 原样返回，pcm 一次性解码为 16kHz 单声道 PCM WAV，供 load_pcm 直接读取采样
+
+        :param file_path: 下载得到的音频路径
+        :return: 传给 transcript / transcript_stream 的音频路径
+        '''
+        if self.input_format == "pcm":
+            return prepare_pcm(file_path)
+        return file_path
+
     @abstractmethod
     def transcript(self,file_path:str)->TranscriptResult:
         '''
@@ -13,6 +30,20 @@ class Transcriber(ABC):
         '''
         pass
 
+    def transcript_stream(self, file_path: str, start_offset: float = 0.0) -> Tuple[TranscriptStreamInfo, Iterator[TranscriptSegment]]:
+        '''
+        增量转写，片段按时间顺序逐个产出。默认实现一次性转写后再逐段产出，
+        支持流式输出的转写器应覆盖此方法。
+
+        :param file_path: 音频路径
+        :param start_offset: 从该时间（秒）开始转写，用于中断后续转
+        :return: (元信息, 片段迭代器)
+        '''
+        result = self.transcript(file_path)
+        duration = result.segments[-1].end if result.segments else 0.0
+        info = TranscriptStreamInfo(language=result.language, duration=duration)
+        return info, (seg for seg in result.segments if seg.start >= start_offset)
+
     def on_finish(self,video_path:str,result: TranscriptResult)->None:
         '''
         当音频转录完成时调用
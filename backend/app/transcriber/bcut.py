@@ -1,4 +1,5 @@
 import json
+import os
 import logging
 import time
 from typing import Optional, List, Dict, Union
@@ -7,6 +8,7 @@ import requests
 
 from app.decorators.timeit import timeit
 from app.models.transcriber_model import TranscriptSegment, TranscriptResult
+from app.services.cancellation import TaskCanceledError, current_token
 from app.transcriber.base import Transcriber
 from app.utils.logger import get_logger
 from events import transcription_finished
@@ -63,11 +65,13 @@ class BcutTranscriber(Transcriber):
         if not file_binary:
             raise ValueError("无法读取文件数据")
             
+        # 直接上传下载得到的原始音频（m4a/mp3 等），按扩展名声明格式
+        file_type = os.path.splitext(file_path)[1].lstrip(".").lower() or "mp3"
         payload = json.dumps({
             "type": 2,
-            "name": "audio.mp3",
+            "name": f"audio.{file_type}",
             "size": len(file_binary),
-            "ResourceFileType": "mp3",
+            "ResourceFileType": file_type,
             "model_id": "8",
         })
 
@@ -184,6 +188,7 @@ class BcutTranscriber(Transcriber):
             logger.info("等待转录结果...")
             task_resp = None
             max_retries = 500
+            token = current_token()
             for i in range(max_retries):
                 task_resp = self._query_result()
                 
@@ -198,7 +203,12 @@ class BcutTranscriber(Transcriber):
                 if i % 10 == 0:
                     logger.info(f"转录进行中... {i}/{max_retries}")
                     
-                time.sleep(1)
+                # 任务取消时立即结束轮询，不再等满 max_retries 秒
+                if token is not None:
+                    if token.wait(1):
+                        raise TaskCanceledError()
+                else:
+                    time.sleep(1)
                 
             if not task_resp or task_resp["state"] != 4:
                 error_msg = f"B站ASR任务未能完成，状态: {task_resp.get('state') if task_resp else 'Unknown'}"
@@ -239,6 +249,8 @@ class BcutTranscriber(Transcriber):
             
             return result
             
+        except TaskCanceledError:
+            raise
         except Exception as e:
             logger.error(f"B站ASR处理失败: {str(e)}")
             raise
@@ -7,6 +7,7 @@ from huggingface_hub import snapshot_download
 from app.decorators.timeit import timeit
 from app.models.transcriber_model import TranscriptSegment, TranscriptResult
 from app.transcriber.base import Transcriber
+from app.utils.audio_helper import is_prepared_pcm, load_pcm
 from app.utils.logger import get_logger
 from app.utils.path_helper import get_model_dir
 from events import transcription_finished
@@ -14,6 +15,8 @@ from events import transcription_finished
 logger = get_logger(__name__)
 
 class MLXWhisperTranscriber(Transcriber):
+    input_format = "pcm"
+
     def __init__(
             self,
             model_size: str = "base"
@@ -50,7 +53,7 @@ class MLXWhisperTranscriber(Transcriber):
         try:
             # 使用 MLX Whisper 进行转录
             result = mlx_whisper.transcribe(
-                file_path,
+                load_pcm(file_path) if is_prepared_pcm(file_path) else file_path,
                 path_or_hf_repo=f"{self.model_name}"
             )
             
@@ -1,8 +1,18 @@
+import multiprocessing
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
 from faster_whisper import WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.vad import get_speech_timestamps
 
 from app.decorators.timeit import timeit
-from app.models.transcriber_model import TranscriptSegment, TranscriptResult
+from app.models.transcriber_model import TranscriptSegment, TranscriptResult, TranscriptStreamInfo
+from app.services.cancellation import TaskCanceledError, current_token, raise_if_canceled
 from app.transcriber.base import Transcriber
+from app.utils.audio_helper import is_prepared_pcm, load_pcm
 from app.utils.env_checker import is_cuda_available, is_torch_installed
 from app.utils.logger import get_logger
 from app.utils.path_helper import get_model_dir
@@ -19,6 +29,16 @@ from modelscope import snapshot_download
 '''
 logger=get_logger(__name__)
 
+SAMPLE_RATE = 16000
+
+# 长音频分块并行转写配置（仅 CPU 生效）
+WHISPER_CHUNKED = os.getenv("WHISPER_CHUNKED", "false").lower() == "true"
+WHISPER_CHUNK_THREADS = int(os.getenv("WHISPER_CHUNK_THREADS", "2"))
+WHISPER_CHUNK_WORKERS = int(os.getenv("WHISPER_CHUNK_WORKERS", str(max(1, (os.cpu_count() or 1) // WHISPER_CHUNK_THREADS))))
+WHISPER_CHUNK_COUNT = int(os.getenv("WHISPER_CHUNK_COUNT", "0"))  # 0 表示与 worker 数一致
+WHISPER_CHUNK_MIN_DURATION = float(os.getenv("WHISPER_CHUNK_MIN_DURATION", "600"))
+WHISPER_CHUNK_OVERLAP = float(os.getenv("WHISPER_CHUNK_OVERLAP", "1.0"))
+
 MODEL_MAP={
     "tiny": "pengzhendong/faster-whisper-tiny",
     'base':'pengzhendong/faster-whisper-base',
@@ -30,7 +50,92 @@ MODEL_MAP={
     'large-v3-turbo':'pengzhendong/faster-whisper-large-v3-turbo',
 }
 
+def plan_chunk_bounds(total_samples: int, speech_timestamps: List[dict], chunk_count: int) -> List[Tuple[int, int]]:
+    """
+    把音频均分为 chunk_count 段，并把每个切点移动到离它最近的静音区间中点，
+    避免从一句话中间切开。
+
+    :param total_samples: 音频总采样点数
+    :param speech_timestamps: VAD 输出的语音区间 [{"start": 采样点, "end": 采样点}, ...]
+    :param chunk_count: 目标分块数
+    :return: [(start_sample, end_sample), ...]，首尾相接覆盖整段音频
+    """
+    chunk_count = max(1, chunk_count)
+    ideal_len = total_samples / chunk_count
+
+    silence_points = []
+    prev_end = 0
+    for ts in speech_timestamps:
+        if ts["start"] > prev_end:
+            silence_points.append((prev_end + ts["start"]) // 2)
+        prev_end = max(prev_end, ts["end"])
+
+    cuts = []
+    for i in range(1, chunk_count):
+        target = int(i * ideal_len)
+        cut = target
+        if silence_points:
+            nearest = min(silence_points, key=lambda p: abs(p - target))
+            # 静音点偏离理想位置不超过半个分块时才采用，防止分块长度严重失衡
+            if abs(nearest - target) <= ideal_len / 2:
+                cut = nearest
+        if (not cuts or cut > cuts[-1]) and 0 < cut < total_samples:
+            cuts.append(cut)
+
+    bounds = [0] + cuts + [total_samples]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def collect_speech(audio: np.ndarray, speech_timestamps: List[dict], max_seconds: float = 30.0) -> np.ndarray:
+    """
+    按顺序拼接 VAD 找到的语音区间，最多 max_seconds 秒，用于语言检测（避免对整段音频再跑一次 VAD）。
+    没有检测到语音时返回开头的 max_seconds 秒。
+    """
+    max_samples = int(max_seconds * SAMPLE_RATE)
+    if not speech_timestamps:
+        return audio[:max_samples]
+    parts, total = [], 0
+    for ts in speech_timestamps:
+        part = audio[ts["start"]:min(ts["end"], ts["start"] + max_samples - total)]
+        parts.append(part)
+        total += len(part)
+        if total >= max_samples:
+            break
+    return np.concatenate(parts)
+
+
+# 子进程内常驻的模型实例，由进程池 initializer 加载一次
+_chunk_worker_model: Optional[WhisperModel] = None
+
+
+def _init_chunk_worker(model_path: str, device: str, compute_type: str, cpu_threads: int):
+    global _chunk_worker_model
+    _chunk_worker_model = WhisperModel(
+        model_size_or_path=model_path,
+        device=device,
+        compute_type=compute_type,
+        cpu_threads=cpu_threads,
+    )
+
+
+def _transcribe_chunk(audio: np.ndarray, offset: float, keep_start: float, keep_end: float,
+                      language: Optional[str]) -> List[Tuple[float, float, str]]:
+    """
+    在子进程中转写一个分块，时间戳换算为整段音频上的绝对时间；
+    仅保留中点落在 [keep_start, keep_end) 的片段，用于去除重叠区的重复内容。
+    """
+    segments_raw, _ = _chunk_worker_model.transcribe(audio, language=language)
+    results = []
+    for seg in segments_raw:
+        start = seg.start + offset
+        end = seg.end + offset
+        if keep_start <= (start + end) / 2 < keep_end:
+            results.append((start, end, seg.text.strip()))
+    return results
+
+
 class WhisperTranscriber(Transcriber):
+    input_format = "pcm"
     # TODO:修改为可配置
     def __init__(
             self,
@@ -38,6 +143,10 @@ class WhisperTranscriber(Transcriber):
             device: str = 'cpu',
             compute_type: str = None,
             cpu_threads: int = 1,
+            chunked: Optional[bool] = None,
+            chunk_workers: Optional[int] = None,
+            chunk_threads: Optional[int] = None,
+            chunk_count: Optional[int] = None,
     ):
         if device == 'cpu' or device is None:
             self.device = 'cpu'
@@ -47,6 +156,7 @@ class WhisperTranscriber(Transcriber):
                 print('没有 cuda 使用 cpu进行计算')
 
         self.compute_type = compute_type or ("float16" if self.device == "cuda" else "int8")
+        self.model_size = model_size
 
         model_dir = get_model_dir("whisper")
         model_path = os.path.join(model_dir, f"whisper-{model_size}")
@@ -60,12 +170,22 @@ class WhisperTranscriber(Transcriber):
             )
             logger.info("模型下载完成")
 
+        self.model_path = model_path
         self.model = WhisperModel(
             model_size_or_path=model_path,
             device=self.device,
             compute_type=self.compute_type,
             download_root=model_dir
         )
+
+        self.chunked = WHISPER_CHUNKED if chunked is None else chunked
+        self.chunk_workers = chunk_workers or WHISPER_CHUNK_WORKERS
+        self.chunk_threads = chunk_threads or WHISPER_CHUNK_THREADS
+        self.chunk_count = chunk_count or WHISPER_CHUNK_COUNT or self.chunk_workers
+        self._chunk_pool: Optional[ProcessPoolExecutor] = None
+        self._chunk_pool_lock = threading.Lock()
+        # 正在使用分块进程池的任务数，只有唯一使用者取消时才结束池中进程
+        self._chunk_pool_users = 0
     @staticmethod
     def is_torch_installed() -> bool:
         try:
@@ -90,35 +210,180 @@ class WhisperTranscriber(Transcriber):
         except ImportError:
             return False
 
+    @staticmethod
+    def _load_audio(file_path: str):
+        """
+        prepare_audio 生成的 16kHz WAV 由 load_pcm 按偏移直接读取采样（跳过 ffmpeg 解码），其他文件交给 faster-whisper 自行解码
+        """
+        if is_prepared_pcm(file_path):
+            return load_pcm(file_path)
+        return file_path
+
+    def _chunkable(self, audio):
+        """
+        判断是否走分块并行：仅 CPU 分块模式下、时长达到 WHISPER_CHUNK_MIN_DURATION 的音频分块。
+
+        :return: (是否分块, 音频)，分块模式下音频已解码为数组，可直接用于转写
+        """
+        if not (self.chunked and self.device == "cpu"):
+            return False, audio
+        if isinstance(audio, str):
+            audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        return len(audio) / SAMPLE_RATE >= WHISPER_CHUNK_MIN_DURATION, audio
+
     @timeit
     def transcript(self, file_path: str) -> TranscriptResult:
         try:
+            chunked, audio = self._chunkable(self._load_audio(file_path))
+            if chunked:
+                return self.transcript_chunked(audio)
+            return self._transcript_single(audio)
+        except TaskCanceledError:
+            raise
+        except Exception as e:
+            logger.error(f"转写失败：{e}", exc_info=True)
+            raise
+
+    def _transcript_single(self, audio) -> TranscriptResult:
+        segments_raw, info = self.model.transcribe(audio)
+
+        segments = []
+        full_text = ""
 
-            segments_raw, info = self.model.transcribe(file_path)
+        # segments_raw 是惰性生成器，每解码出一段检查一次取消，取消后不再继续推理
+        for seg in segments_raw:
+            raise_if_canceled()
+            text = seg.text.strip()
+            full_text += text + " "
+            segments.append(TranscriptSegment(
+                start=seg.start,
+                end=seg.end,
+                text=text
+            ))
 
-            segments = []
-            full_text = ""
+        result= TranscriptResult(
+            language=info.language,
+            full_text=full_text.strip(),
+            segments=segments,
+            raw=info
+        )
+        # self.on_finish(file_path, result)
+        return result
+
+    def transcript_stream(self, file_path: str, start_offset: float = 0.0) -> Tuple[TranscriptStreamInfo, Iterator[TranscriptSegment]]:
+        chunked, audio = self._chunkable(self._load_audio(file_path))
+        if chunked and start_offset > 0:
+            # 续转只需处理剩余部分，剩余部分不足分块时长时走流式
+            chunked = len(audio) / SAMPLE_RATE - start_offset >= WHISPER_CHUNK_MIN_DURATION
+        if chunked:
+            # 长音频分块并行转写按整段返回结果，不支持逐段输出；短音频仍走流式
+            result = self.transcript_chunked(audio, start_offset=start_offset)
+            info = TranscriptStreamInfo(language=result.language, duration=len(audio) / SAMPLE_RATE)
+            return info, iter(result.segments)
+
+        clip_timestamps = [start_offset] if start_offset > 0 else "0"
+        segments_raw, info = self.model.transcribe(audio, clip_timestamps=clip_timestamps)
+        stream_info = TranscriptStreamInfo(language=info.language, duration=info.duration)
+        return stream_info, self._iter_segments(segments_raw)
+
+    @staticmethod
+    def _iter_segments(segments_raw) -> Iterator[TranscriptSegment]:
+        token = current_token()
+        for seg in segments_raw:
+            if token is not None:
+                token.raise_if_canceled()
+            yield TranscriptSegment(start=seg.start, end=seg.end, text=seg.text.strip())
 
-            for seg in segments_raw:
-                text = seg.text.strip()
-                full_text += text + " "
-                segments.append(TranscriptSegment(
-                    start=seg.start,
-                    end=seg.end,
-                    text=text
+    def transcript_chunked(self, audio: np.ndarray, start_offset: float = 0.0) -> TranscriptResult:
+        """
+        长音频分块并行转写：VAD 找静音切点 -> 进程池并行转写各分块 -> 按绝对时间拼接。
+
+        :param audio: 16kHz 单声道 float32 音频
+        :param start_offset: 从该时间（秒）开始转写（中断续转），返回的时间戳仍是整段音频上的绝对时间
+        """
+        duration = len(audio) / SAMPLE_RATE
+        base = int(start_offset * SAMPLE_RATE)
+        audio = audio[base:]
+        base_seconds = base / SAMPLE_RATE
+        total_samples = len(audio)
+        speech_timestamps = get_speech_timestamps(audio, sampling_rate=SAMPLE_RATE)
+        bounds = plan_chunk_bounds(total_samples, speech_timestamps, self.chunk_count)
+        # 复用上面的 VAD 结果，只对语音部分做语言检测
+        language, _, _ = self.model.detect_language(
+            audio=collect_speech(audio, speech_timestamps), vad_filter=False
+        )
+        logger.info(f"分块并行转写：{len(bounds)} 块，{self.chunk_workers} 进程 x {self.chunk_threads} 线程，语言 {language}")
+
+        overlap = int(WHISPER_CHUNK_OVERLAP * SAMPLE_RATE)
+        token = current_token()
+        pool = self._get_chunk_pool()
+        with self._chunk_pool_lock:
+            self._chunk_pool_users += 1
+        try:
+            futures = []
+            for start, end in bounds:
+                chunk_start = max(0, start - overlap)
+                chunk_end = min(total_samples, end + overlap)
+                futures.append(pool.submit(
+                    _transcribe_chunk,
+                    audio[chunk_start:chunk_end],
+                    base_seconds + chunk_start / SAMPLE_RATE,
+                    base_seconds + start / SAMPLE_RATE,
+                    base_seconds + end / SAMPLE_RATE,
+                    language,
                 ))
+            pending = futures
+            while pending:
+                if token is not None and token.is_canceled():
+                    self._abort_chunks(pool, futures)
+                    raise TaskCanceledError()
+                done, pending = wait(pending, timeout=1, return_when=FIRST_EXCEPTION)
+                if any(f.exception() for f in done):
+                    break
+        finally:
+            with self._chunk_pool_lock:
+                self._chunk_pool_users -= 1
 
-            result= TranscriptResult(
-                language=info.language,
-                full_text=full_text.strip(),
-                segments=segments,
-                raw=info
-            )
-            # self.on_finish(file_path, result)
-            return result
-        except Exception as e:
-            print(f"转写失败：{e}")
+        segments = []
+        for future in futures:
+            for start, end, text in future.result():
+                segments.append(TranscriptSegment(start=start, end=end, text=text))
+        segments.sort(key=lambda seg: seg.start)
+
+        return TranscriptResult(
+            language=language,
+            full_text=" ".join(seg.text for seg in segments).strip(),
+            segments=segments,
+            raw={"chunks": len(bounds), "duration": duration},
+        )
+
+    def _get_chunk_pool(self) -> ProcessPoolExecutor:
+        with self._chunk_pool_lock:
+            if self._chunk_pool is None:
+                # spawn 避免在多线程的服务进程中 fork；每个子进程常驻一个模型实例
+                self._chunk_pool = ProcessPoolExecutor(
+                    max_workers=self.chunk_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chunk_worker,
+                    initargs=(self.model_path, self.device, self.compute_type, self.chunk_threads),
+                )
+            return self._chunk_pool
 
+    def _abort_chunks(self, pool: ProcessPoolExecutor, futures) -> None:
+        """
+        取消分块转写：撤销尚未开始的分块；进程池没有其他任务在用时直接结束子进程释放 CPU，
+        下次转写重新创建进程池
+        """
+        for future in futures:
+            future.cancel()
+        with self._chunk_pool_lock:
+            if self._chunk_pool_users > 1 or self._chunk_pool is not pool:
+                return
+            self._chunk_pool = None
+        logger.info("任务已取消，结束分块转写进程")
+        for process in list(getattr(pool, "_processes", {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
 
     def on_finish(self,video_path:str,result: TranscriptResult)->None:
         print("转写完成")
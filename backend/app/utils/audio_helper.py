@@ -0,0 +1,151 @@
+import os
+import struct
+import subprocess
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+from app.services.cancellation import run_process
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# whisper 系列模型实际消费的格式：16kHz 单声道
+PCM_SAMPLE_RATE = 16000
+PCM_SUFFIX = ".16k.wav"
+
+# ffprobe 的 codec_name -> 无需转码即可存放该音频流的扩展名
+NATIVE_AUDIO_EXTENSIONS = {
+    "aac": "m4a",
+    "alac": "m4a",
+    "mp3": "mp3",
+    "opus": "ogg",
+    "vorbis": "ogg",
+    "flac": "flac",
+}
+
+
+def probe_audio_codec(file_path: str) -> Optional[str]:
+    """
+    获取文件中第一条音轨的编码名称，失败或无音轨时返回 None
+    """
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        file_path,
+    ]
+    try:
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except FileNotFoundError:
+        return None
+    codec = result.stdout.strip().splitlines()[0] if result.returncode == 0 and result.stdout.strip() else ""
+    return codec or None
+
+
+def pcm_path_for(file_path: str) -> str:
+    base, _ = os.path.splitext(file_path)
+    return base + PCM_SUFFIX
+
+
+def is_prepared_pcm(file_path) -> bool:
+    return isinstance(file_path, str) and file_path.endswith(PCM_SUFFIX)
+
+
+def prepare_pcm(file_path: str) -> str:
+    """
+    将音频一次性解码为 16kHz 单声道 16bit PCM WAV，与源文件同目录存放，已存在且不旧于源文件时直接复用。
+    转写器通过 load_pcm 直接读取采样数据，重复转写（如中断续转）不再重新解码。
+
+    :param file_path: 源音频/视频路径
+    :return: WAV 文件路径
+    """
+    if is_prepared_pcm(file_path):
+        return file_path
+    output_path = pcm_path_for(file_path)
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(file_path):
+        return output_path
+
+    # 同一媒体可能被多个任务同时转写：各自解码到独立的临时文件，再原子替换为最终文件
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(output_path) or ".", suffix=".part")
+    os.close(fd)
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", file_path,
+        "-vn", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE),
+        "-c:a", "pcm_s16le", "-map_metadata", "-1",
+        "-f", "wav", "-y", temp_path,
+    ]
+    try:
+        run_process(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        os.replace(temp_path, output_path)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"音频解码失败: {e.stderr.decode(errors='ignore') if e.stderr else e}") from e
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return output_path
+
+
+def _wav_data_offset(file_path: str) -> tuple[int, int]:
+    """
+    解析 WAV 头，返回 (data 块偏移, data 块字节数)
+    """
+    with open(file_path, "rb") as f:
+        header = f.read(12)
+        if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+            raise ValueError(f"不是有效的 WAV 文件: {file_path}")
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                raise ValueError(f"WAV 文件缺少 data 块: {file_path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk)
+            if chunk_id == b"data":
+                return f.tell(), chunk_size
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+
+def load_pcm(file_path: str) -> np.ndarray:
+    """
+    读取 prepare_pcm 生成的 WAV，返回 whisper 需要的 float32 数组（取值 [-1, 1]）。
+    whisper 需要完整的 float32 数组，内存映射并不能省内存，这里直接按偏移读取 int16 采样，
+    转换后原地缩放，避免再多一份临时数组。
+    """
+    offset, size = _wav_data_offset(file_path)
+    # ffmpeg 写管道/未知长度时 data 块大小可能为 0 或溢出，按文件实际大小截断
+    size = min(size or os.path.getsize(file_path), os.path.getsize(file_path) - offset)
+    samples = np.fromfile(file_path, dtype="<i2", count=size // 2, offset=offset)
+    audio = samples.astype(np.float32)
+    del samples
+    audio *= 1.0 / 32768.0
+    return audio
+
+
+def extract_native_audio(input_path: str, output_base: Optional[str] = None) -> str:
+    """
+    从视频中原样复制音轨（不转码）；编码无法直接封装时退回解码为 16kHz PCM WAV。
+
+    :param input_path: 输入文件路径
+    :param output_base: 输出路径（不含扩展名），默认与输入同目录同名
+    :return: 音频文件路径
+    """
+    if output_base is None:
+        output_base, _ = os.path.splitext(input_path)
+    ext = NATIVE_AUDIO_EXTENSIONS.get(probe_audio_codec(input_path) or "")
+    if ext:
+        output_path = f"{output_base}.{ext}"
+        if os.path.abspath(output_path) == os.path.abspath(input_path):
+            return input_path
+        command = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", input_path,
+            "-vn", "-c:a", "copy",
+            "-y", output_path,
+        ]
+        result = run_process(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0 and os.path.exists(output_path):
+            return output_path
+        logger.warning(f"复制音轨失败，改为解码：{result.stderr.decode(errors='ignore')}")
+    return prepare_pcm(input_path)
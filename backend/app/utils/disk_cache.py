@@ -0,0 +1,305 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from filelock import FileLock
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    分块计算文件的 sha256，避免把大文件整个读入内存
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DiskCacheIndex:
+    """
+    带索引文件的磁盘缓存。
+
+    内存中维护 key -> 条目 的有序字典（按最近访问时间排序），查询为 O(1)；
+    总大小或条目数超出上限时按 LRU 淘汰并删除对应文件。索引以临时文件 + 原子替换的方式落盘，
+    重启后可直接恢复，不需要扫描缓存目录。
+
+    多个进程（API 与 worker）可以共享同一个缓存目录：所有修改都在索引文件锁内进行，
+    先合并其他进程已落盘的索引再修改、写回，容量上限与引用计数对所有进程一致。
+    读取时只在索引文件变化后重新加载。需要"读取-修改-写回"的调用方使用 transaction()。
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int = 0,
+        max_entries: int = 0,
+        index_path: Optional[Path] = None,
+        flush_interval: float = 5.0,
+    ):
+        """
+        :param root: 缓存文件所在目录，条目中的 file 字段是相对该目录的文件名
+        :param max_bytes: 缓存总大小上限（字节），0 表示不限制
+        :param max_entries: 条目数上限，0 表示不限制
+        :param index_path: 索引文件路径，默认 root/index.json
+        :param flush_interval: 仅更新访问时间时，索引落盘的最小间隔（秒）
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index_path = Path(index_path) if index_path else self.root / "index.json"
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(str(self.index_path) + ".lock")
+        self._depth = 0
+        self._dirty = False
+        self._last_flush = 0.0
+        # 尚未落盘的访问时间，重新加载索引后补回
+        self._pending_access: Dict[str, float] = {}
+        # 已加载的索引文件 (inode, mtime_ns, size)，变化说明其他进程写入过
+        self._loaded_sig: Optional[Tuple[int, int, int]] = None
+        self._load()
+
+    # ---------------- 公有方法 ----------------
+
+    def path_for(self, filename: str) -> Path:
+        return self.root / filename
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询条目并刷新其访问时间；对应文件已不存在时视为未命中。
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if not self.path_for(entry["file"]).exists():
+                with self.transaction():
+                    if key in self._entries:
+                        self._drop(key, delete_file=False)
+                return None
+            entry["last_access"] = self._pending_access[key] = time.time()
+            self._entries.move_to_end(key)
+            self._mark_dirty()
+            return dict(entry)
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询条目但不影响 LRU 顺序
+        """
+        with self._lock:
+            self._refresh()
+            entry = self._entries.get(key)
+            return dict(entry) if entry is not None else None
+
+    def put(self, key: str, filename: str, **meta: Any) -> Dict[str, Any]:
+        """
+        登记一个已写入 root 目录的文件，必要时触发淘汰。
+
+        :param key: 缓存键
+        :param filename: 相对 root 的文件名
+        :param meta: 额外保存到索引中的元信息
+        :return: 写入后的条目
+        """
+        size = self.path_for(filename).stat().st_size
+        with self.transaction():
+            old = self._entries.get(key)
+            if old is not None:
+                self._drop(key, delete_file=old["file"] != filename)
+            entry = {**meta, "file": filename, "size": size, "last_access": time.time()}
+            self._entries[key] = entry
+            self._total_bytes += size
+            self._dirty = True
+            self._evict()
+            return dict(entry)
+
+    def update(self, key: str, **meta: Any) -> Optional[Dict[str, Any]]:
+        """
+        更新条目的元信息（不改变文件与 LRU 顺序）
+        """
+        with self.transaction():
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            entry.update(meta)
+            self._dirty = True
+            self._evict()
+            return dict(entry)
+
+    def remove(self, key: str, delete_file: bool = True) -> bool:
+        with self.transaction():
+            if key not in self._entries:
+                return False
+            self._drop(key, delete_file=delete_file)
+            return True
+
+    def keys(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._entries.keys())
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def flush(self) -> None:
+        with self.transaction():
+            self._dirty = True
+
+    @contextmanager
+    def transaction(self) -> Iterator["DiskCacheIndex"]:
+        """
+        持有索引文件锁（跨进程）与线程锁：进入时合并其他进程写入的索引，退出时写回。
+        可嵌套，只在最外层加载与写回。
+        """
+        with self._lock:
+            if self._depth:
+                self._depth += 1
+                try:
+                    yield self
+                finally:
+                    self._depth -= 1
+                return
+            with self._file_lock:
+                self._depth = 1
+                try:
+                    self._refresh()
+                    yield self
+                finally:
+                    self._depth = 0
+                    if self._dirty:
+                        self._flush()
+
+    # ---------------- 可覆盖的钩子 ----------------
+
+    def can_evict(self, entry: Dict[str, Any]) -> bool:
+        """
+        子类可覆盖，返回 False 的条目不会被 LRU 淘汰（例如仍被引用的文件）
+        """
+        return True
+
+    def companion_files(self, entry: Dict[str, Any]) -> list[Path]:
+        """
+        子类可覆盖，返回由条目文件派生、需随条目一起删除的文件（例如解码出的中间文件）
+        """
+        return []
+
+    # ---------------- 私有方法 ----------------
+
+    def _index_sig(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.index_path.stat()
+        except FileNotFoundError:
+            return None
+        # 索引总是原子替换，inode 随之变化，不依赖 mtime 的精度
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        """
+        索引文件被其他进程改写过时重新加载，并补回本进程尚未落盘的访问时间
+        """
+        if self._index_sig() == self._loaded_sig:
+            return
+        self._load()
+        for key, accessed in self._pending_access.items():
+            entry = self._entries.get(key)
+            if entry is not None and accessed > float(entry.get("last_access", 0)):
+                entry["last_access"] = accessed
+                self._entries.move_to_end(key)
+
+    def _load(self) -> None:
+        self._loaded_sig = self._index_sig()
+        if self._loaded_sig is None:
+            return
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            logger.warning(f"读取缓存索引失败，将重建索引：{self.index_path} ({exc})")
+            return
+        entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        total = 0
+        for item in data.get("entries", []):
+            key = item.get("key")
+            entry = item.get("entry") or {}
+            if not key or "file" not in entry:
+                continue
+            if not self.path_for(entry["file"]).exists():
+                continue
+            entries[key] = entry
+            total += int(entry.get("size", 0))
+        self._entries = entries
+        self._total_bytes = total
+
+    def _drop(self, key: str, delete_file: bool) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= int(entry.get("size", 0))
+        self._dirty = True
+        if delete_file:
+            for file_path in [self.path_for(entry["file"]), *self.companion_files(entry)]:
+                try:
+                    if file_path.exists():
+                        file_path.unlink()
+                except Exception as exc:
+                    logger.warning(f"删除缓存文件失败: {file_path} ({exc})")
+
+    def _over_budget(self) -> bool:
+        if self.max_bytes and self._total_bytes > self.max_bytes:
+            return True
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        return False
+
+    def _evict(self) -> None:
+        if not self._over_budget():
+            return
+        for key in list(self._entries.keys()):
+            if not self._over_budget():
+                break
+            if not self.can_evict(self._entries[key]):
+                continue
+            logger.info(f"缓存超出容量，淘汰条目：{key}")
+            self._drop(key, delete_file=True)
+        if self._over_budget():
+            logger.warning(f"缓存仍超出容量（剩余条目均不可淘汰）：{self.root}")
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            with self.transaction():
+                pass
+
+    def _flush(self) -> None:
+        """
+        写回索引，调用方需持有文件锁（见 transaction）
+        """
+        data = {
+            "entries": [{"key": key, "entry": entry} for key, entry in self._entries.items()],
+        }
+        # 临时文件名带进程号，多个进程不会写同一个临时文件
+        temp_file = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            temp_file.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            temp_file.replace(self.index_path)
+            self._loaded_sig = self._index_sig()
+            self._pending_access.clear()
+            self._dirty = False
+            self._last_flush = time.monotonic()
+        except Exception as exc:
+            logger.error(f"写入缓存索引失败：{self.index_path} ({exc})")
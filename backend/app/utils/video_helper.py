@@ -1,8 +1,8 @@
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from dotenv import load_dotenv
-import subprocess
 import os
 import uuid
 load_dotenv()
@@ -11,7 +11,53 @@ BACKEND_PORT= os.getenv("BACKEND_PORT", 8483)
 
 BACKEND_BASE_URL = f"{api_path}:{BACKEND_PORT}"
 
-from typing import Optional
+from typing import Dict, Iterable, Optional
+
+from app.services.cancellation import propagate, run_process
+
+# 批量截图时并行的 ffmpeg 进程数
+SCREENSHOT_CONCURRENCY = max(1, int(os.getenv("SCREENSHOT_CONCURRENCY", "4")))
+
+
+def generate_screenshots(video_path: str, output_dir: str, timestamps: Iterable[int],
+                         width: int = 0) -> Dict[int, Optional[str]]:
+    """
+    批量截图：相同时间点只截一次，多个时间点用有限并发的 ffmpeg 进程处理，
+    每个进程都在 -i 之前 -ss（输入端快速定位到关键帧），不会从头解码。
+
+    :param width: 输出宽度（等比缩放），0 表示保持原始分辨率
+    :return: {时间戳: 图片路径}，失败的时间点对应 None
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    unique = sorted(set(timestamps))
+    if not unique:
+        return {}
+
+    def grab(item) -> Optional[str]:
+        index, timestamp = item
+        output_path = output_dir / f"screenshot_{index:03}_{uuid.uuid4()}.jpg"
+        command = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-ss", str(timestamp),
+            "-i", str(video_path),
+            "-frames:v", "1",
+            "-q:v", "2",
+        ]
+        if width:
+            command += ["-vf", f"scale={width}:-2"]
+        command += ["-y", str(output_path)]
+        result = run_process(command, capture_output=True, text=True)
+        if result.returncode != 0 or not output_path.exists():
+            print(f"ffmpeg failed (timestamp={timestamp}):", result.stderr)
+            return None
+        return str(output_path)
+
+    with ThreadPoolExecutor(max_workers=min(SCREENSHOT_CONCURRENCY, len(unique))) as pool:
+        paths = list(pool.map(propagate(grab), enumerate(unique)))
+    return dict(zip(unique, paths))
+
+
 def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index: int) -> str:
     """
     使用 ffmpeg 生成截图，返回生成图片路径
@@ -33,7 +79,7 @@ def generate_screenshot(video_path: str, output_dir: str, timestamp: int, index:
     ]
 
     print("Running command:", command)
-    result = subprocess.run(command, capture_output=True, text=True)
+    result = run_process(command, capture_output=True, text=True)
 
     if result.returncode != 0:
         print("ffmpeg failed:", result.stderr)
@@ -1,14 +1,25 @@
 import base64
+import io
 import os
-import re
 import subprocess
+import uuid
+from contextlib import nullcontext
+from typing import Iterator, Tuple
+
 import ffmpeg
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+from app.services.cancellation import TaskCanceledError, current_token
 from app.utils.logger import get_logger
 from app.utils.path_helper import get_app_dir
 
 logger = get_logger(__name__)
+
+# 调试模式下把网格图写入 grid_dir，便于人工检查
+VIDEO_READER_DEBUG = os.getenv("VIDEO_READER_DEBUG", "false").lower() == "true"
+
+
 class VideoReader:
     def __init__(self,
                  video_path: str,
@@ -26,117 +37,119 @@ class VideoReader:
         self.unit_width = unit_width
         self.unit_height = unit_height
         self.save_quality = save_quality
-        self.frame_dir = frame_dir or get_app_dir("output_frames")
-        self.grid_dir = grid_dir or get_app_dir("grid_output")
-        print(f"视频路径：{video_path}",self.frame_dir,self.grid_dir)
+        self.frame_dir = frame_dir  # 已不再使用：帧经管道直接进入内存，不再写入帧目录
+        self.grid_dir = grid_dir
+        print(f"视频路径：{video_path}")
         self.font_path = font_path
+        self.font = ImageFont.truetype(font_path, 48) if os.path.exists(font_path) else ImageFont.load_default()
 
     def format_time(self, seconds: float) -> str:
         mm = int(seconds // 60)
         ss = int(seconds % 60)
         return f"{mm:02d}_{ss:02d}"
 
-    def extract_time_from_filename(self, filename: str) -> float:
-        match = re.search(r"frame_(\d{2})_(\d{2})\.jpg", filename)
-        if match:
-            mm, ss = map(int, match.groups())
-            return mm * 60 + ss
-        return float('inf')
-
-    def extract_frames(self, max_frames=1000) -> list[str]:
-
+    def probe_duration(self) -> float:
+        return float(ffmpeg.probe(self.video_path)["format"]["duration"])
+
+    def iter_frames(self, max_frames=1000) -> Iterator[Tuple[float, np.ndarray]]:
+        """
+        单次解码提取帧：一个 ffmpeg 进程用 fps 滤镜按间隔取帧并缩放到单元格尺寸，
+        以 rgb24 原始像素经管道输出，逐帧产出 (时间戳秒数, HxWx3 数组)，不落盘。
+        产出的数组复用同一块缓冲区，调用方需在取下一帧前拷贝走。
+        """
+        duration = self.probe_duration()
+        frame_count = min(len(range(0, int(duration), self.frame_interval)), max_frames)
+        if frame_count <= 0:
+            return
+
+        width, height = self.unit_width, self.unit_height
+        frame_bytes = width * height * 3
+        cmd = [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", self.video_path,
+            "-an", "-sn",
+            "-vf", f"fps=1/{self.frame_interval},scale={width}:{height}:flags=bilinear",
+            "-frames:v", str(frame_count),
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1",
+        ]
+        token = current_token()
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_bytes)
+        buffer = bytearray(frame_bytes)
+        view = memoryview(buffer)
+        frame = np.frombuffer(buffer, dtype=np.uint8).reshape((height, width, 3))
         try:
-            os.makedirs(self.frame_dir, exist_ok=True)
-            duration = float(ffmpeg.probe(self.video_path)["format"]["duration"])
-            timestamps = [i for i in range(0, int(duration), self.frame_interval)][:max_frames]
-
-            image_paths = []
-            for ts in timestamps:
-                time_label = self.format_time(ts)
-                output_path = os.path.join(self.frame_dir, f"frame_{time_label}.jpg")
-                cmd = ["ffmpeg", "-ss", str(ts), "-i", self.video_path, "-frames:v", "1", "-q:v", "2", "-y", output_path,
-                       "-hide_banner", "-loglevel", "error"]
-                subprocess.run(cmd, check=True)
-                image_paths.append(output_path)
-            return image_paths
-        except Exception as e:
-            logger.error(f"分割帧发生错误：{str(e)}")
-            raise ValueError("视频处理失败")
-
-    def group_images(self) -> list[list[str]]:
-        image_files = [os.path.join(self.frame_dir, f) for f in os.listdir(self.frame_dir) if
-                       f.startswith("frame_") and f.endswith(".jpg")]
-        image_files.sort(key=lambda f: self.extract_time_from_filename(os.path.basename(f)))
-        group_size = self.grid_size[0] * self.grid_size[1]
-        return [image_files[i:i + group_size] for i in range(0, len(image_files), group_size)]
-
-    def concat_images(self, image_paths: list[str], name: str) -> str:
-        os.makedirs(self.grid_dir, exist_ok=True)
-        font = ImageFont.truetype(self.font_path, 48) if os.path.exists(self.font_path) else ImageFont.load_default()
-        images = []
-
-        for path in image_paths:
-            img = Image.open(path).convert("RGB").resize((self.unit_width, self.unit_height), Image.Resampling.LANCZOS)
-            timestamp = re.search(r"frame_(\d{2})_(\d{2})\.jpg", os.path.basename(path))
-            time_text = f"{timestamp.group(1)}:{timestamp.group(2)}" if timestamp else ""
-            draw = ImageDraw.Draw(img)
-            draw.text((10, 10), time_text, fill="yellow", font=font, stroke_width=1, stroke_fill="black")
-            images.append(img)
-
-        cols, rows = self.grid_size
-        grid_img = Image.new("RGB", (self.unit_width * cols, self.unit_height * rows), (255, 255, 255))
-
-        for i, img in enumerate(images):
+            # 任务取消时令牌直接结束 ffmpeg，管道提前读到 EOF
+            with token.track(process) if token else nullcontext():
+                for index in range(frame_count):
+                    filled = 0
+                    while filled < frame_bytes:
+                        n = process.stdout.readinto(view[filled:])
+                        if not n:
+                            break
+                        filled += n
+                    if token is not None:
+                        token.raise_if_canceled()
+                    if filled < frame_bytes:
+                        break
+                    yield index * self.frame_interval, frame
+        finally:
+            process.stdout.close()
+            if process.poll() is None:
+                process.kill()
+            _, stderr = process.communicate()
+            if process.returncode not in (0, None, -9) and stderr:
+                logger.warning(f"ffmpeg 提取帧输出错误：{stderr.decode(errors='ignore').strip()}")
+
+    def _encode_canvas(self, canvas: np.ndarray, timestamps: list[float], name: str) -> str:
+        """
+        在网格画布上标注时间并直接编码为 JPEG data URL；仅在调试模式下额外写盘
+        """
+        grid_img = Image.fromarray(canvas)
+        draw = ImageDraw.Draw(grid_img)
+        cols = self.grid_size[0]
+        for i, ts in enumerate(timestamps):
             x = (i % cols) * self.unit_width
             y = (i // cols) * self.unit_height
-            grid_img.paste(img, (x, y))
-
-        save_path = os.path.join(self.grid_dir, f"{name}.jpg")
-        grid_img.save(save_path, quality=self.save_quality)
-        return save_path
-
-    def encode_images_to_base64(self, image_paths: list[str]) -> list[str]:
-        base64_images = []
-        for path in image_paths:
-            with open(path, "rb") as img_file:
-                encoded_string = base64.b64encode(img_file.read()).decode("utf-8")
-                base64_images.append(f"data:image/jpeg;base64,{encoded_string}")
-        return base64_images
+            draw.text((x + 10, y + 10), self.format_time(ts).replace("_", ":"), fill="yellow", font=self.font,
+                      stroke_width=1, stroke_fill="black")
+
+        buffer = io.BytesIO()
+        grid_img.save(buffer, format="JPEG", quality=self.save_quality)
+        if VIDEO_READER_DEBUG:
+            grid_dir = self.grid_dir or get_app_dir("grid_output")
+            os.makedirs(grid_dir, exist_ok=True)
+            save_path = os.path.join(grid_dir, f"{name}.jpg")
+            with open(save_path, "wb") as f:
+                f.write(buffer.getbuffer())
+            logger.info(f"调试模式：网格图已保存到 {save_path}")
+        encoded_string = base64.b64encode(buffer.getbuffer()).decode("utf-8")
+        return f"data:image/jpeg;base64,{encoded_string}"
 
     def run(self)->list[str]:
-        logger.info("开始提取视频帧...")
+        logger.info("开始提取视频帧并拼接网格图...")
         try:
-            # 确保目录存在
-            print(self.frame_dir,self.grid_dir)
-            os.makedirs(self.frame_dir, exist_ok=True)
-            os.makedirs(self.grid_dir, exist_ok=True)
-            #清空帧文件夹
-            for file in os.listdir(self.frame_dir):
-                if file.startswith("frame_"):
-                    os.remove(os.path.join(self.frame_dir, file))
-            print(self.frame_dir,self.grid_dir)
-            #清空网格文件夹
-            for file in os.listdir(self.grid_dir):
-                if file.startswith("grid_"):
-                    os.remove(os.path.join(self.grid_dir, file))
-            print(self.frame_dir,self.grid_dir)
-            self.extract_frames()
-            print("2#3",self.frame_dir,self.grid_dir)
-            logger.info("开始拼接网格图...")
-            image_paths = []
-            groups = self.group_images()
-            for idx, group in enumerate(groups, start=1):
-                if len(group) < self.grid_size[0] * self.grid_size[1]:
-                    logger.warning(f"⚠️ 跳过第 {idx} 组，图片不足 {self.grid_size[0] * self.grid_size[1]} 张")
-                    continue
-                out_path = self.concat_images(group, f"grid_{idx}")
-                image_paths.append(out_path)
-
-            logger.info("📤 开始编码图像...")
-            urls = self.encode_images_to_base64(image_paths)
+            cols, rows = self.grid_size
+            group_size = cols * rows
+            # 预分配网格画布，帧直接拷贝到对应单元格，画布在各组之间复用
+            canvas = np.empty((self.unit_height * rows, self.unit_width * cols, 3), dtype=np.uint8)
+            prefix = uuid.uuid4().hex[:8]
+            urls, timestamps = [], []
+            for ts, frame in self.iter_frames():
+                i = len(timestamps)
+                y = (i // cols) * self.unit_height
+                x = (i % cols) * self.unit_width
+                canvas[y:y + self.unit_height, x:x + self.unit_width] = frame
+                timestamps.append(ts)
+                if len(timestamps) == group_size:
+                    urls.append(self._encode_canvas(canvas, timestamps, f"grid_{prefix}_{len(urls) + 1}"))
+                    timestamps = []
+            if timestamps:
+                logger.warning(f"⚠️ 跳过最后一组，图片不足 {group_size} 张")
+
+            logger.info(f"📤 网格图编码完成，共 {len(urls)} 张")
             return urls
+        except TaskCanceledError:
+            raise
         except Exception as e:
             logger.error(f"发生错误：{str(e)}")
             raise ValueError("视频处理失败")
-
-
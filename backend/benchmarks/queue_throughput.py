@@ -0,0 +1,100 @@
+"""
+对比开启/关闭 SQLite 调优（WAL、synchronous=NORMAL、busy_timeout、BEGIN IMMEDIATE）时任务队列的吞吐。
+
+每种模式在独立子进程中使用全新的临时数据库：先入队 N 个任务，再由 K 个线程并发领取并完成。
+
+用法（在 backend 目录下执行）：
+    python benchmarks/queue_throughput.py --tasks 500 --threads 8
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def _worker_main(tasks: int, threads: int) -> None:
+    # 在设置好 DATABASE_URL / SQLITE_TUNING 的子进程中导入
+    from app.db.init_db import init_db
+    from app.services.task_queue import _dequeue_task, _finalize_task, _upsert_task
+
+    init_db()
+
+    start = time.perf_counter()
+    for _ in range(tasks):
+        _upsert_task({"task_id": uuid.uuid4().hex, "video_url": "https://example.com"})
+    enqueue_elapsed = time.perf_counter() - start
+
+    done = 0
+    errors = 0
+    lock = threading.Lock()
+
+    def consume(worker_id: str) -> None:
+        nonlocal done, errors
+        while True:
+            try:
+                payload = _dequeue_task(worker_id)
+                if payload is None:
+                    return
+                _finalize_task(payload["task_id"], True, None)
+            except Exception:
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                done += 1
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=consume, args=(f"bench-{i}",)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    consume_elapsed = time.perf_counter() - start
+
+    print(
+        f"入队 {tasks / enqueue_elapsed:8.1f} 个/s  "
+        f"领取+完成 {done / consume_elapsed:8.1f} 个/s  "
+        f"完成 {done}/{tasks}  错误 {errors}"
+    )
+
+
+def _run_mode(label: str, tuning: bool, tasks: int, threads: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        env["SQLITE_TUNING"] = "true" if tuning else "false"
+        env["NOTE_OUTPUT_DIR"] = os.path.join(tmp, "note_results")
+        print(f"[{label}]", flush=True)
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child",
+             "--tasks", str(tasks), "--threads", str(threads)],
+            env=env,
+            cwd=tmp,
+            check=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务队列 SQLite 吞吐基准")
+    parser.add_argument("--tasks", type=int, default=500, help="入队任务数")
+    parser.add_argument("--threads", type=int, default=8, help="并发领取线程数")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _worker_main(args.tasks, args.threads)
+        return
+
+    _run_mode("未调优", False, args.tasks, args.threads)
+    _run_mode("已调优", True, args.tasks, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+对比 WhisperTranscriber 单次转写与分块并行转写的实时率（RTF = 转写耗时 / 音频时长）。
+两条路径使用同一份预先解码的音频，计时前都先在一小段音频上预热，耗时不含解码与模型加载。
+
+用法（在 backend 目录下执行）：
+    python benchmarks/whisper_rtf.py path/to/audio.mp3 --model base --workers 4 --threads 2
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from faster_whisper.audio import decode_audio  # noqa: E402
+
+from app.transcriber.whisper import SAMPLE_RATE, WhisperTranscriber  # noqa: E402
+
+
+# 预热用的音频长度（秒）
+WARMUP_SECONDS = 30
+
+
+def _worker_pid(delay: float) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+def _warm_chunk_pool(transcriber: WhisperTranscriber) -> None:
+    """
+    确保进程池的每个子进程都已启动并完成模型加载（initializer 执行完才会运行任务），
+    进程按需创建，因此持续提交占满所有 worker 的任务，直到见到全部进程
+    """
+    pool = transcriber._get_chunk_pool()
+    pids = set()
+    while len(pids) < transcriber.chunk_workers:
+        futures = [pool.submit(_worker_pid, 0.2) for _ in range(transcriber.chunk_workers)]
+        pids.update(future.result() for future in futures)
+
+
+def _run(label: str, fn, duration: float):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} 耗时 {elapsed:8.2f}s  RTF {elapsed / duration:6.3f}  片段数 {len(result.segments)}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Whisper 转写实时率基准")
+    parser.add_argument("audio", help="音频/视频文件路径")
+    parser.add_argument("--model", default="base", help="模型大小，如 tiny / base / small")
+    parser.add_argument("--workers", type=int, default=None, help="分块模式的进程数")
+    parser.add_argument("--threads", type=int, default=None, help="每个进程的 CPU 线程数")
+    parser.add_argument("--chunks", type=int, default=None, help="分块数，默认与进程数一致")
+    parser.add_argument("--skip-single", action="store_true", help="跳过单次转写（原有路径）")
+    args = parser.parse_args()
+
+    transcriber = WhisperTranscriber(
+        model_size=args.model,
+        device="cpu",
+        chunked=True,
+        chunk_workers=args.workers,
+        chunk_threads=args.threads,
+        chunk_count=args.chunks,
+    )
+
+    audio = decode_audio(args.audio, sampling_rate=SAMPLE_RATE)
+    duration = len(audio) / SAMPLE_RATE
+    print(f"音频时长 {duration:.1f}s，模型 {args.model}，"
+          f"分块 {transcriber.chunk_count} 块 / {transcriber.chunk_workers} 进程 x {transcriber.chunk_threads} 线程")
+
+    warmup = audio[:WARMUP_SECONDS * SAMPLE_RATE]
+    if not args.skip_single:
+        transcriber._transcript_single(warmup)
+        _run("single", lambda: transcriber._transcript_single(audio), duration)
+
+    _warm_chunk_pool(transcriber)
+    transcriber.transcript_chunked(warmup)
+    _run("chunked", lambda: transcriber.transcript_chunked(audio), duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,9 @@ from app import create_app
 from app.transcriber.transcriber_provider import get_transcriber
 from events import register_handler
 from ffmpeg_helper import ensure_ffmpeg_or_raise
-from app.services.task_queue import start_task_queue, stop_task_queue
+from app.services.task_queue import QUEUE_MODE, start_task_queue, stop_task_queue
+from app.services.note import backfill_task_summaries
+from app.services.image_proxy import image_proxy
 
 logger = get_logger(__name__)
 load_dotenv()
@@ -41,13 +43,17 @@ if not os.path.exists(out_dir):
 async def lifespan(app: FastAPI):
     register_handler()
     init_db()
+    backfill_task_summaries()
     get_transcriber(transcriber_type=os.getenv("TRANSCRIBER_TYPE", "fast-whisper"))
     seed_default_providers()
-    start_task_queue()
+    # QUEUE_MODE=api 时任务由独立的 worker 进程（worker.py）执行，API 进程只负责入队
+    if QUEUE_MODE != "api":
+        start_task_queue()
     try:
         yield
     finally:
         stop_task_queue()
+        await image_proxy.aclose()
 
 app = create_app(lifespan=lifespan)
 origins = [
@@ -82,5 +88,10 @@ app.mount("/note_results", StaticFiles(directory=note_output_dir), name="note_re
 if __name__ == "__main__":
     port = int(os.getenv("BACKEND_PORT", 8483))
     host = os.getenv("BACKEND_HOST", "0.0.0.0")
-    logger.info(f"Starting server on {host}:{port}")
-    uvicorn.run(app, host=host, port=port, reload=False)
+    # API 进程数，大于 1 时建议配合 QUEUE_MODE=api 与独立 worker 进程使用
+    workers = int(os.getenv("BACKEND_WORKERS", "1"))
+    logger.info(f"Starting server on {host}:{port} (workers={workers}, queue_mode={QUEUE_MODE})")
+    if workers > 1:
+        uvicorn.run("main:app", host=host, port=port, reload=False, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port, reload=False)
@@ -0,0 +1,114 @@
+"""
+独立的任务 worker 进程：只运行任务队列与处理流水线（下载、转写、总结），不提供 HTTP 接口。
+
+与 API 进程共享同一个数据库，API 进程设置 QUEUE_MODE=api 后只负责入队，
+转写等 CPU 密集的工作不再与请求处理争抢 GIL。
+
+用法（在 backend 目录下执行）：
+    QUEUE_MODE=api python main.py              # API 进程（可用 BACKEND_WORKERS 启动多个）
+    python worker.py --processes 2             # 2 个 worker 进程
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+# 必须在导入 app 模块之前设置，task_queue 据此调整轮询间隔
+os.environ["QUEUE_MODE"] = "worker"
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv()
+
+# worker 崩溃后的重启间隔（秒）
+RESTART_DELAY_SECONDS = float(os.getenv("QUEUE_WORKER_RESTART_DELAY_SECONDS", "5"))
+
+
+def run_worker(concurrency: int = None) -> None:
+    """单个 worker 进程的入口：初始化依赖后运行队列，直到收到 SIGTERM / SIGINT"""
+    from app.db.init_db import init_db
+    from app.services.task_queue import start_task_queue, stop_task_queue
+    from app.transcriber.transcriber_provider import get_transcriber
+    from app.utils.logger import get_logger
+    from events import register_handler
+
+    logger = get_logger("worker")
+    if concurrency:
+        os.environ["QUEUE_CONCURRENCY"] = str(concurrency)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    register_handler()
+    init_db()
+    get_transcriber(transcriber_type=os.getenv("TRANSCRIBER_TYPE", "fast-whisper"))
+    start_task_queue()
+    logger.info(f"worker 进程已启动 pid={os.getpid()}")
+    try:
+        stop.wait()
+    finally:
+        stop_task_queue()
+        logger.info(f"worker 进程已退出 pid={os.getpid()}")
+
+
+def _spawn(ctx, concurrency):
+    process = ctx.Process(target=run_worker, args=(concurrency,), daemon=False)
+    process.start()
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BiliNote 任务 worker")
+    parser.add_argument(
+        "--processes", type=int,
+        default=int(os.getenv("QUEUE_WORKER_PROCESSES", "1")),
+        help="worker 进程数（默认读取 QUEUE_WORKER_PROCESSES）",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=None,
+        help="每个进程同时处理的任务数（默认读取 QUEUE_CONCURRENCY）",
+    )
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker(args.concurrency)
+        return
+
+    from app.db.init_db import init_db
+    from app.utils.logger import get_logger
+
+    logger = get_logger("worker")
+    # 建表/迁移只在父进程做一次，避免多个子进程同时执行 DDL
+    init_db()
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [_spawn(ctx, args.concurrency) for _ in range(args.processes)]
+    stopping = threading.Event()
+
+    def shutdown(*_):
+        stopping.set()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    # 子进程异常退出时重启；其未完成的任务在租约过期后由回收线程重新入队
+    while not stopping.wait(RESTART_DELAY_SECONDS):
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping.is_set():
+                logger.warning(f"worker 进程 pid={process.pid} 已退出（exitcode={process.exitcode}），重新启动")
+                processes[index] = _spawn(ctx, args.concurrency)
+
+    for process in processes:
+        process.join(timeout=30)
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()